@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Load-test search_memory with N concurrent callers against local stand-ins.
+
+Stand-ins:
+  - OpenAI: a local HTTP server answering POST /v1/embeddings after a fixed
+    delay (--embed-latency-ms), so the real AsyncOpenAI/httpx stack and its
+    connection pool are exercised.
+  - Qdrant: an in-memory collection behind a wrapper that adds a fixed
+    delay (--qdrant-latency-ms) per query.
+
+The baseline replays the previous synchronous tool: FastMCP calls sync tools
+inline on its event loop, so concurrent calls run one after another.
+
+Usage:
+    python benchmarks/bench_mcp_concurrency.py --concurrency 1 4 16 64
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "memory_mcp"))
+sys.path.insert(0, ROOT)
+
+
+async def start_embedding_standin(dimensions, latency_s):
+    """Minimal HTTP/1.1 keep-alive server that mimics the embeddings endpoint."""
+    rng = random.Random(0)
+    vector = [rng.uniform(-1, 1) for _ in range(dimensions)]
+    stats = {"requests": 0, "connections": 0}
+
+    async def handle(reader, writer):
+        stats["connections"] += 1
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                length = 0
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    if name.strip().lower() == "content-length":
+                        length = int(value.strip())
+                body = json.loads(await reader.readexactly(length)) if length else {}
+                inputs = body.get("input", [])
+                inputs = inputs if isinstance(inputs, list) else [inputs]
+
+                await asyncio.sleep(latency_s)
+                stats["requests"] += 1
+                payload = json.dumps({
+                    "object": "list",
+                    "model": body.get("model", "stand-in"),
+                    "data": [
+                        {"object": "embedding", "index": i, "embedding": vector}
+                        for i in range(len(inputs))
+                    ],
+                    "usage": {"prompt_tokens": 1, "total_tokens": 1},
+                }).encode("utf-8")
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    b"Connection: keep-alive\r\nContent-Length: " + str(len(payload)).encode() + b"\r\n\r\n" + payload
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    return server, port, stats
+
+
+def seed_points(client_cls, collection, dimensions, count):
+    from qdrant_client.models import Distance, PointStruct, VectorParams
+
+    rng = random.Random(1)
+    client = client_cls(":memory:")
+    points = [
+        PointStruct(
+            id=i,
+            vector=[rng.uniform(-1, 1) for _ in range(dimensions)],
+            payload={"text": f"message {i}", "role": "user", "conversation_id": f"c{i // 10}"},
+        )
+        for i in range(count)
+    ]
+    return client, points, VectorParams(size=dimensions, distance=Distance.COSINE)
+
+
+class AsyncQdrantStandIn:
+    """In-memory Qdrant plus a fixed per-query delay standing in for the network hop."""
+
+    def __init__(self, client, latency_s):
+        self.client = client
+        self.latency_s = latency_s
+
+    async def query_points(self, **kwargs):
+        await asyncio.sleep(self.latency_s)
+        return await self.client.query_points(**kwargs)
+
+    async def query_batch_points(self, **kwargs):
+        await asyncio.sleep(self.latency_s)
+        return await self.client.query_batch_points(**kwargs)
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))] * 1000
+
+
+async def run_async(server, callers, calls_per_caller):
+    latencies = []
+
+    async def caller(worker):
+        for i in range(calls_per_caller):
+            started = time.perf_counter()
+            result = await server.search_memory(f"query {worker}-{i}-{random.random()}", top_k=5)
+            latencies.append(time.perf_counter() - started)
+            if result and isinstance(result[0], dict) and "error" in result[0]:
+                raise RuntimeError(result[0]["error"])
+
+    started = time.perf_counter()
+    await asyncio.gather(*(caller(w) for w in range(callers)))
+    elapsed = time.perf_counter() - started
+    return {
+        "callers": callers,
+        "calls": len(latencies),
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 0.50),
+        "p95_ms": percentile(latencies, 0.95),
+    }
+
+
+async def run_batch_comparison(server, queries_per_call, rounds):
+    """Several related lookups: one search_memory call each vs. one search_memory_batch call."""
+    timings = {"sequential": [], "batch": []}
+    for r in range(rounds):
+        queries = [f"related query {r}-{i}-{random.random()}" for i in range(queries_per_call)]
+        started = time.perf_counter()
+        for query in queries:
+            await server.search_memory(query, top_k=5)
+        timings["sequential"].append(time.perf_counter() - started)
+
+        queries = [f"related query {r}-{i}-{random.random()}" for i in range(queries_per_call)]
+        started = time.perf_counter()
+        result = await server.search_memory_batch(queries, top_k=5)
+        timings["batch"].append(time.perf_counter() - started)
+        if result and "error" in result[0]:
+            raise RuntimeError(result[0]["error"])
+    return {mode: {"p50_ms": percentile(values, 0.50), "p95_ms": percentile(values, 0.95)}
+            for mode, values in timings.items()}
+
+
+def run_sync_baseline(base_url, qdrant, collection, calls, qdrant_latency_s):
+    """The old tool body: blocking OpenAI + Qdrant calls, one call at a time."""
+    import httpx
+    from openai import OpenAI
+
+    client = OpenAI(api_key="bench", base_url=base_url, http_client=httpx.Client(timeout=60.0))
+    latencies = []
+    started = time.perf_counter()
+    for i in range(calls):
+        call_started = time.perf_counter()
+        vector = client.embeddings.create(input=f"query {i}", model="text-embedding-3-small").data[0].embedding
+        time.sleep(qdrant_latency_s)
+        qdrant.query_points(collection_name=collection, query=vector, limit=5)
+        latencies.append(time.perf_counter() - call_started)
+    elapsed = time.perf_counter() - started
+    return {
+        "calls": calls,
+        "throughput": calls / elapsed,
+        "p50_ms": percentile(latencies, 0.50),
+        "p95_ms": percentile(latencies, 0.95),
+    }
+
+
+async def main_async(args):
+    standin, port, standin_stats = await start_embedding_standin(args.dimensions, args.embed_latency_ms / 1000)
+    base_url = f"http://127.0.0.1:{port}/v1"
+    os.environ["OPENAI_API_KEY"] = "bench"
+    os.environ["OPENAI_BASE_URL"] = base_url
+    os.environ["EMBED_CACHE_PERSIST"] = "0"
+
+    import access_llm_memory as server
+    from qdrant_client import AsyncQdrantClient, QdrantClient
+
+    # FastMCP turns on INFO logging; keep per-request httpx lines out of the report
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    collection = server.collection_name
+    async_client, points, vectors_config = seed_points(AsyncQdrantClient, collection, args.dimensions, args.points)
+    await async_client.create_collection(collection_name=collection, vectors_config=vectors_config)
+    await async_client.upsert(collection_name=collection, points=points)
+    server.qdrant = AsyncQdrantStandIn(async_client, args.qdrant_latency_ms / 1000)
+
+    sync_client, points, vectors_config = seed_points(QdrantClient, collection, args.dimensions, args.points)
+    sync_client.create_collection(collection_name=collection, vectors_config=vectors_config)
+    sync_client.upsert(collection_name=collection, points=points)
+
+    results = {
+        "embed_latency_ms": args.embed_latency_ms,
+        "qdrant_latency_ms": args.qdrant_latency_ms,
+    }
+
+    baseline_calls = max(args.concurrency) * args.calls_per_caller // 4 or 1
+    results["sync_serial"] = await asyncio.to_thread(
+        run_sync_baseline, base_url, sync_client, collection, baseline_calls, args.qdrant_latency_ms / 1000
+    )
+    b = results["sync_serial"]
+    print(f"sync (serialised)   {b['throughput']:8.1f} calls/s  p50 {b['p50_ms']:7.1f} ms  p95 {b['p95_ms']:7.1f} ms")
+
+    results["async"] = []
+    for callers in args.concurrency:
+        connections_before = standin_stats["connections"]
+        r = await run_async(server, callers, args.calls_per_caller)
+        r["new_connections"] = standin_stats["connections"] - connections_before
+        results["async"].append(r)
+        print(f"async N={callers:<4}       {r['throughput']:8.1f} calls/s  p50 {r['p50_ms']:7.1f} ms  "
+              f"p95 {r['p95_ms']:7.1f} ms  ({r['new_connections']} new connections)")
+
+    requests_before = standin_stats["requests"]
+    results["batch"] = await run_batch_comparison(server, args.batch_queries, args.batch_rounds)
+    results["batch"]["embedding_requests"] = standin_stats["requests"] - requests_before
+    for mode in ("sequential", "batch"):
+        r = results["batch"][mode]
+        print(f"{args.batch_queries} queries, {mode:<10} p50 {r['p50_ms']:7.1f} ms  p95 {r['p95_ms']:7.1f} ms")
+
+    standin.close()
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"✓ Results written to {args.json_out}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--calls-per-caller", type=int, default=20)
+    parser.add_argument("--embed-latency-ms", type=float, default=80.0)
+    parser.add_argument("--qdrant-latency-ms", type=float, default=5.0)
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--points", type=int, default=2000)
+    parser.add_argument("--batch-queries", type=int, default=5, help="Queries per search_memory_batch call")
+    parser.add_argument("--batch-rounds", type=int, default=10)
+    parser.add_argument("--json", dest="json_out")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Cold start of the memory MCP server over stdio, as an editor launches it.
+
+Each run spawns memory_mcp/access_llm_memory.py with the MCP stdio client and
+times: spawn to initialize handshake, tools/list, and the first search_memory
+call (--mode), issued --idle-ms after tools/list (an editor's first query
+usually comes a few seconds after it connects). The server's own startup report (memory_stats "startup") is
+printed for the last run.
+
+The server runs against stand-ins, so no API key or Qdrant is needed: the
+embeddings stand-in from bench_mcp_concurrency.py (--embed-latency-ms per
+request) and a --points numpy-backend collection in a temporary state dir.
+
+Usage:
+    python benchmarks/bench_mcp_startup.py --runs 5 --mode hybrid
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+sys.path.insert(0, ROOT)
+SERVER = os.path.join(ROOT, "memory_mcp", "access_llm_memory.py")
+COLLECTION = "bench_mcp_startup"
+
+
+def seed_collection(state_dir, points, dimensions):
+    """A numpy-backend chat_messages-like collection with random vectors."""
+    import random
+
+    import storage_profiles
+    import vector_store
+    from qdrant_client.models import PointStruct
+
+    client = vector_store.open_client("numpy", path=os.path.join(state_dir, "vectors"))
+    storage_profiles.create_collection(client, COLLECTION, dict(storage_profiles.get_profile(), dimensions=dimensions))
+    storage_profiles.ensure_payload_indexes(client, COLLECTION)
+    rng = random.Random(2)
+    client.upsert(COLLECTION, points=[
+        PointStruct(
+            id=i,
+            vector=[rng.uniform(-1, 1) for _ in range(dimensions)],
+            payload={"text": f"message {i} about the ingestion checkpoint", "role": "user",
+                     "conversation_id": f"c{i // 10}", "exchange_index": i % 10 + 1},
+        )
+        for i in range(points)
+    ])
+
+
+def tool_json(result):
+    text = "".join(getattr(block, "text", "") for block in result.content)
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+async def cold_start(args):
+    from mcp import ClientSession, StdioServerParameters
+    from mcp.client.stdio import stdio_client
+
+    from bench_mcp_concurrency import start_embedding_standin
+
+    standin, port, _ = await start_embedding_standin(args.dimensions, args.embed_latency_ms / 1000)
+    env = dict(
+        os.environ,
+        OPENAI_API_KEY="bench",
+        OPENAI_BASE_URL=f"http://127.0.0.1:{port}/v1",
+        DEX_BRIDGE_STATE_DIR=args.state_dir,
+        VECTOR_BACKEND="numpy",
+        VECTOR_STORE_PATH=os.path.join(args.state_dir, "vectors"),
+        QDRANT_COLLECTION=COLLECTION,
+        EMBED_CACHE_PERSIST="0",
+    )
+    params = StdioServerParameters(command=sys.executable, args=[SERVER], env=env)
+    timings = {}
+    started = time.perf_counter()
+    with open(os.devnull, "w") as errlog:
+        async with stdio_client(params, errlog=errlog) as (read, write):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                timings["initialize_ms"] = (time.perf_counter() - started) * 1000
+
+                mark = time.perf_counter()
+                await session.list_tools()
+                timings["list_tools_ms"] = (time.perf_counter() - mark) * 1000
+
+                await asyncio.sleep(args.idle_ms / 1000)
+                mark = time.perf_counter()
+                await session.call_tool("search_memory", {"query": args.query, "mode": args.mode})
+                timings["first_query_ms"] = (time.perf_counter() - mark) * 1000
+                timings["spawn_to_first_result_ms"] = (time.perf_counter() - started) * 1000
+
+                stats = tool_json(await session.call_tool("memory_stats", {}))
+    standin.close()
+    return timings, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--mode", default="hybrid", choices=["dense", "hybrid", "lexical"])
+    parser.add_argument("--query", default="ingestion checkpoint")
+    parser.add_argument("--points", type=int, default=2000)
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--embed-latency-ms", type=float, default=150)
+    parser.add_argument("--idle-ms", type=float, default=0, help="Pause between tools/list and the first query")
+    args = parser.parse_args()
+
+    args.state_dir = tempfile.mkdtemp(prefix="bench_mcp_startup_")
+    runs = []
+    stats = None
+    try:
+        seed_collection(args.state_dir, args.points, args.dimensions)
+        for _ in range(args.runs):
+            timings, stats = asyncio.run(cold_start(args))
+            runs.append(timings)
+    finally:
+        shutil.rmtree(args.state_dir, ignore_errors=True)
+
+    print(f"{args.runs} cold starts, first query mode={args.mode}, "
+          f"embeddings stand-in {args.embed_latency_ms:.0f} ms, idle {args.idle_ms:.0f} ms before it\n")
+    for key in runs[0]:
+        values = [run[key] for run in runs]
+        print(f"{key:<26} median {statistics.median(values):8.1f} ms   min {min(values):8.1f}   max {max(values):8.1f}")
+    if isinstance(stats, dict) and "startup" in stats:
+        print(f"\nserver report (last run): {json.dumps(stats['startup'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate suppression on a synthetic message stream.
+
+Messages are either new (filler text from synthetic_streams.py) or planted
+near-duplicates of an earlier message: the same text with whitespace/case
+changes ("repaste"), one sentence replaced ("regenerated"), or a boilerplate
+turn ("thanks"). Every message goes through near_dup.NearDuplicateIndex.check
+as the Ingestor does before embedding; the benchmark reports the embeddings
+saved, detection recall per kind, false positives among new messages, and
+time per check.
+
+Usage:
+    python benchmarks/bench_near_dup.py --messages 20000 --duplicate-share 0.2 --threshold 0.8
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+sys.path.insert(0, ROOT)
+
+BOILERPLATE = ["Thanks!", "thanks", "Thank you!", "ok", "OK.", "Great, thanks", "continue", "Continue."]
+
+
+def repaste(rng, text):
+    """Same text with whitespace and case noise."""
+    words = text.split(" ")
+    return "  ".join(w.upper() if rng.random() < 0.05 else w for w in words) + "\n"
+
+
+def regenerate(rng, text, synthetic_streams):
+    """One sentence replaced, as when an answer is regenerated."""
+    sentences = text.split(". ")
+    sentences[rng.randrange(len(sentences))] = synthetic_streams.sentence(rng, rng.randint(6, 18)).rstrip(".")
+    return ". ".join(sentences)
+
+
+def message_stream(count, duplicate_share, words, seed):
+    """(text, kind) pairs; kind is "new", "repaste", "regenerated" or "thanks"."""
+    import synthetic_streams
+
+    rng = random.Random(seed)
+    originals = []
+    for _ in range(count):
+        roll = rng.random()
+        if originals and roll < duplicate_share:
+            kind = rng.choice(["repaste", "regenerated", "thanks"])
+            if kind == "thanks":
+                yield rng.choice(BOILERPLATE), kind
+            elif kind == "repaste":
+                yield repaste(rng, rng.choice(originals)), kind
+            else:
+                yield regenerate(rng, rng.choice(originals), synthetic_streams), kind
+            continue
+        text = synthetic_streams.paragraph(rng, max(12, int(rng.gauss(words, words / 2))))
+        originals.append(text)
+        yield text, "new"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--duplicate-share", type=float, default=0.2)
+    parser.add_argument("--words", type=int, default=120, help="Mean words per new message")
+    parser.add_argument("--threshold", type=float, default=0.8)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    from near_dup import NearDuplicateIndex
+
+    workdir = tempfile.mkdtemp(prefix="bench_near_dup_")
+    try:
+        index = NearDuplicateIndex(os.path.join(workdir, "near_dup.sqlite"), threshold=args.threshold)
+        seen, caught = Counter(), Counter()
+        check_s = 0.0
+        for i, (text, kind) in enumerate(message_stream(args.messages, args.duplicate_share, args.words, args.seed)):
+            started = time.perf_counter()
+            match = index.check(i, text)
+            check_s += time.perf_counter() - started
+            seen[kind] += 1
+            caught[kind] += match is not None
+        index.commit()
+        stats = index.stats()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    saved = sum(caught.values())
+    print(f"{args.messages:,} messages, {args.duplicate_share:.0%} planted near-duplicates, threshold {args.threshold} "
+          f"({stats['bands']} bands x {stats['rows_per_band']} rows)\n")
+    print(f"embeddings saved   {saved:,} of {args.messages:,} ({saved / args.messages:.1%})")
+    for kind in ("repaste", "regenerated", "thanks"):
+        if seen[kind]:
+            print(f"recall {kind:<11} {caught[kind] / seen[kind]:.1%}  ({caught[kind]:,} of {seen[kind]:,})")
+    # Boilerplate repeats among themselves, so only "new" texts can be false positives
+    print(f"false positives    {caught['new']:,} of {seen['new']:,} new messages")
+    print(f"check latency      {check_s / args.messages * 1000:.3f} ms per message")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+"""
+End-to-end pipeline benchmark on synthetic ChatGPT and Claude streams.
+
+Stages, timed separately:
+  parse   StreamParserAddon / ClaudeStreamParserAddon on replayed mitmproxy
+          flows generated by synthetic_streams.py (latency per flow)
+  merge   merge_conversations() over the parsed captures, --merge-rounds
+          times; later rounds find nothing changed (latency per round)
+  ingest  Ingestor with a feature-hashing fake embedder into in-memory Qdrant,
+          or --vector-backend numpy (latency per conversation)
+  search  search_memory through the MCP server module, with the same embedder
+          and store (latency per query; recall = the query's source
+          conversation is among the hits)
+
+For every stage: items/s, latency percentiles and peak RSS. On Linux the peak
+is per stage (VmHWM, reset through /proc/self/clear_refs); elsewhere it is the
+process peak so far. No network, API key or Qdrant server is needed.
+
+--json writes the results as a baseline; --compare prints the change against
+an earlier one and exits with status 1 if a throughput, latency or RSS figure
+got worse by more than --tolerance.
+
+Usage:
+    python benchmarks/bench_pipeline.py --conversations 40 --exchanges 8 --json pipeline_baseline.json
+    python benchmarks/bench_pipeline.py --conversations 40 --exchanges 8 --compare pipeline_baseline.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import glob
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+import zlib
+from datetime import datetime
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (os.path.join(ROOT, "mitm", "scripts"), os.path.join(ROOT, "memory_mcp"),
+             os.path.join(ROOT, "benchmarks"), ROOT):
+    sys.path.insert(0, path)
+
+PROVIDERS = ("chatgpt.com", "claude.ai")
+STAGES = ("parse", "merge", "ingest", "search")
+COLLECTION = "bench_pipeline"
+
+# Metrics compared with a baseline, and whether a higher value is better
+COMPARED_METRICS = {"throughput_per_s": True, "p50_ms": False, "p95_ms": False, "peak_rss_mb": False}
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+# -- measurement helpers -------------------------------------------------------
+
+def reset_peak_rss():
+    """Start a new peak-RSS window (Linux only). Returns True if the peak is now per stage."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))] * 1000 if values else None
+
+
+def stage_result(unit, items, seconds, latencies, per_stage_rss, **extra):
+    result = {
+        "unit": unit,
+        "items": items,
+        "seconds": round(seconds, 4),
+        "throughput_per_s": round(items / seconds, 2) if seconds else None,
+        "p50_ms": percentile(latencies, 0.50),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+        "max_ms": max(latencies) * 1000 if latencies else None,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "peak_rss_scope": "stage" if per_stage_rss else "process",
+    }
+    for key in ("p50_ms", "p95_ms", "p99_ms", "max_ms"):
+        if result[key] is not None:
+            result[key] = round(result[key], 3)
+    result.update(extra)
+    return result
+
+
+# -- stand-ins -------------------------------------------------------------------
+
+class HashingEmbedder:
+    """
+    OpenAI client stand-in: feature-hashed bag of words, L2-normalised.
+
+    Texts that share words get similar vectors, so searching for words of a
+    stored message finds it, without any network call.
+    """
+
+    def __init__(self, dimensions, latency_s=0.0):
+        import numpy as np
+
+        self.np = np
+        self.dimensions = dimensions
+        self.latency_s = latency_s
+        self.embeddings = self
+        self.requests = 0
+
+    def vector(self, text):
+        vector = self.np.zeros(self.dimensions, dtype=self.np.float32)
+        for token in _TOKEN_RE.findall(text.lower()):
+            h = zlib.crc32(token.encode("utf-8"))
+            vector[h % self.dimensions] += 1.0 if h & 0x80000000 else -1.0
+        norm = self.np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def create(self, input, model=None, dimensions=None, **_):
+        texts = input if isinstance(input, list) else [input]
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        self.requests += 1
+        return SimpleNamespace(data=[
+            SimpleNamespace(index=i, embedding=self.vector(text).tolist()) for i, text in enumerate(texts)
+        ])
+
+
+class AsyncHashingEmbedder:
+    """AsyncOpenAI-shaped wrapper around HashingEmbedder for the MCP server."""
+
+    def __init__(self, embedder):
+        self.embedder = embedder
+        self.embeddings = self
+
+    async def create(self, input, **kwargs):
+        if self.embedder.latency_s:
+            await asyncio.sleep(self.embedder.latency_s)
+        return SimpleNamespace(data=self.embedder.create(input).data)
+
+
+class AsyncStore:
+    """Coroutine facade over the synchronous in-process store the ingestion stage filled."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def __getattr__(self, name):
+        method = getattr(self.client, name)
+
+        async def call(*args, **kwargs):
+            return method(*args, **kwargs)
+
+        return call
+
+
+# -- stages ----------------------------------------------------------------------
+
+def generate(args):
+    import synthetic_streams
+
+    captures = {}
+    for provider in PROVIDERS:
+        captures[provider] = list(synthetic_streams.conversations(
+            provider, args.conversations, args.exchanges, args.user_words, args.assistant_words,
+            seed=args.seed, chunk_chars=tuple(args.chunk_chars),
+        ))
+    return captures
+
+
+def run_parse(captures, per_stage_rss):
+    import capture_claude
+    import capture_req
+    import synthetic_streams
+
+    clock = synthetic_streams.ReplayClock()
+    capture_req.time = capture_claude.time = clock
+    addons = {"chatgpt.com": capture_req.StreamParserAddon(), "claude.ai": capture_claude.ClaudeStreamParserAddon()}
+
+    latencies, total_bytes = [], 0
+    started = time.perf_counter()
+    for provider, conversations in captures.items():
+        addon = addons[provider]
+        for _, exchanges in conversations:
+            for url, request, response, _, _ in exchanges:
+                flow = synthetic_streams.make_flow(url, request, response)
+                total_bytes += len(response)
+                clock.advance()
+                mark = time.perf_counter()
+                addon.responseheaders(flow)
+                addon.response(flow)
+                latencies.append(time.perf_counter() - mark)
+    # Only the addon calls count; building flows is the benchmark's own overhead
+    seconds = sum(latencies)
+    return stage_result(
+        "flows", len(latencies), seconds, latencies, per_stage_rss,
+        mb_per_s=round(total_bytes / seconds / 1e6, 2) if seconds else None,
+        wall_seconds=round(time.perf_counter() - started, 3),
+    )
+
+
+def run_merge(parsed_dir, merged_dir, rounds, expected_exchanges, per_stage_rss):
+    from merge_conversations import merge_conversations
+
+    latencies, summary = [], None
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(rounds):
+            mark = time.perf_counter()
+            summary = merge_conversations(parsed_dir, merged_dir)
+            latencies.append(time.perf_counter() - mark)
+    merged = summary["total_exchanges"] if summary else 0
+    if merged != expected_exchanges:
+        print(f"⚠️  merge produced {merged} exchanges, expected {expected_exchanges}", file=sys.stderr)
+    return stage_result("exchanges", merged * rounds, sum(latencies), latencies, per_stage_rss,
+                        rounds=rounds, exchanges_merged=merged)
+
+
+def open_store(args, workdir):
+    if args.vector_backend == "numpy":
+        import vector_store
+
+        return vector_store.open_client("numpy", path=os.path.join(workdir, "vectors"))
+    from qdrant_client import QdrantClient
+
+    warnings.filterwarnings("ignore", message="Payload indexes have no effect")
+    return QdrantClient(":memory:")
+
+
+def run_ingest(client, embedder, profile, merged_dir, state_dir, per_stage_rss):
+    from ingest_checkpoint import IngestCheckpoint
+    from store_chat_message import Ingestor
+
+    ingestor = Ingestor(
+        collection_name=COLLECTION,
+        profile=profile,
+        qdrant=client,
+        openai_client=embedder,
+        checkpoint=IngestCheckpoint(os.path.join(state_dir, "bench_checkpoint.json")),
+    )
+    latencies = []
+    started = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        ingestor.ensure_collection()
+        for provider in PROVIDERS:
+            for filepath in sorted(glob.glob(os.path.join(merged_dir, provider, "*__conversation_merged.json"))):
+                mark = time.perf_counter()
+                ingestor.store_conversation_file(filepath)
+                latencies.append(time.perf_counter() - mark)
+        ingestor.close()
+    seconds = time.perf_counter() - started
+    return stage_result("messages", ingestor.stats["upserted"], seconds, latencies, per_stage_rss,
+                        conversations=len(latencies), embedding_requests=ingestor.stats["embedding_requests"])
+
+
+def sample_queries(captures, count, seed):
+    """(query, conversation_id) pairs: a run of words from a random stored message."""
+    rng = random.Random(seed)
+    messages = [
+        (text, conversation_id)
+        for conversations in captures.values()
+        for conversation_id, exchanges in conversations
+        for _, _, _, user_text, assistant_text in exchanges
+        for text in (user_text, assistant_text)
+    ]
+    queries = []
+    for _ in range(count):
+        text, conversation_id = rng.choice(messages)
+        words = text.split()
+        start = rng.randrange(max(len(words) - 8, 1))
+        queries.append((" ".join(words[start:start + 8]), conversation_id))
+    return queries
+
+
+async def run_search(client, embedder, profile, queries, args, per_stage_rss):
+    import access_llm_memory as server
+
+    server.qdrant = AsyncStore(client)
+    server.openai = AsyncHashingEmbedder(embedder)
+    server.profile = profile
+    server.collection_name = COLLECTION
+    await server.ensure_clients()
+
+    latencies, found = [], 0
+    for query, conversation_id in queries:
+        mark = time.perf_counter()
+        results = await server.search_memory(query, top_k=args.top_k, mode=args.mode)
+        latencies.append(time.perf_counter() - mark)
+        found += any(result.get("conversation_id") == conversation_id for result in results)
+    return stage_result("queries", len(queries), sum(latencies), latencies, per_stage_rss,
+                        mode=args.mode, top_k=args.top_k, recall=round(found / len(queries), 4) if queries else None)
+
+
+# -- reporting -------------------------------------------------------------------
+
+def print_results(results):
+    for stage in STAGES:
+        r = results["stages"].get(stage)
+        if not r:
+            continue
+        print(f"{stage:<7} {r['items']:>8,} {r['unit']:<10} {r['throughput_per_s']:>11,.1f} /s   "
+              f"p50 {r['p50_ms']:8.3f} ms  p95 {r['p95_ms']:8.3f} ms   peak RSS {r['peak_rss_mb']:7.1f} MB")
+    search = results["stages"].get("search")
+    if search:
+        print(f"\nsearch recall (source conversation in top {search['top_k']}): {search['recall']:.1%}")
+
+
+def compare(results, baseline, tolerance):
+    """Print the change of every compared metric; returns the regressed ones."""
+    print(f"\nvs. baseline {baseline['meta'].get('commit') or '?'} ({baseline['meta'].get('created', '?')}), "
+          f"tolerance {tolerance:.0%}")
+    regressions = []
+    for stage in STAGES:
+        new, old = results["stages"].get(stage), baseline["stages"].get(stage)
+        if not new or not old:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            if metric == "peak_rss_mb" and "process" in (new.get("peak_rss_scope"), old.get("peak_rss_scope")):
+                continue
+            if not old.get(metric) or new.get(metric) is None:
+                continue
+            change = (new[metric] - old[metric]) / old[metric]
+            worse = -change if higher_is_better else change
+            flag = "  ← regression" if worse > tolerance else ""
+            if flag:
+                regressions.append(f"{stage}.{metric}")
+            print(f"  {stage:<7} {metric:<17} {old[metric]:>12,.3f} → {new[metric]:>12,.3f}  {change:+7.1%}{flag}")
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=int, default=40, help="Conversations per provider")
+    parser.add_argument("--exchanges", type=int, default=8, help="Exchanges per conversation")
+    parser.add_argument("--user-words", type=int, default=20)
+    parser.add_argument("--assistant-words", type=int, default=200)
+    parser.add_argument("--chunk-chars", type=int, nargs=2, default=[2, 24], metavar=("MIN", "MAX"),
+                        help="Characters per streamed delta")
+    parser.add_argument("--merge-rounds", type=int, default=3)
+    parser.add_argument("--vector-backend", choices=["memory", "numpy"], default="memory")
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--embed-latency-ms", type=float, default=0, help="Simulated embeddings round trip")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--mode", default="hybrid", choices=["dense", "hybrid", "lexical"])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", dest="json_out", help="Write the results (a baseline) to this file")
+    parser.add_argument("--compare", help="Baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed relative slowdown before flagging")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_pipeline_")
+    state_dir = os.path.join(workdir, "state")
+    # Set before any project module is imported: they read these at import time
+    os.environ.update({
+        "DEX_BRIDGE_STATE_DIR": state_dir,
+        "DEX_BRIDGE_AUTO_PIPELINE": "0",
+        "QDRANT_COLLECTION": COLLECTION,
+        "SEMANTIC_CACHE": "0",
+        "EMBED_CACHE_PERSIST": "0",
+    })
+    cwd = os.getcwd()
+    # The capture addons write to ./parsed_matches
+    os.chdir(workdir)
+    try:
+        import storage_profiles
+
+        profile = dict(storage_profiles.get_profile("default"), dimensions=args.dimensions)
+        embedder = HashingEmbedder(args.dimensions, args.embed_latency_ms / 1000)
+        captures = generate(args)
+        exchange_count = sum(len(exchanges) for conversations in captures.values() for _, exchanges in conversations)
+        print(f"{args.conversations} conversations x {args.exchanges} exchanges per provider "
+              f"({exchange_count:,} exchanges), {args.dimensions} dims, store: {args.vector_backend}\n")
+
+        stages = {}
+        stages["parse"] = run_parse(captures, reset_peak_rss())
+        stages["merge"] = run_merge("parsed_matches", "merged_conversations", args.merge_rounds,
+                                    exchange_count, reset_peak_rss())
+        client = open_store(args, workdir)
+        stages["ingest"] = run_ingest(client, embedder, profile, "merged_conversations", state_dir, reset_peak_rss())
+        queries = sample_queries(captures, args.queries, args.seed)
+        stages["search"] = asyncio.run(run_search(client, embedder, profile, queries, args, reset_peak_rss()))
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": {k: v for k, v in vars(args).items() if k not in ("json_out", "compare")},
+        },
+        "stages": stages,
+    }
+    print_results(results)
+
+    regressions = []
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline["meta"].get("args") != results["meta"]["args"]:
+            print("\n⚠️  baseline was recorded with different arguments; figures may not be comparable")
+        regressions = compare(results, baseline, args.tolerance)
+        print(f"\n{'❌ ' + str(len(regressions)) + ' regression(s): ' + ', '.join(regressions) if regressions else '✓ no regressions'}")
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"✓ Results written to {args.json_out}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Benchmark ingest and filter throughput for a chat_messages-shaped collection.
+
+Builds a synthetic collection (default 1M points) in a local Qdrant server and
+compares:
+  - ingest: one blocking upsert per conversation vs. fixed-size wait=False
+    batches with a final wait=True barrier (what store_chat_message.py does),
+    into a collection without and one with the payload indexes
+  - filters: the dedup lookup and typical search filters, before and after
+    creating the payload indexes (and how long building them took)
+
+--backend numpy/local runs the same phases through vector_store.open_client()
+where no server is available; those backends don't use payload indexes, so
+only the server shows the index effect. 1M points at 1536 dimensions need
+~6 GB for the vectors alone; lower --dim for a smaller machine.
+
+Usage:
+    python benchmarks/bench_qdrant_ingest.py --points 1000000
+    python benchmarks/bench_qdrant_ingest.py --points 100000 --json bench_ingest.json
+    python benchmarks/bench_qdrant_ingest.py --backend numpy --points 1000000 --dim 64
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+
+import numpy as np
+from qdrant_client.models import (
+    DatetimeRange,
+    Distance,
+    FieldCondition,
+    Filter,
+    MatchValue,
+    PayloadSchemaType,
+    PointStruct,
+    VectorParams,
+)
+
+PAYLOAD_INDEXES = {
+    "content_hash": PayloadSchemaType.KEYWORD,
+    "conversation_id": PayloadSchemaType.KEYWORD,
+    "provider": PayloadSchemaType.KEYWORD,
+    "role": PayloadSchemaType.KEYWORD,
+    "timestamp": PayloadSchemaType.DATETIME,
+}
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PROVIDERS = ["chatgpt.com", "claude.ai"]
+MESSAGES_PER_CONVERSATION = 20
+
+
+def synthetic_payload(i):
+    """Payload shaped like the ones store_chat_message.py writes, derived from the point index."""
+    conversation = i // MESSAGES_PER_CONVERSATION
+    ts = 1_700_000_000 + i * 30
+    return {
+        "conversation_id": str(uuid.uuid5(uuid.NAMESPACE_DNS, f"bench-conversation-{conversation}")),
+        "role": "user" if i % 2 == 0 else "assistant",
+        "text": f"synthetic message {i}",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(ts)),
+        "message_id": f"msg-{i}",
+        "model": "bench",
+        "exchange_index": (i % MESSAGES_PER_CONVERSATION) // 2 + 1,
+        "provider": PROVIDERS[conversation % len(PROVIDERS)],
+        "content_hash": hashlib.sha256(f"synthetic message {i}".encode("utf-8")).hexdigest(),
+    }
+
+
+def synthetic_points(start, count, dim, rng):
+    """Build PointStructs with random unit vectors."""
+    vectors = rng.standard_normal((count, dim), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return [
+        PointStruct(id=start + i, vector=vectors[i].tolist(), payload=synthetic_payload(start + i))
+        for i in range(count)
+    ]
+
+
+def create_collection(qdrant, name, dim):
+    if qdrant.collection_exists(name):
+        qdrant.delete_collection(name)
+    qdrant.create_collection(
+        collection_name=name,
+        vectors_config=VectorParams(size=dim, distance=Distance.COSINE),
+    )
+
+
+def create_payload_indexes(qdrant, name):
+    """Create the payload indexes and return how long that took, in seconds."""
+    started = time.perf_counter()
+    for field_name, field_schema in PAYLOAD_INDEXES.items():
+        qdrant.create_payload_index(name, field_name=field_name, field_schema=field_schema, wait=True)
+    return time.perf_counter() - started
+
+
+def ingest(qdrant, name, total, dim, batch_size, blocking):
+    """
+    Ingest `total` synthetic points and return points/second.
+
+    blocking=True mimics the old behaviour: one wait=True upsert per conversation.
+    blocking=False sends batch_size chunks with wait=False and waits once at the end.
+    """
+    rng = np.random.default_rng(42)
+    chunk = MESSAGES_PER_CONVERSATION if blocking else batch_size
+    started = time.perf_counter()
+    sent = 0
+    while sent < total:
+        count = min(chunk, total - sent)
+        points = synthetic_points(sent, count, dim, rng)
+        last = sent + count >= total
+        qdrant.upsert(collection_name=name, points=points, wait=blocking or last)
+        sent += count
+    elapsed = time.perf_counter() - started
+    return total / elapsed
+
+
+def filter_queries(total, samples):
+    """Build the filters we run in practice, using values that exist in the collection."""
+    wanted = random.Random(7).sample(range(total), min(samples, total))
+    queries = [synthetic_payload(i) for i in wanted]
+    return {
+        "content_hash (dedup lookup)": [
+            Filter(must=[FieldCondition(key="content_hash", match=MatchValue(value=p["content_hash"]))])
+            for p in queries
+        ],
+        "conversation_id": [
+            Filter(must=[FieldCondition(key="conversation_id", match=MatchValue(value=p["conversation_id"]))])
+            for p in queries
+        ],
+        "provider + role + timestamp range": [
+            Filter(must=[
+                FieldCondition(key="provider", match=MatchValue(value=p["provider"])),
+                FieldCondition(key="role", match=MatchValue(value="user")),
+                FieldCondition(key="timestamp", range=DatetimeRange(gte=p["timestamp"])),
+            ])
+            for p in queries
+        ],
+    }
+
+
+def run_filters(qdrant, name, queries):
+    """Run each filter as the dedup check does (scroll, limit=1) and return ops/second per filter kind."""
+    results = {}
+    for label, filters in queries.items():
+        started = time.perf_counter()
+        for flt in filters:
+            qdrant.scroll(collection_name=name, scroll_filter=flt, limit=1, with_payload=False)
+        elapsed = time.perf_counter() - started
+        results[label] = len(filters) / elapsed
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", default="server", choices=["server", "local", "numpy"])
+    parser.add_argument("--path", help="directory for the local/numpy backends (default: a temporary one)")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=6333)
+    parser.add_argument("--points", type=int, default=1_000_000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--blocking-points", type=int, default=20_000,
+                        help="points ingested with the old per-conversation blocking upserts")
+    parser.add_argument("--filter-samples", type=int, default=500)
+    parser.add_argument("--collection", default="bench_chat_messages")
+    parser.add_argument("--keep", action="store_true", help="keep the benchmark collections")
+    parser.add_argument("--json", dest="json_out", help="write results to this JSON file")
+    args = parser.parse_args()
+
+    import vector_store
+
+    path = args.path or (tempfile.mkdtemp(prefix="bench_ingest_") if args.backend != "server" else None)
+    qdrant = vector_store.open_client(args.backend, path=path, host=args.host, port=args.port, timeout=300)
+    indexed_collection = f"{args.collection}_indexed"
+    results = {"backend": args.backend, "points": args.points, "dim": args.dim, "batch_size": args.batch_size}
+
+    print(f"Ingest: {args.blocking_points} points, one blocking upsert per conversation")
+    create_collection(qdrant, args.collection, args.dim)
+    results["ingest_blocking_pps"] = ingest(
+        qdrant, args.collection, args.blocking_points, args.dim, args.batch_size, blocking=True
+    )
+    print(f"  {results['ingest_blocking_pps']:.0f} points/s")
+
+    print(f"Ingest: {args.points} points, batches of {args.batch_size} with wait=False + final barrier")
+    create_collection(qdrant, args.collection, args.dim)
+    results["ingest_batched_pps"] = ingest(
+        qdrant, args.collection, args.points, args.dim, args.batch_size, blocking=False
+    )
+    print(f"  {results['ingest_batched_pps']:.0f} points/s")
+
+    print(f"Ingest: {args.points} points, same batches, payload indexes created first")
+    create_collection(qdrant, indexed_collection, args.dim)
+    create_payload_indexes(qdrant, indexed_collection)
+    results["ingest_batched_indexed_pps"] = ingest(
+        qdrant, indexed_collection, args.points, args.dim, args.batch_size, blocking=False
+    )
+    print(f"  {results['ingest_batched_indexed_pps']:.0f} points/s "
+          f"({results['ingest_batched_indexed_pps'] / results['ingest_batched_pps']:.2f}x)")
+    if not args.keep:
+        qdrant.delete_collection(indexed_collection)
+
+    queries = filter_queries(args.points, args.filter_samples)
+
+    print("Filters without payload indexes")
+    results["filters_unindexed_ops"] = run_filters(qdrant, args.collection, queries)
+    for label, ops in results["filters_unindexed_ops"].items():
+        print(f"  {label:<36} {ops:>10.1f} ops/s")
+
+    results["index_build_s"] = create_payload_indexes(qdrant, args.collection)
+    print(f"Payload indexes built in {results['index_build_s']:.1f}s")
+
+    print("Filters with payload indexes")
+    results["filters_indexed_ops"] = run_filters(qdrant, args.collection, queries)
+    for label, ops in results["filters_indexed_ops"].items():
+        speedup = ops / results["filters_unindexed_ops"][label]
+        print(f"  {label:<36} {ops:>10.1f} ops/s  ({speedup:.1f}x)")
+
+    if not args.keep:
+        qdrant.delete_collection(args.collection)
+        if path and not args.path:
+            shutil.rmtree(path, ignore_errors=True)
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"✓ Results written to {args.json_out}")
+
+
+if __name__ == "__main__":
+    main()
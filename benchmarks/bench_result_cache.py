@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Semantic result cache on a synthetic chatty-agent query stream.
+
+An agent session is simulated as a handful of topics; every query is either an
+exact repeat, a paraphrase (the topic vector plus noise, cosine ~0.90-1.0 to
+it) or a new topic. Each query goes through result_cache.SemanticResultCache in
+front of a numpy-backend collection (vector_store.py) and the benchmark reports
+hit / near-hit rates, vector-store calls saved, mean latency with and without
+the cache, and recall@k of the served results against an uncached search.
+Every --bump-every queries the collection version is bumped, as ingestion does.
+
+Usage:
+    python benchmarks/bench_result_cache.py --points 100000 --queries 2000 --threshold 0.95
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "memory_mcp"))
+sys.path.insert(0, ROOT)
+
+
+def unit(np, vectors):
+    return vectors / np.linalg.norm(vectors, axis=-1, keepdims=True)
+
+
+def load_collection(np, client, name, points, dimensions):
+    from qdrant_client.models import Distance, PointStruct, VectorParams
+
+    client.create_collection(name, vectors_config=VectorParams(size=dimensions, distance=Distance.COSINE))
+    rng = np.random.default_rng(3)
+    for start in range(0, points, 4096):
+        size = min(4096, points - start)
+        vectors = rng.standard_normal((size, dimensions), dtype=np.float32)
+        client.upsert(name, points=[
+            PointStruct(id=start + i, vector=vectors[i].tolist(), payload={"text": f"message {start + i}"})
+            for i in range(size)
+        ])
+
+
+def query_stream(np, count, dimensions, topics, repeat_share, paraphrase_share, noise):
+    """(vector, kind) pairs: kind is "repeat", "paraphrase" or "new"."""
+    rng = np.random.default_rng(5)
+    seen = [unit(np, rng.standard_normal(dimensions).astype(np.float32)) for _ in range(topics)]
+    issued = []
+    for _ in range(count):
+        roll = rng.random()
+        if issued and roll < repeat_share:
+            yield issued[rng.integers(len(issued))], "repeat"
+            continue
+        if roll < repeat_share + paraphrase_share:
+            base = seen[rng.integers(len(seen))]
+            vector = unit(np, base + rng.standard_normal(dimensions).astype(np.float32) * rng.uniform(0, noise))
+            kind = "paraphrase"
+        else:
+            vector = unit(np, rng.standard_normal(dimensions).astype(np.float32))
+            seen.append(vector)
+            kind = "new"
+        issued.append(vector)
+        yield vector, kind
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, default=100_000)
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--topics", type=int, default=20, help="Topics the session starts with")
+    parser.add_argument("--repeat-share", type=float, default=0.2)
+    parser.add_argument("--paraphrase-share", type=float, default=0.5)
+    parser.add_argument("--noise", type=float, default=0.012,
+                        help="Max per-dimension noise of a paraphrase (0.012 at 1536 dims ~ cosine 0.90 at most)")
+    parser.add_argument("--threshold", type=float, default=0.95)
+    parser.add_argument("--cache-size", type=int, default=256)
+    parser.add_argument("--bump-every", type=int, default=500, help="Bump the collection version every N queries")
+    args = parser.parse_args()
+
+    import numpy as np
+    import vector_store
+    from result_cache import SemanticResultCache
+
+    workdir = tempfile.mkdtemp(prefix="bench_result_cache_")
+    try:
+        client = vector_store.open_client("numpy", path=workdir)
+        load_collection(np, client, "bench", args.points, args.dimensions)
+        cache = SemanticResultCache(max_entries=args.cache_size, threshold=args.threshold)
+
+        def search(vector):
+            return client.query_points("bench", query=vector.tolist(), limit=args.k, with_payload=True).points
+
+        version = 0
+        cached_s = uncached_s = 0.0
+        store_calls = 0
+        recall_sum = {"repeat": [0.0, 0], "paraphrase": [0.0, 0]}
+        for n, (vector, kind) in enumerate(query_stream(
+            np, args.queries, args.dimensions, args.topics, args.repeat_share, args.paraphrase_share, args.noise,
+        ), start=1):
+            if n % args.bump_every == 0:
+                version += 1
+
+            started = time.perf_counter()
+            points = cache.get(vector, (args.k, ()), version)
+            if points is None:
+                points = search(vector)
+                store_calls += 1
+                cache.put(vector, (args.k, ()), version, points)
+            cached_s += time.perf_counter() - started
+
+            started = time.perf_counter()
+            exact = search(vector)
+            uncached_s += time.perf_counter() - started
+
+            if kind in recall_sum:
+                exact_ids = {p.id for p in exact}
+                recall_sum[kind][0] += len(exact_ids & {p.id for p in points}) / len(exact_ids)
+                recall_sum[kind][1] += 1
+
+        stats = cache.snapshot()
+        print(f"{args.points:,} points x {args.dimensions} dims, {args.queries:,} queries, "
+              f"threshold {args.threshold}, version bumped every {args.bump_every} queries\n")
+        print(f"hit rate       {stats['hit_rate']:.1%}   near-hit rate {stats['near_hit_rate']:.1%}   "
+              f"invalidations {stats['invalidations']}   evictions {stats['evictions']}")
+        print(f"store calls    {store_calls:,} of {args.queries:,} ({1 - store_calls / args.queries:.1%} saved)")
+        print(f"mean latency   {cached_s / args.queries * 1000:.2f} ms with cache, "
+              f"{uncached_s / args.queries * 1000:.2f} ms without")
+        for kind, (total, count) in recall_sum.items():
+            if count:
+                print(f"recall@{args.k} ({kind}s) {total / count:.3f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Compare the search_memory response before and after result formatting.
+
+Builds synthetic ScoredPoints shaped like stored chat messages (long assistant
+answers, hashes, ids) and serialises them the way FastMCP does
+(pydantic_core.to_json, indent=2): once as the raw points with their full
+payload, once through result_format.format_results.
+
+Usage:
+    python benchmarks/bench_result_format.py --top-k 5 --text-chars 6000
+"""
+
+import argparse
+import hashlib
+import os
+import random
+import sys
+import time
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "memory_mcp"))
+sys.path.insert(0, ROOT)
+
+WORDS = (
+    "the a vector index query payload cluster shard replica latency budget snippet "
+    "token context agent memory conversation model embedding cosine quantisation "
+    "python async request response cache throughput"
+).split()
+
+
+def synthetic_text(rng, chars, needle):
+    """Paragraphs of filler sentences with the query phrase somewhere in the middle."""
+    sentences = []
+    while sum(len(s) for s in sentences) < chars:
+        words = [rng.choice(WORDS) for _ in range(rng.randint(8, 20))]
+        sentences.append(" ".join(words).capitalize() + ".")
+    sentences.insert(rng.randint(len(sentences) // 3, 2 * len(sentences) // 3), needle)
+    return " ".join(sentences)
+
+
+def synthetic_points(top_k, text_chars, query):
+    from qdrant_client.models import ScoredPoint
+
+    rng = random.Random(0)
+    points = []
+    for i in range(top_k):
+        text = synthetic_text(rng, text_chars, f"We decided the {query} should use a write-ahead log.")
+        points.append(ScoredPoint(
+            id=str(uuid.uuid4()),
+            version=1,
+            score=0.9 - i * 0.01,
+            payload={
+                "conversation_id": str(uuid.uuid4()),
+                "role": "assistant",
+                "text": text,
+                "timestamp": "2025-01-01T12:00:00",
+                "message_id": str(uuid.uuid4()),
+                "model": "gpt-4o",
+                "exchange_index": i,
+                "provider": "chatgpt.com",
+                "content_hash": hashlib.sha256(text.encode()).hexdigest(),
+            },
+        ))
+    return points
+
+
+def measure(label, build, repeat):
+    import pydantic_core
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = build()
+    build_ms = (time.perf_counter() - started) / repeat * 1000
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        body = pydantic_core.to_json(result, fallback=str, indent=2)
+    serialise_ms = (time.perf_counter() - started) / repeat * 1000
+
+    print(f"{label:<12} {len(body):>9,} bytes  ~{len(body) // 4:>6,} tokens  "
+          f"format {build_ms:6.3f} ms  serialise {serialise_ms:6.3f} ms")
+    return len(body), serialise_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--text-chars", type=int, default=6000, help="Length of each stored message")
+    parser.add_argument("--max-chars", type=int, default=4000, help="Snippet budget per call")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    import result_format
+
+    query = "ingestion checkpoint"
+    points = synthetic_points(args.top_k, args.text_chars, query)
+
+    raw_bytes, raw_ms = measure("raw points", lambda: points, args.repeat)
+    compact_bytes, compact_ms = measure(
+        "formatted", lambda: result_format.format_results(points, query, args.max_chars), args.repeat
+    )
+    print(f"→ {raw_bytes / compact_bytes:.1f}x smaller, serialised {raw_ms / compact_ms:.1f}x faster")
+
+    hit = result_format.format_results(points, query, args.max_chars)[0]
+    print(f"\nTop snippet ({len(hit['text'])} of {hit.get('full_length', len(hit['text']))} chars):")
+    print(f"  {hit['text'][:300]}")
+
+
+if __name__ == "__main__":
+    main()
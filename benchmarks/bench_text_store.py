@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Payload size with and without the message text, and the cost of the text store.
+
+Builds payloads shaped like store_chat_message.py's (short user prompts, long
+assistant answers from synthetic_streams.py) and reports, extrapolated to 1M
+points: the Qdrant payload bytes with the text inline and with LEAN_PAYLOADS,
+the text store's size with zstd and zlib, write throughput, and the latency of
+hydrating a top-k result page from the store.
+
+Synthetic filler repeats a small vocabulary, so compression ratios here are
+optimistic; `python text_store.py stats` reports them for real messages.
+
+Usage:
+    python benchmarks/bench_text_store.py --messages 20000 --top-k 5
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+sys.path.insert(0, ROOT)
+
+
+def synthetic_messages(count, user_words, assistant_words, seed):
+    """(point_id, payload) pairs alternating user and assistant messages."""
+    import synthetic_streams
+
+    rng = random.Random(seed)
+    for i in range(count):
+        role = "user" if i % 2 == 0 else "assistant"
+        mean = user_words if role == "user" else assistant_words
+        text = synthetic_streams.paragraph(rng, max(3, int(rng.gauss(mean, mean / 2))))
+        yield str(uuid.UUID(int=rng.getrandbits(128))), {
+            "conversation_id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "role": role,
+            "text": text,
+            "timestamp": "2025-01-01T12:00:00",
+            "message_id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "model": "gpt-4o",
+            "exchange_index": i // 2 + 1,
+            "provider": "chatgpt.com",
+            "content_hash": hashlib.sha256(text.encode("utf-8")).hexdigest(),
+        }
+
+
+def json_bytes(payload):
+    return len(json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--user-words", type=int, default=40)
+    parser.add_argument("--assistant-words", type=int, default=300)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    import text_store
+
+    messages = list(synthetic_messages(args.messages, args.user_words, args.assistant_words, args.seed))
+    full = sum(json_bytes(payload) for _, payload in messages) / len(messages)
+    lean = sum(json_bytes(text_store.lean_payload(payload)) for _, payload in messages) / len(messages)
+    raw = sum(len(payload["text"].encode("utf-8")) for _, payload in messages) / len(messages)
+
+    print(f"{args.messages:,} messages, mean text {raw:,.0f} bytes; sizes per 1M points "
+          f"(N bytes per point = N MB)\n")
+    print(f"payload, text inline   {full:8,.0f} MB")
+    print(f"payload, lean          {lean:8,.0f} MB   ({full - lean:,.0f} MB less, {1 - lean / full:.0%})")
+
+    codecs = ["zstd", "zlib"] if text_store.zstandard is not None else ["zlib"]
+    workdir = tempfile.mkdtemp(prefix="bench_text_store_")
+    rng = random.Random(args.seed)
+    try:
+        for codec in codecs:
+            # The codec is picked at import; force the fallback for the zlib row
+            saved = text_store.zstandard
+            if codec == "zlib":
+                text_store.zstandard = None
+                text_store.CODEC = "zlib"
+            try:
+                store = text_store.TextStore(os.path.join(workdir, f"{codec}.sqlite"))
+                started = time.perf_counter()
+                for start in range(0, len(messages), 64):
+                    store.put_many((point_id, payload["text"]) for point_id, payload in messages[start:start + 64])
+                write_s = time.perf_counter() - started
+                stats = store.stats()
+
+                ids = [point_id for point_id, _ in messages]
+                latencies = []
+                for _ in range(args.lookups):
+                    page = [SimpleNamespace(id=point_id, payload={}) for point_id in rng.sample(ids, args.top_k)]
+                    started = time.perf_counter()
+                    text_store.hydrate(page, store)
+                    latencies.append(time.perf_counter() - started)
+                latencies.sort()
+                store.close()
+                # Closing checkpoints the WAL into the database file
+                file_bytes = os.path.getsize(store.path)
+            finally:
+                text_store.zstandard = saved
+                text_store.CODEC = "zstd" if saved is not None else "zlib"
+
+            print(f"text store, {codec:<5}     {stats['stored_bytes'] / len(messages):8,.0f} MB   "
+                  f"({stats['raw_bytes'] / stats['stored_bytes']:.1f}x; {file_bytes / len(messages):,.0f} MB "
+                  f"with SQLite overhead)  write {len(messages) / write_s:,.0f} texts/s  "
+                  f"hydrate top-{args.top_k} p50 {latencies[len(latencies) // 2] * 1000:.3f} ms "
+                  f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:.3f} ms")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Query latency of the vector backends on the same synthetic collection.
+
+Loads --points random unit vectors (with chat-message-like payloads) into each
+selected backend through vector_store.open_client(), then times top-k queries,
+unfiltered, filtered on provider (half the points) and filtered on one
+conversation. The server backend needs a running Qdrant
+(it is skipped if none answers); "local" is Qdrant's pure-Python local mode and
+gets slow quickly beyond ~20k points.
+
+Usage:
+    python benchmarks/bench_vector_backends.py --points 200000 --dimensions 1536 --backends numpy server
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def synthetic_batches(np, count, dimensions, batch_size):
+    from qdrant_client.models import PointStruct
+
+    rng = np.random.default_rng(7)
+    providers = ["chatgpt.com", "claude.ai"]
+    for start in range(0, count, batch_size):
+        size = min(batch_size, count - start)
+        vectors = rng.standard_normal((size, dimensions), dtype=np.float32)
+        yield [
+            PointStruct(
+                id=start + i,
+                vector=vectors[i].tolist(),
+                payload={
+                    "conversation_id": f"conv-{(start + i) // 20}",
+                    "provider": providers[(start + i) % 2],
+                    "role": "user" if i % 2 == 0 else "assistant",
+                    "exchange_index": ((start + i) % 20) // 2 + 1,
+                    "timestamp": f"2025-01-{1 + (start + i) % 28:02d}T12:00:00",
+                    "text": f"synthetic message {start + i}",
+                },
+            )
+            for i in range(size)
+        ]
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))] * 1000
+
+
+def bench_backend(name, client, args, np):
+    import storage_profiles
+    from qdrant_client.models import FieldCondition, Filter, MatchValue
+
+    collection = "bench_vector_backends"
+    if client.collection_exists(collection):
+        client.delete_collection(collection)
+    profile = dict(storage_profiles.get_profile("default"), dimensions=args.dimensions)
+    storage_profiles.create_collection(client, collection, profile)
+    storage_profiles.ensure_payload_indexes(client, collection)
+
+    # Only the upsert calls are timed, not building the synthetic points
+    load_s = 0.0
+    for batch in synthetic_batches(np, args.points, args.dimensions, args.batch_size):
+        started = time.perf_counter()
+        client.upsert(collection_name=collection, points=batch, wait=False)
+        load_s += time.perf_counter() - started
+    started = time.perf_counter()
+    client.upsert(collection_name=collection, points=batch[-1:], wait=True)
+    load_s += time.perf_counter() - started
+
+    rng = np.random.default_rng(11)
+    queries = rng.standard_normal((args.queries, args.dimensions), dtype=np.float32).tolist()
+    only_claude = Filter(must=[FieldCondition(key="provider", match=MatchValue(value="claude.ai"))])
+    one_conversation = Filter(must=[FieldCondition(key="conversation_id", match=MatchValue(value="conv-42"))])
+
+    results = {"load_points_per_s": args.points / load_s}
+    for label, query_filter in (("unfiltered", None), ("provider", only_claude), ("conversation", one_conversation)):
+        client.query_points(collection_name=collection, query=queries[0], query_filter=query_filter, limit=args.k)
+        latencies = []
+        for query in queries:
+            started = time.perf_counter()
+            client.query_points(collection_name=collection, query=query, query_filter=query_filter,
+                                limit=args.k, with_payload=True)
+            latencies.append(time.perf_counter() - started)
+        results[label] = (percentile(latencies, 0.5), percentile(latencies, 0.95))
+
+    print(f"{name:<8} load {results['load_points_per_s']:>9,.0f} pts/s   " + "   ".join(
+        f"{label} p50 {results[label][0]:7.2f} ms p95 {results[label][1]:7.2f} ms"
+        for label in ("unfiltered", "provider", "conversation")
+    ))
+    client.delete_collection(collection)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, default=200_000)
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=1024)
+    parser.add_argument("--backends", nargs="+", default=["numpy", "server"], choices=["numpy", "local", "server"])
+    args = parser.parse_args()
+
+    import numpy as np
+    import vector_store
+
+    print(f"{args.points:,} points x {args.dimensions} dims, top-{args.k}, {args.queries} queries per case\n")
+    workdir = tempfile.mkdtemp(prefix="bench_vector_backends_")
+    try:
+        for backend in args.backends:
+            client = vector_store.open_client(backend, path=os.path.join(workdir, backend))
+            if backend == "server":
+                try:
+                    client.get_collections()
+                except Exception as e:
+                    print(f"server   skipped: no Qdrant server reachable ({str(e)[:60]})")
+                    continue
+            bench_backend(backend, client, args, np)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""
+Synthetic ChatGPT and Claude captures for the benchmarks.
+
+Produces what the mitmproxy addons see on the wire: the ChatGPT
+/backend-api/f/conversation SSE stream (the "v1" delta-encoding marker,
+input_message, the assistant "add" event, then appends to
+/message/content/parts/0, mostly as bare {"v": ...} events) and the
+Claude .../completion SSE stream (message_start, content_block_delta
+text_delta chunks, message_stop) together with its JSON request body.
+Conversations, message lengths and chunk sizes are configurable and seeded,
+so two runs with the same arguments replay identical bytes.
+"""
+
+import json
+import random
+import time as _time
+import uuid
+from datetime import datetime, timedelta
+
+WORDS = (
+    "the a of to and in is for on with that this it as be are by from at or an we "
+    "vector index query payload collection shard replica latency budget snippet token "
+    "context agent memory conversation model embedding cosine quantisation python async "
+    "request response cache throughput stream parser merge checkpoint ingestion proxy "
+    "certificate timeout retry batch upsert filter schema migration benchmark regression"
+).split()
+
+IDENTIFIERS = [
+    "store_chat_message.py", "E11000", "ECONNRESET", "HTTP_429", "ingest_checkpoint.json",
+    "query_points", "content_block_delta", "max_retries=3", "0x7f3a", "ValueError",
+]
+
+CHATGPT_URL = "https://chatgpt.com/backend-api/f/conversation"
+CLAUDE_URL = "https://claude.ai/api/organizations/{org}/chat_conversations/{conversation}/completion"
+
+
+def sentence(rng, words):
+    tokens = [rng.choice(WORDS) for _ in range(words)]
+    if rng.random() < 0.3:
+        tokens[rng.randrange(len(tokens))] = rng.choice(IDENTIFIERS)
+    return " ".join(tokens).capitalize() + "."
+
+
+def paragraph(rng, words):
+    """About `words` words of filler sentences."""
+    sentences = []
+    total = 0
+    while total < words:
+        n = rng.randint(6, 18)
+        sentences.append(sentence(rng, n))
+        total += n
+    return " ".join(sentences)
+
+
+def chunks(rng, text, min_chars, max_chars):
+    """Split text the way streaming APIs do: small, uneven pieces."""
+    start = 0
+    while start < len(text):
+        end = min(len(text), start + rng.randint(min_chars, max_chars))
+        yield text[start:end]
+        start = end
+
+
+def sse(events, named=False):
+    """SSE body; Claude names every event, ChatGPT sends bare data lines."""
+    blocks = []
+    for event in events:
+        data = event if isinstance(event, str) else json.dumps(event, ensure_ascii=False)
+        if named and isinstance(event, dict):
+            blocks.append(f"event: {event['type']}\ndata: {data}")
+        else:
+            blocks.append(f"data: {data}")
+    return "\n\n".join(blocks) + "\n\n"
+
+
+def chatgpt_exchange(rng, conversation_id, parent_id, user_text, assistant_text, chunk_chars=(2, 24)):
+    """(request_body, response_body, user_message_id, assistant_message_id) for one ChatGPT turn."""
+    user_id, assistant_id = str(uuid.UUID(int=rng.getrandbits(128))), str(uuid.UUID(int=rng.getrandbits(128)))
+    request_id = str(uuid.UUID(int=rng.getrandbits(128)))
+    events = [
+        "\"v1\"",
+        {
+            "type": "input_message",
+            "input_message": {
+                "id": user_id,
+                "author": {"role": "user"},
+                "create_time": 1735722000.0 + rng.random() * 86400,
+                "content": {"content_type": "text", "parts": [user_text]},
+                "metadata": {
+                    "request_id": request_id,
+                    "turn_exchange_id": str(uuid.UUID(int=rng.getrandbits(128))),
+                    "parent_id": parent_id,
+                },
+            },
+            "conversation_id": conversation_id,
+        },
+        {
+            "p": "",
+            "o": "add",
+            "v": {
+                "message": {
+                    "id": assistant_id,
+                    "author": {"role": "assistant"},
+                    "content": {"content_type": "text", "parts": [""]},
+                    "status": "in_progress",
+                    "metadata": {"model_slug": "gpt-4o", "parent_id": user_id},
+                },
+                "conversation_id": conversation_id,
+            },
+            "c": 0,
+        },
+        {
+            "type": "server_ste_metadata",
+            "metadata": {"model_slug": "gpt-4o", "is_first_turn": parent_id is None, "message_id": assistant_id,
+                         "request_id": request_id},
+            "conversation_id": conversation_id,
+        },
+    ]
+    pieces = list(chunks(rng, assistant_text, *chunk_chars))
+    if pieces:
+        events.append({"p": "/message/content/parts/0", "o": "append", "v": pieces[0]})
+    i = 1
+    while i < len(pieces):
+        # Mostly bare {"v": ...} events that carry over the last path and op, with
+        # patch events of one to three appends in between
+        if rng.random() < 0.7:
+            events.append({"v": pieces[i]})
+            i += 1
+            continue
+        batch = pieces[i:i + rng.randint(1, 3)]
+        i += len(batch)
+        events.append({
+            "o": "patch",
+            "v": [{"p": "/message/content/parts/0", "o": "append", "v": piece} for piece in batch],
+        })
+    events.append({"o": "patch", "v": [{"p": "/message/status", "o": "replace", "v": "finished_successfully"}]})
+    events.append({"type": "message_stream_complete", "conversation_id": conversation_id})
+    events.append("[DONE]")
+
+    request = {"action": "next", "conversation_id": conversation_id, "parent_message_id": parent_id,
+               "model": "auto", "messages": [{"id": user_id, "content": {"parts": [user_text]}}]}
+    return json.dumps(request), sse(events), user_id, assistant_id
+
+
+def claude_exchange(rng, parent_uuid, user_text, assistant_text, chunk_chars=(2, 24)):
+    """(request_body, response_body, human_uuid, assistant_uuid) for one Claude turn."""
+    human_uuid, assistant_uuid = str(uuid.UUID(int=rng.getrandbits(128))), str(uuid.UUID(int=rng.getrandbits(128)))
+    events = [
+        {
+            "type": "message_start",
+            "message": {
+                "id": f"chatcompl_{rng.getrandbits(64):016x}",
+                "type": "message",
+                "role": "assistant",
+                "model": "claude-sonnet-4-5",
+                "parent_uuid": human_uuid,
+                "uuid": assistant_uuid,
+                "content": [],
+                "stop_reason": None,
+            },
+        },
+        {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": "", "citations": []}},
+    ]
+    for piece in chunks(rng, assistant_text, *chunk_chars):
+        events.append({"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": piece}})
+    events += [
+        {"type": "content_block_stop", "index": 0},
+        {"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None}},
+        {"type": "message_stop"},
+    ]
+    request = {"prompt": user_text, "parent_message_uuid": parent_uuid, "timezone": "UTC",
+               "rendering_mode": "messages", "attachments": [], "files": []}
+    return json.dumps(request), sse(events, named=True), human_uuid, assistant_uuid
+
+
+def conversations(provider, count, exchanges, user_words=20, assistant_words=200, seed=0, chunk_chars=(2, 24)):
+    """
+    Yield (conversation_id, [(url, request_body, response_body, user_text, assistant_text), ...]).
+
+    `exchanges` may be an int or a (min, max) range per conversation.
+    """
+    rng = random.Random(f"{provider}:{seed}")
+    org = str(uuid.UUID(int=rng.getrandbits(128)))
+    for _ in range(count):
+        conversation_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        turns = exchanges if isinstance(exchanges, int) else rng.randint(*exchanges)
+        parent = None
+        captured = []
+        for _ in range(turns):
+            user_text = paragraph(rng, max(1, int(rng.gauss(user_words, user_words / 3))))
+            assistant_text = paragraph(rng, max(1, int(rng.gauss(assistant_words, assistant_words / 3))))
+            if provider == "chatgpt.com":
+                request, response, _, parent = chatgpt_exchange(
+                    rng, conversation_id, parent, user_text, assistant_text, chunk_chars)
+                url = CHATGPT_URL
+            else:
+                request, response, _, parent = claude_exchange(rng, parent, user_text, assistant_text, chunk_chars)
+                url = CLAUDE_URL.format(org=org, conversation=conversation_id)
+            captured.append((url, request, response, user_text, assistant_text))
+        yield conversation_id, captured
+
+
+def make_flow(url, request_body, response_body):
+    """A finished mitmproxy HTTPFlow carrying one captured exchange."""
+    from mitmproxy import http
+    from mitmproxy.test import tflow
+
+    request = http.Request.make("POST", url, request_body.encode("utf-8"), {"content-type": "application/json"})
+    response = http.Response.make(200, response_body.encode("utf-8"), {"content-type": "text/event-stream"})
+    return tflow.tflow(req=request, resp=response)
+
+
+class ReplayClock:
+    """
+    Stand-in for the `time` module inside the capture addons.
+
+    The addons stamp captures and name their files with time.strftime at
+    second resolution, so replaying a conversation within one real second
+    would overwrite its captures. strftime() here formats a simulated time
+    that advance() moves forward between exchanges; time() stays real, so
+    the addons' trace spans measure actual durations.
+    """
+
+    def __init__(self, start=datetime(2025, 1, 1, 9, 0, 0), step=timedelta(minutes=1)):
+        self.now = start
+        self.step = step
+
+    def advance(self):
+        self.now += self.step
+
+    def strftime(self, fmt, *args):
+        return self.now.strftime(fmt)
+
+    def time(self):
+        return _time.time()
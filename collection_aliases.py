@@ -0,0 +1,73 @@
+"""
+Versioned collections behind a stable alias.
+
+Ingestion and the MCP server address `chat_messages`, which is an alias for
+the collection currently serving (`chat_messages_v1`, `chat_messages_v2`, ...).
+A re-index (migrate_collection.py --reindex) builds the next version next to
+the live one and then repoints the alias in a single update_collection_aliases
+call, so searches never see a missing or half-built collection.
+
+Installs from before aliases have a real collection named `chat_messages`.
+The first re-index copies it into `chat_messages_v1`; the old collection then
+has to be deleted before the alias can take its name, which leaves a window of
+a few milliseconds in which the name resolves to nothing.
+"""
+
+import re
+
+import storage_profiles
+
+
+def versioned_name(alias, version):
+    return f"{alias}_v{version}"
+
+
+def resolve(qdrant, name):
+    """Collection that `name` points to, or `name` itself if it isn't an alias."""
+    for alias in qdrant.get_aliases().aliases:
+        if alias.alias_name == name:
+            return alias.collection_name
+    return name
+
+
+def is_alias(qdrant, name):
+    return resolve(qdrant, name) != name
+
+
+def versions(qdrant, alias):
+    """Version numbers of the existing `<alias>_vN` collections, ascending."""
+    pattern = re.compile(re.escape(alias) + r"_v(\d+)$")
+    found = []
+    for collection in qdrant.get_collections().collections:
+        match = pattern.match(collection.name)
+        if match:
+            found.append(int(match.group(1)))
+    return sorted(found)
+
+
+def next_version_name(qdrant, alias):
+    existing = versions(qdrant, alias)
+    return versioned_name(alias, (existing[-1] if existing else 0) + 1)
+
+
+def create_versioned(qdrant, alias, profile):
+    """Fresh install: create `<alias>_v1` with `profile` and point `alias` at it. Returns the collection name."""
+    target = next_version_name(qdrant, alias)
+    storage_profiles.create_collection(qdrant, target, profile)
+    point_alias(qdrant, alias, target)
+    storage_profiles.record_profile(alias, profile["name"])
+    return target
+
+
+def point_alias(qdrant, alias, target):
+    """
+    Point `alias` at `target`, replacing any previous target in the same
+    request (Qdrant applies the operations of one call atomically).
+    """
+    from qdrant_client.models import CreateAlias, CreateAliasOperation, DeleteAlias, DeleteAliasOperation
+
+    operations = []
+    if is_alias(qdrant, alias):
+        operations.append(DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=alias)))
+    operations.append(CreateAliasOperation(create_alias=CreateAlias(collection_name=target, alias_name=alias)))
+    qdrant.update_collection_aliases(change_aliases_operations=operations)
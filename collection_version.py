@@ -0,0 +1,51 @@
+"""
+Change counter for the chat_messages collection.
+
+Ingestion bumps the counter after every batch it sends to Qdrant (and once
+more after the final, waited-for flush); the MCP server reads it before each
+search and drops its cached results when the value has moved. Only equality
+is ever compared, so a missing file simply reads as version 0.
+
+Bumps come from several threads (store_providers, import workers) and from
+other processes (the capture pipeline, migrations), so the read-increment-write
+runs under a process-wide lock plus an flock on a sidecar `.lock` file.
+"""
+
+import os
+import uuid
+import fcntl
+import threading
+
+from storage_profiles import STATE_DIR
+
+_bump_lock = threading.Lock()
+
+
+def version_path(collection_name):
+    return os.path.join(STATE_DIR, f"{collection_name}.version")
+
+
+def read_version(collection_name):
+    """Current version of the collection (0 if it was never bumped)."""
+    try:
+        with open(version_path(collection_name), "r", encoding="utf-8") as f:
+            return int(f.read().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def bump_version(collection_name):
+    """Increment the collection's version and write it atomically. Returns the new version."""
+    path = version_path(collection_name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with _bump_lock, open(f"{path}.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            version = read_version(collection_name) + 1
+            tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(str(version))
+            os.replace(tmp_path, path)
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+    return version
@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""
+Backfill the chat_messages collection from official ChatGPT / Claude data exports.
+
+The export's conversations.json (or the .zip it comes in) is a single JSON
+array, often hundreds of MB. It is read one conversation at a time, so memory
+stays bounded by the largest conversation and the work queue, not the file:
+
+- ChatGPT conversations are walked along their `mapping` tree from
+  `current_node` back to the root (the branch the UI shows), skipping hidden,
+  system and tool messages.
+- Claude conversations are walked along `chat_messages`, following
+  `parent_message_uuid` from the newest message when present.
+
+Both become the exchange dicts merge_conversations.py writes, and go through
+the same Ingestor as captured conversations. Worker threads fill embeddings
+requests across conversations. Every --commit-every conversations a worker
+waits for its upserts and advances STATE_DIR/import_checkpoint.json, so an
+interrupted import resumes where it stopped. A re-export only ingests the
+conversations, and the exchanges within them, that are new.
+
+Usage:
+    python import_export.py ~/Downloads/chatgpt-export.zip --workers 4
+    python import_export.py conversations.json --provider claude.ai --dry-run
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import queue
+import zipfile
+import argparse
+import threading
+from collections import namedtuple
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from storage_profiles import STATE_DIR
+from ingest_checkpoint import IngestCheckpoint
+from store_chat_message import Ingestor
+
+IMPORT_CHECKPOINT_FILE = os.path.join(STATE_DIR, "import_checkpoint.json")
+
+# Stands in for os.stat() in IngestCheckpoint: a conversation counts as unchanged
+# while its update time and exchange count are the same as at the last import
+ConversationStamp = namedtuple("ConversationStamp", ["st_mtime_ns", "st_size"])
+
+
+# -- streaming the export -----------------------------------------------------------
+
+def open_export(path):
+    """Text stream of conversations.json, read straight out of the export .zip if given one."""
+    if zipfile.is_zipfile(path):
+        archive = zipfile.ZipFile(path)
+        names = [n for n in archive.namelist() if os.path.basename(n) == "conversations.json"]
+        if not names:
+            raise ValueError(f"{path} has no conversations.json")
+        return io.TextIOWrapper(archive.open(names[0]), encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def iter_json_array(f, chunk_size=1 << 20):
+    """
+    Yield the elements of a top-level JSON array one at a time.
+
+    Reads `chunk_size` characters at a time and decodes each element as soon
+    as the buffer holds all of it; an element larger than the buffer makes
+    the next read as large as what is already buffered.
+    """
+    decoder = json.JSONDecoder()
+    buf = f.read(chunk_size)
+    pos = len(buf) - len(buf.lstrip())
+    if buf[pos:pos + 1] != "[":
+        raise ValueError("export is not a JSON array")
+    pos += 1
+    eof = False
+    while True:
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buf) or eof:
+                break
+            buf, pos = f.read(chunk_size), 0
+            eof = not buf
+        if pos >= len(buf):
+            raise ValueError("export ends inside the conversation array")
+        if buf[pos] == "]":
+            return
+
+        try:
+            value, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            more = f.read(max(chunk_size, len(buf) - pos))
+            eof = not more
+            buf, pos = buf[pos:] + more, 0
+            continue
+        yield value
+        pos = end
+        if pos > chunk_size:
+            buf, pos = buf[pos:], 0
+
+
+# -- export formats -> merged exchanges -------------------------------------------------
+
+def format_timestamp(value):
+    """Export timestamps (epoch seconds or ISO 8601) in the local-time format the capture addons write."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        moment = datetime.fromtimestamp(value)
+    else:
+        moment = datetime.fromisoformat(value.replace("Z", "+00:00")).astimezone().replace(tzinfo=None)
+    return moment.strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def epoch(value):
+    if value is None:
+        return 0.0
+    if isinstance(value, (int, float)):
+        return float(value)
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+def new_exchange(source, timestamp, user_input, user_message_id, model=None, metadata=None):
+    """An exchange in the shape merge_conversations.py writes."""
+    return {
+        "timestamp": timestamp,
+        "file_source": source,
+        "user_input": user_input,
+        "assistant_response": "",
+        "user_message_id": user_message_id,
+        "assistant_message_id": None,
+        "model": model,
+        "metadata": metadata or {},
+        "trace_id": None,
+    }
+
+
+def chatgpt_message_text(message):
+    content = message.get("content") or {}
+    if content.get("content_type") not in ("text", "multimodal_text"):
+        return ""
+    # multimodal parts mix strings with image/file references
+    return "\n".join(part for part in content.get("parts") or [] if isinstance(part, str)).strip()
+
+
+def chatgpt_exchanges(conversation, source):
+    """Exchanges along the ChatGPT branch that ends at current_node."""
+    mapping = conversation.get("mapping") or {}
+    path = []
+    node_id = conversation.get("current_node")
+    seen = set()
+    while node_id in mapping and node_id not in seen:
+        seen.add(node_id)
+        node = mapping[node_id]
+        if node.get("message"):
+            path.append(node["message"])
+        node_id = node.get("parent")
+    path.reverse()
+    if not path:
+        # No current_node: fall back to every message in time order
+        path = sorted((n["message"] for n in mapping.values() if n.get("message")),
+                      key=lambda m: m.get("create_time") or 0)
+
+    exchanges = []
+    for message in path:
+        role = (message.get("author") or {}).get("role")
+        metadata = message.get("metadata") or {}
+        if metadata.get("is_visually_hidden_from_conversation") or message.get("recipient", "all") != "all":
+            continue
+        text = chatgpt_message_text(message)
+        if not text:
+            continue
+        if role == "user":
+            exchanges.append(new_exchange(
+                source, format_timestamp(message.get("create_time") or conversation.get("create_time")),
+                text, message.get("id"),
+            ))
+        elif role == "assistant" and exchanges:
+            # Several assistant messages in a row (e.g. around tool calls) form one response
+            exchange = exchanges[-1]
+            exchange["assistant_response"] = "\n\n".join(filter(None, [exchange["assistant_response"], text]))
+            exchange["assistant_message_id"] = message.get("id")
+            exchange["model"] = metadata.get("model_slug") or exchange["model"]
+            exchange["metadata"] = {
+                "assistant_message_id": message.get("id"),
+                "model_slug": metadata.get("model_slug"),
+                "parent_id": exchange["user_message_id"],
+            }
+    return exchanges
+
+
+def claude_message_text(message):
+    text = message.get("text")
+    if text:
+        return text.strip()
+    return "\n".join(
+        block.get("text", "") for block in message.get("content") or [] if block.get("type") == "text"
+    ).strip()
+
+
+def claude_exchanges(conversation, source):
+    """Exchanges along the Claude branch that ends at the newest message."""
+    messages = conversation.get("chat_messages") or []
+    by_uuid = {m.get("uuid"): m for m in messages}
+    if messages and all(m.get("parent_message_uuid") for m in messages[1:]):
+        path, seen = [], set()
+        current = max(messages, key=lambda m: epoch(m.get("created_at")))
+        while current is not None and current.get("uuid") not in seen:
+            seen.add(current.get("uuid"))
+            path.append(current)
+            current = by_uuid.get(current.get("parent_message_uuid"))
+        path.reverse()
+    else:
+        path = messages
+
+    model = conversation.get("model") or "claude"
+    exchanges = []
+    for message in path:
+        text = claude_message_text(message)
+        if not text:
+            continue
+        if message.get("sender") == "human":
+            # Same ids the live capture derives (this uuid, and the assistant's uuid
+            # below), so point ids match captured messages
+            exchanges.append(new_exchange(
+                source, format_timestamp(message.get("created_at")), text, message.get("uuid"), model,
+                {"parent_uuid": message.get("uuid")},
+            ))
+        elif message.get("sender") == "assistant" and exchanges:
+            exchange = exchanges[-1]
+            exchange["assistant_response"] = "\n\n".join(filter(None, [exchange["assistant_response"], text]))
+            exchange["metadata"]["assistant_uuid"] = message.get("uuid")
+            exchange["metadata"]["model"] = model
+    return exchanges
+
+
+def read_conversations(path, provider="auto"):
+    """Yield (provider, conversation_id, exchanges, stamp) for every conversation in the export."""
+    source = f"import:{os.path.basename(path)}"
+    with open_export(path) as f:
+        for conversation in iter_json_array(f):
+            kind = provider
+            if kind == "auto":
+                kind = "chatgpt.com" if "mapping" in conversation else "claude.ai"
+            if kind == "chatgpt.com":
+                conversation_id = conversation.get("conversation_id") or conversation.get("id")
+                exchanges = chatgpt_exchanges(conversation, source)
+                updated = conversation.get("update_time") or conversation.get("create_time")
+            else:
+                conversation_id = conversation.get("uuid")
+                exchanges = claude_exchanges(conversation, source)
+                updated = conversation.get("updated_at") or conversation.get("created_at")
+            if conversation_id and exchanges:
+                yield kind, conversation_id, exchanges, ConversationStamp(int(epoch(updated) * 1e9), len(exchanges))
+
+
+# -- ingestion ------------------------------------------------------------------
+
+def quiet_log(message):
+    """Ingestor.log for bulk imports: per-conversation lines would drown the progress output, problems still show."""
+    if message.lstrip().startswith(("❌", "⚠️")):
+        print(message)
+
+
+class ImportWorker:
+    """
+    One ingestion thread: takes conversations off the queue, embeds them in
+    cross-conversation batches and advances the checkpoint only after its
+    own upserts have been applied.
+    """
+
+    def __init__(self, ingestor, checkpoint, commit_every, full_rescan=False):
+        self.ingestor = ingestor
+        self.checkpoint = checkpoint
+        self.commit_every = commit_every
+        self.full_rescan = full_rescan
+        self.batch = []
+        self.batch_messages = 0
+        self.stored = []
+
+    def run(self, work, stop):
+        try:
+            while True:
+                item = work.get()
+                if item is None:
+                    break
+                self.add(*item)
+            self.store()
+            self.commit()
+        except Exception:
+            stop.set()
+            raise
+        return self.ingestor
+
+    def add(self, provider, conversation_id, exchanges, stamp):
+        key = f"import/{provider}/{conversation_id}"
+        if not self.full_rescan and self.checkpoint.is_unchanged(key, stamp):
+            self.ingestor.stats["unchanged_conversations"] += 1
+            return
+        start = 0 if self.full_rescan else self.checkpoint.resume_index(key, exchanges)
+        if start >= len(exchanges):
+            return
+        self.ingestor.stats["conversations"] += 1
+        self.batch.append((key, provider, conversation_id, exchanges, stamp, start))
+        self.batch_messages += 2 * (len(exchanges) - start)
+        if self.batch_messages >= self.ingestor.embed_batch_size:
+            self.store()
+
+    def store(self):
+        if not self.batch:
+            return
+        failed = self.ingestor.store_conversations([
+            (conversation_id, provider, list(enumerate(exchanges[start:], start=start + 1)))
+            for _, provider, conversation_id, exchanges, _, start in self.batch
+        ])
+        for key, _, conversation_id, exchanges, stamp, _ in self.batch:
+            # A failed exchange holds the watermark back so the next run retries it
+            failures = failed[conversation_id]
+            self.stored.append((key, stamp, exchanges, min(failures) - 1 if failures else len(exchanges)))
+        self.batch, self.batch_messages = [], 0
+        if len(self.stored) >= self.commit_every:
+            self.commit()
+
+    def commit(self):
+        """Wait for this worker's upserts, then persist the watermarks of what it stored."""
+        self.ingestor.flush(final=True)
+        if self.ingestor.lexical_index is not None:
+            self.ingestor.lexical_index.commit()
+        if self.ingestor.near_duplicates is not None:
+            self.ingestor.near_duplicates.commit()
+        for entry in self.stored:
+            self.checkpoint.advance(*entry)
+        self.checkpoint.commit()
+        self.stored = []
+
+
+def import_export(path, provider="auto", workers=4, commit_every=100, full_rescan=False,
+                  ingestor=None, checkpoint=None, progress_every=500):
+    """
+    Stream an export into the collection. Returns the parent Ingestor, whose
+    stats add up all workers.
+
+    The reading thread hands conversations to `workers` threads through a
+    bounded queue, so at most a few conversations per worker are in memory.
+    """
+    checkpoint = checkpoint or IngestCheckpoint(IMPORT_CHECKPOINT_FILE)
+    ingestor = ingestor or Ingestor(checkpoint=checkpoint)
+    pool_workers = [
+        ImportWorker(ingestor.for_provider(provider if provider != "auto" else None), checkpoint,
+                     commit_every, full_rescan)
+        for _ in range(max(workers, 1))
+    ]
+    for worker in pool_workers:
+        worker.ingestor.log = quiet_log
+
+    work = queue.Queue(maxsize=len(pool_workers) * 4)
+    stop = threading.Event()
+    started = time.time()
+    read = 0
+    with ThreadPoolExecutor(max_workers=len(pool_workers)) as pool:
+        futures = [pool.submit(worker.run, work, stop) for worker in pool_workers]
+        try:
+            for item in read_conversations(path, provider):
+                while not stop.is_set():
+                    try:
+                        work.put(item, timeout=0.5)
+                        break
+                    except queue.Full:
+                        continue
+                if stop.is_set():
+                    break
+                read += 1
+                if read % progress_every == 0:
+                    upserted = sum(w.ingestor.stats["upserted"] for w in pool_workers)
+                    outboxed = sum(w.ingestor.stats["outboxed"] for w in pool_workers)
+                    elapsed = time.time() - started
+                    print(f"  {read} conversations read, {upserted} messages upserted "
+                          f"({upserted / elapsed:.1f} msg/s)"
+                          + (f", {outboxed} in the outbox" if outboxed else ""))
+        finally:
+            for _ in pool_workers:
+                while True:
+                    try:
+                        work.put(None, timeout=0.5)
+                        break
+                    except queue.Full:
+                        # A worker that failed stopped draining; make room for the sentinels
+                        try:
+                            work.get_nowait()
+                        except queue.Empty:
+                            pass
+        for future in futures:
+            future.result()
+
+    for worker in pool_workers:
+        for key in ("conversations", "unchanged_conversations", "exchanges", "inserted", "skipped", "errors",
+                    "upserted", "embedding_requests", "near_duplicates", "embeddings_saved", "outboxed", "drained"):
+            ingestor.stats[key] += worker.ingestor.stats[key]
+    return ingestor
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import an official ChatGPT or Claude data export.")
+    parser.add_argument("export", help="conversations.json or the export .zip")
+    parser.add_argument("--provider", choices=["auto", "chatgpt.com", "claude.ai"], default="auto")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("IMPORT_WORKERS", "4")))
+    parser.add_argument("--commit-every", type=int, default=100,
+                        help="conversations per worker between checkpoint commits")
+    parser.add_argument("--full", action="store_true", help="ignore the import checkpoint")
+    parser.add_argument("--dry-run", action="store_true", help="only parse and count, without embedding")
+    args = parser.parse_args(argv)
+
+    if args.dry_run:
+        conversations = exchanges = 0
+        started = time.time()
+        for _, _, conversation_exchanges, _ in read_conversations(args.export, args.provider):
+            conversations += 1
+            exchanges += len(conversation_exchanges)
+        print(f"✓ {conversations} conversations, {exchanges} exchanges in {time.time() - started:.1f}s")
+        return 0
+
+    print(f"Importing {args.export} with {args.workers} workers...")
+    ingestor = Ingestor(checkpoint=IngestCheckpoint(IMPORT_CHECKPOINT_FILE), full_rescan=args.full)
+    try:
+        import_export(args.export, args.provider, args.workers, args.commit_every, args.full, ingestor=ingestor,
+                      checkpoint=ingestor.checkpoint)
+        ingestor.close()
+    except Exception as e:
+        print(f"❌ Import stopped: {str(e)[:200]}")
+        print("   Committed progress is kept; run the same command again to resume.")
+        return 1
+
+    print()
+    print(ingestor.summary())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""
+Per-conversation ingestion watermark for store_chat_message.py.
+
+For every merged conversation file we remember the file's mtime/size, how many
+exchanges have been ingested and the message id of the last ingested exchange.
+A run can then skip unchanged files without opening them and, for changed
+files, start right after the last exchange it already stored.
+"""
+
+import os
+import json
+import threading
+
+from storage_profiles import STATE_DIR
+
+CHECKPOINT_FILE = os.path.join(STATE_DIR, "ingest_checkpoint.json")
+
+
+def exchange_key(exchange):
+    """Stable id of an exchange, used to find the watermark again after a re-merge."""
+    return (
+        exchange.get("user_message_id")
+        or exchange.get("assistant_message_id")
+        or exchange.get("file_source")
+    )
+
+
+class IngestCheckpoint:
+    def __init__(self, path=CHECKPOINT_FILE):
+        self.path = path
+        self.entries = {}
+        self.pending = {}
+        self.lock = threading.Lock()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f).get("conversations", {})
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Ignoring unreadable checkpoint {path}: {e}")
+
+    def is_unchanged(self, key, stat):
+        """True if the file hasn't been touched since it was last fully ingested."""
+        entry = self.entries.get(key)
+        return (
+            entry is not None
+            and entry.get("mtime_ns") == stat.st_mtime_ns
+            and entry.get("size") == stat.st_size
+        )
+
+    def resume_index(self, key, exchanges):
+        """
+        Number of leading exchanges already ingested for this conversation.
+
+        Prefers the last ingested message id; falls back to the stored count when
+        ids are missing. If neither matches the file any more (e.g. it shrank),
+        returns 0 and content-hash dedup takes care of already stored messages.
+        """
+        entry = self.entries.get(key)
+        if not entry:
+            return 0
+
+        last_id = entry.get("last_message_id")
+        if last_id:
+            for idx in range(len(exchanges) - 1, -1, -1):
+                if exchange_key(exchanges[idx]) == last_id:
+                    return idx + 1
+
+        ingested = entry.get("ingested", 0)
+        if ingested <= len(exchanges):
+            return ingested
+        return 0
+
+    def advance(self, key, stat, exchanges, ingested):
+        """
+        Record that the first `ingested` exchanges of `key` are stored.
+
+        Held in memory until commit(), which callers run only after the upserts
+        have been applied, so a crash never moves the watermark past lost points.
+        """
+        last_id = exchange_key(exchanges[ingested - 1]) if ingested else None
+        entry = {
+            "mtime_ns": stat.st_mtime_ns if ingested == len(exchanges) else None,
+            "size": stat.st_size,
+            "exchange_count": len(exchanges),
+            "ingested": ingested,
+            "last_message_id": last_id,
+        }
+        with self.lock:
+            self.pending[key] = entry
+
+    def commit(self):
+        """Promote pending watermarks and write the checkpoint file atomically."""
+        with self.lock:
+            if not self.pending:
+                return
+            self.entries.update(self.pending)
+            self.pending = {}
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"conversations": self.entries}, f, indent=2)
+            os.replace(tmp_path, self.path)
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Local BM25 index over the stored chat messages (SQLite FTS5).
+
+Dense search is weak on exact identifiers (error codes, function names, file
+paths) and unavailable when the embeddings API is. Ingestion writes every
+message it upserts into this index as well; the MCP server fuses both rankings
+in hybrid mode and answers from this index alone when embedding fails.
+
+Query words are matched as phrases of their sub-tokens, so
+"store_chat_message.py" only matches those four tokens next to each other.
+
+Usage:
+    python lexical_index.py rebuild          # re-index everything in the collection
+    python lexical_index.py search "E11000 duplicate key"
+"""
+
+import os
+import re
+import sys
+import hashlib
+import sqlite3
+import argparse
+import threading
+from datetime import date, timedelta
+
+from storage_profiles import STATE_DIR
+
+LEXICAL_INDEX_FILE = os.path.join(STATE_DIR, "lexical_index.sqlite")
+
+# Payload fields kept next to the text, so lexical hits can be returned without Qdrant
+STORED_FIELDS = ["conversation_id", "role", "provider", "timestamp", "model", "exchange_index"]
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def fts_query(query):
+    """FTS5 MATCH expression: each whitespace-separated word as a quoted phrase, OR-ed."""
+    phrases = []
+    for word in query.split():
+        tokens = _TOKEN_RE.findall(word)
+        if tokens:
+            phrase = '"' + " ".join(tokens) + '"'
+            if phrase not in phrases:
+                phrases.append(phrase)
+    return " OR ".join(phrases)
+
+
+def until_bound(until):
+    """
+    (bound, inclusive) for an `until` filter. A date-only value covers its whole
+    day, so it becomes an exclusive bound at the start of the next day.
+    """
+    try:
+        day = date.fromisoformat(until) if len(until) == 10 else None
+    except ValueError:
+        day = None
+    if day is None:
+        return until, True
+    return (day + timedelta(days=1)).isoformat(), False
+
+
+def rowid_for(point_id):
+    """Stable 63-bit rowid for a point id, so re-indexing a message replaces it."""
+    digest = hashlib.blake2b(str(point_id).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") >> 1
+
+
+class LexicalIndex:
+    def __init__(self, path=LEXICAL_INDEX_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        columns = ", ".join(f"{field} UNINDEXED" for field in ["point_id"] + STORED_FIELDS)
+        self.db.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS messages USING fts5(text, {columns})")
+        self.db.commit()
+
+    def add(self, point_id, payload):
+        """Index (or re-index) one message. Call commit() to make it visible to readers."""
+        self.add_many([(point_id, payload)])
+
+    def add_many(self, messages):
+        """Index (point_id, payload) pairs in one statement."""
+        rows = [
+            [rowid_for(point_id), payload.get("text") or "", str(point_id)]
+            + [payload.get(field) for field in STORED_FIELDS]
+            for point_id, payload in messages
+        ]
+        with self.lock:
+            self.db.executemany(
+                f"INSERT OR REPLACE INTO messages (rowid, text, point_id, {', '.join(STORED_FIELDS)}) "
+                f"VALUES (?, ?, ?, {', '.join('?' for _ in STORED_FIELDS)})",
+                rows,
+            )
+
+    def add_points(self, points):
+        self.add_many((point.id, point.payload or {}) for point in points)
+
+    def commit(self):
+        with self.lock:
+            self.db.commit()
+
+    def search(self, query, limit=10, filters=None):
+        """
+        Best BM25 matches as dicts with point_id, score (higher is better), text and stored fields.
+
+        `filters` may hold provider, conversation_id and role (exact match) and
+        since/until (ISO dates or timestamps, inclusive; a date-only until covers that day).
+        """
+        expression = fts_query(query)
+        if not expression:
+            return []
+        where, params = ["messages MATCH ?"], [expression]
+        for field, value in (filters or {}).items():
+            if value is None:
+                continue
+            if field == "since":
+                where.append("timestamp >= ?")
+            elif field == "until":
+                value, inclusive = until_bound(value)
+                where.append("timestamp <= ?" if inclusive else "timestamp < ?")
+            elif field in STORED_FIELDS:
+                where.append(f"{field} = ?")
+            else:
+                raise ValueError(f"Unknown lexical filter: {field}")
+            params.append(value)
+        with self.lock:
+            rows = self.db.execute(
+                f"SELECT point_id, -bm25(messages), text, {', '.join(STORED_FIELDS)} FROM messages "
+                f"WHERE {' AND '.join(where)} ORDER BY bm25(messages) LIMIT ?",
+                params + [limit],
+            ).fetchall()
+        hits = []
+        for point_id, score, text, *values in rows:
+            hit = {"point_id": point_id, "score": score, "text": text}
+            hit.update({field: value for field, value in zip(STORED_FIELDS, values) if value is not None})
+            hits.append(hit)
+        return hits
+
+    def count(self):
+        with self.lock:
+            return self.db.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+
+    def clear(self):
+        with self.lock:
+            self.db.execute("DELETE FROM messages")
+            self.db.commit()
+
+    def close(self):
+        with self.lock:
+            self.db.commit()
+            self.db.close()
+
+
+def rebuild(index, qdrant, collection_name, batch_size=512):
+    """Re-index every message of the collection from its Qdrant payloads (texts from the text store if lean)."""
+    import text_store
+
+    store = text_store.TextStore() if os.path.exists(text_store.TEXT_STORE_FILE) else None
+    index.clear()
+    indexed = 0
+    offset = None
+    while True:
+        records, offset = qdrant.scroll(
+            collection_name=collection_name,
+            limit=batch_size,
+            offset=offset,
+            with_payload=["text"] + STORED_FIELDS,
+            with_vectors=False,
+        )
+        index.add_points(text_store.hydrate(records, store))
+        indexed += len(records)
+        print(f"  Indexed {indexed} messages...", end="\r", file=sys.stderr)
+        if offset is None:
+            break
+    index.commit()
+    return indexed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local BM25 index over the stored chat messages.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    rebuild_parser = sub.add_parser("rebuild", help="re-index every message in the Qdrant collection")
+    rebuild_parser.add_argument("--collection", default=None)
+    rebuild_parser.add_argument("--host", default=os.getenv("QDRANT_HOST", "localhost"))
+    rebuild_parser.add_argument("--port", type=int, default=int(os.getenv("QDRANT_PORT", "6333")))
+
+    search_parser = sub.add_parser("search", help="query the index")
+    search_parser.add_argument("query")
+    search_parser.add_argument("--limit", type=int, default=10)
+
+    parser.add_argument("--index", default=LEXICAL_INDEX_FILE)
+    args = parser.parse_args(argv)
+
+    index = LexicalIndex(args.index)
+    if args.command == "rebuild":
+        import storage_profiles
+        import vector_store
+
+        collection = args.collection or storage_profiles.COLLECTION_NAME
+        qdrant = vector_store.open_client(host=args.host, port=args.port)
+        print(f"Rebuilding lexical index from {collection}...")
+        indexed = rebuild(index, qdrant, collection)
+        print(f"\n✓ Indexed {indexed} messages into {args.index}")
+    else:
+        for hit in index.search(args.query, args.limit):
+            preview = hit["text"][:100].replace("\n", " ")
+            print(f"{hit['score']:7.2f}  [{hit.get('role', '?')}] {preview}")
+    index.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
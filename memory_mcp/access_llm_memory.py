@@ -1,68 +1,815 @@
+import time
+
+# Startup timings reported by memory_stats, measured from here
+STARTED = time.perf_counter()
+
 from mcp.server.fastmcp import FastMCP
-from qdrant_client import QdrantClient
-from openai import OpenAI
 import httpx
-import os, dotenv
+import asyncio
+import functools
+import os, sys, dotenv
+from collections import defaultdict
+from contextlib import asynccontextmanager
+
+# Shared modules (storage_profiles, ...) live in the project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import storage_profiles
+import vector_store
+import collection_version
+import outbox
+import text_store
+from lexical_index import LexicalIndex, until_bound
+from embedding_cache import EmbeddingCache
+import result_format
+
+# qdrant_client, openai and numpy take seconds to import. They are loaded in the
+# background after the MCP handshake (see warm_up), and imported inside the
+# functions that use them.
 
 dotenv.load_dotenv()
 
-mcp = FastMCP()
-qdrant = QdrantClient()
+# Every tool call must finish within this many seconds, however slow the APIs are
+SEARCH_DEADLINE = float(os.getenv("SEARCH_DEADLINE", "15"))
+
+# Default character budget shared by all snippets of one search_memory call
+SEARCH_MAX_CHARS = int(os.getenv("SEARCH_MAX_CHARS", "4000"))
+
+# Default character budget of one get_conversation page, and the most exchanges per page
+CONVERSATION_MAX_CHARS = int(os.getenv("CONVERSATION_MAX_CHARS", "16000"))
+CONVERSATION_MAX_EXCHANGES = 50
 
-# Create custom httpx client with timeout and no SSL verification
-http_client = httpx.Client(
-    verify=False,
-    timeout=60.0  # 60 second timeout
+# "dense" (embeddings only), "hybrid" (dense + BM25, fused) or "lexical" (BM25 only, no network)
+SEARCH_MODES = ("dense", "hybrid", "lexical")
+SEARCH_MODE = os.getenv("SEARCH_MODE", "hybrid")
+
+# Reciprocal-rank fusion constant; 60 is the value from the original RRF paper
+RRF_K = 60
+
+# Seconds the background warm-up may spend opening connections before giving up
+WARM_UP_TIMEOUT = float(os.getenv("WARM_UP_TIMEOUT", "10"))
+
+# Connections to OpenAI and Qdrant are pooled and kept alive between tool calls
+connection_limits = httpx.Limits(
+    max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "32")),
+    max_keepalive_connections=int(os.getenv("HTTP_MAX_KEEPALIVE", "16")),
+    keepalive_expiry=60.0,
 )
 
-openai = OpenAI(
-    api_key=os.getenv("OPENAI_API_KEY"),
-    http_client=http_client,
-    max_retries=3  # Retry up to 3 times
+collection_name = storage_profiles.COLLECTION_NAME
+profile = storage_profiles.get_profile()
+_profile_checked_at = None
+
+# Query embeddings are cached in-process (and optionally on disk with EMBED_CACHE_PERSIST=1)
+embedding_cache = EmbeddingCache(
+    max_entries=int(os.getenv("EMBED_CACHE_SIZE", "1024")),
+    ttl_seconds=float(os.getenv("EMBED_CACHE_TTL", str(24 * 3600))),
+    persist_path=(
+        os.path.join(storage_profiles.STATE_DIR, "query_embeddings.sqlite")
+        if os.getenv("EMBED_CACHE_PERSIST") == "1" else None
+    ),
 )
 
-collection_name = "chat_messages"
+# Local BM25 index written by store_chat_message.py (see lexical_index.py)
+lexical_index = LexicalIndex() if os.getenv("LEXICAL_INDEX", "1") != "0" else None
+
+# Opened on first use, once ingestion has created it
+_text_store = None
+
+# Built in worker threads by ensure_qdrant() / ensure_openai(). Lexical searches never wait for them.
+qdrant = None
+http_client = None
+openai = None
+result_cache = None
+# "qdrant" / "openai" -> task building that client; a failed one is retried on the next call
+_client_tasks = {}
+
+startup = {"import_s": None, "clients_ready_s": None, "connections_warm_s": None, "first_query_s": None}
+
+
+def _create_qdrant():
+    """Build the Qdrant client and the result cache; runs in a worker thread."""
+    global qdrant, result_cache
+    import qdrant_client.models  # noqa: F401  (imported by the tools' filter helpers)
+
+    # Qdrant server by default; VECTOR_BACKEND=local|numpy keeps vectors in embedded files instead
+    if qdrant is None:
+        qdrant = vector_store.open_client(asynchronous=True, limits=connection_limits)
+
+    # Recent dense results, reused for queries whose embedding is within SEMANTIC_CACHE_THRESHOLD
+    # cosine of a cached one; dropped whenever ingestion bumps the collection version
+    if result_cache is None and os.getenv("SEMANTIC_CACHE", "1") != "0":
+        from result_cache import SemanticResultCache
+
+        result_cache = SemanticResultCache(
+            max_entries=int(os.getenv("SEMANTIC_CACHE_SIZE", "256")),
+            threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95")),
+            ttl_seconds=float(os.getenv("SEMANTIC_CACHE_TTL", "600")),
+        )
+
+
+def _create_openai():
+    """Import the OpenAI library and build its client; runs in a worker thread."""
+    global http_client, openai
+    from openai import AsyncOpenAI
+
+    if openai is None:
+        # Create custom httpx client with timeout and no SSL verification
+        http_client = httpx.AsyncClient(
+            verify=False,
+            timeout=60.0,  # 60 second timeout
+            limits=connection_limits,
+        )
+        openai = AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            http_client=http_client,
+            max_retries=3  # Retry up to 3 times
+        )
+
+
+async def _ensure(name, create):
+    """Wait for one client, (re)starting its creation if it hasn't started or last failed."""
+    task = _client_tasks.get(name)
+    if task is None or (task.done() and (task.cancelled() or task.exception() is not None)):
+        task = _client_tasks[name] = asyncio.ensure_future(asyncio.to_thread(create))
+    await asyncio.shield(task)
+
+
+async def ensure_qdrant():
+    """Wait for the Qdrant client only; enough for tools that don't embed."""
+    await _ensure("qdrant", _create_qdrant)
+
+
+async def ensure_openai():
+    await _ensure("openai", _create_openai)
+
+
+async def ensure_clients():
+    """Wait until both clients exist; an OpenAI failure doesn't stop the Qdrant client being built."""
+    results = await asyncio.gather(ensure_qdrant(), ensure_openai(), return_exceptions=True)
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    if startup["clients_ready_s"] is None:
+        startup["clients_ready_s"] = round(time.perf_counter() - STARTED, 3)
+
+
+def clients_ready():
+    return all(
+        name in _client_tasks and _client_tasks[name].done() and not _client_tasks[name].cancelled()
+        and _client_tasks[name].exception() is None
+        for name in ("qdrant", "openai")
+    )
+
+
+async def warm_up():
+    """
+    Build the clients, then open the pooled connections (TLS included) and load
+    the collection metadata, so the first search doesn't pay for them.
+    """
+    try:
+        await ensure_clients()
+    except Exception as e:
+        print(f"Could not create clients: {str(e)}", file=sys.stderr)
+        return
+
+    kwargs = storage_profiles.embedding_kwargs(profile)
+    results = await asyncio.gather(
+        asyncio.wait_for(qdrant.get_collection(collection_name), timeout=WARM_UP_TIMEOUT),
+        asyncio.wait_for(openai.with_options(max_retries=0).models.retrieve(kwargs["model"]), timeout=WARM_UP_TIMEOUT),
+        return_exceptions=True,
+    )
+    for name, result in zip(("Qdrant", "OpenAI"), results):
+        if isinstance(result, BaseException):
+            print(f"Could not pre-warm {name} connection: {str(result) or type(result).__name__}", file=sys.stderr)
+    startup["connections_warm_s"] = round(time.perf_counter() - STARTED, 3)
+    print(f"Memory server ready: clients after {startup['clients_ready_s']:.2f}s, "
+          f"connections warm after {startup['connections_warm_s']:.2f}s", file=sys.stderr)
+
+
+@asynccontextmanager
+async def lifespan(server):
+    """Answer the MCP handshake right away; clients are created and warmed in the background."""
+    task = asyncio.ensure_future(warm_up())
+    try:
+        yield {}
+    finally:
+        task.cancel()
+
+
+def records_first_query(tool):
+    """Record how long the first search tool call of the process took, for memory_stats."""
+    @functools.wraps(tool)
+    async def wrapper(*args, **kwargs):
+        if startup["first_query_s"] is not None:
+            return await tool(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return await tool(*args, **kwargs)
+        finally:
+            if startup["first_query_s"] is None:
+                startup["first_query_s"] = round(time.perf_counter() - started, 3)
+    return wrapper
+
+
+mcp = FastMCP(lifespan=lifespan)
+
+
+# Embedding requests in flight, so concurrent identical queries share one API call
+_inflight_embeddings = {}
+
+
+async def embed_queries(queries):
+    """
+    Embeddings for several search queries, in order.
+
+    Cached queries are served from the cache; the rest go out in a single
+    embeddings request. Queries already being embedded by another call wait
+    for that request instead of sending their own.
+    """
+    await ensure_openai()
+    kwargs = storage_profiles.embedding_kwargs(profile)
+    vectors = [embedding_cache.get(query, kwargs["model"], profile["dimensions"]) for query in queries]
+
+    # Misses already being embedded elsewhere are awaited; the others are requested here
+    query_keys = [embedding_cache.make_key(query, kwargs["model"], profile["dimensions"]) for query in queries]
+    pending = {}
+    keys, texts = [], []
+    for query, key, vector in zip(queries, query_keys, vectors):
+        if vector is not None or key in pending:
+            continue
+        if key in _inflight_embeddings:
+            pending[key] = _inflight_embeddings[key]
+        else:
+            pending[key] = None
+            keys.append(key)
+            texts.append(query)
+
+    if keys:
+        async def compute():
+            try:
+                response = await openai.embeddings.create(input=texts, **kwargs)
+                computed = {}
+                for key, text, item in zip(keys, texts, sorted(response.data, key=lambda d: d.index)):
+                    embedding_cache.put(text, kwargs["model"], item.embedding, profile["dimensions"])
+                    computed[key] = item.embedding
+                return computed
+            finally:
+                for key in keys:
+                    _inflight_embeddings.pop(key, None)
+
+        batch = asyncio.ensure_future(compute())
+
+        async def pick(key):
+            return (await batch)[key]
+
+        for key in keys:
+            pending[key] = _inflight_embeddings[key] = asyncio.ensure_future(pick(key))
+
+    for i, key in enumerate(query_keys):
+        if vectors[i] is None:
+            # shield: one caller hitting its deadline must not cancel the others' request
+            vectors[i] = await asyncio.shield(pending[key])
+    return vectors
+
+
+async def embed_query(query):
+    """Embedding for a search query, served from the cache when possible."""
+    return (await embed_queries([query]))[0]
+
+
+def hydrate(points):
+    """
+    Fill in texts kept out of the payloads (LEAN_PAYLOADS=1, see text_store.py),
+    for the points about to be returned only. Points that carry their text are
+    left alone.
+    """
+    global _text_store
+    if _text_store is None and os.path.exists(text_store.TEXT_STORE_FILE):
+        _text_store = text_store.TextStore()
+    return text_store.hydrate(points, _text_store)
+
+
+def build_filter(provider=None, conversation_id=None, role=None, since=None, until=None):
+    """Qdrant filter for the optional search_memory filters, or None if none are set."""
+    from qdrant_client.models import DatetimeRange, FieldCondition, Filter, MatchValue
+
+    conditions = [
+        FieldCondition(key=key, match=MatchValue(value=value))
+        for key, value in (("provider", provider), ("conversation_id", conversation_id), ("role", role))
+        if value
+    ]
+    if since or until:
+        bound, inclusive = until_bound(until) if until else (None, True)
+        conditions.append(FieldCondition(key="timestamp", range=DatetimeRange(
+            gte=since, lte=bound if inclusive else None, lt=None if inclusive else bound,
+        )))
+    return Filter(must=conditions) if conditions else None
+
+
+def search_scope(top_k, filters=None, with_payload=True):
+    """Everything besides the query vector that decides a dense result list, as a result_cache scope."""
+    return (top_k, tuple(sorted((key, value) for key, value in (filters or {}).items() if value)), with_payload)
+
+
+def follow_reindex(version):
+    """
+    Switch to the profile recorded by a re-index (migrate_collection.py --reindex)
+    once the collection version has moved, so queries match the vector size of
+    the collection the alias now points to. STORAGE_PROFILE, if set, wins.
+    """
+    global profile, _profile_checked_at
+    if version == _profile_checked_at:
+        return
+    _profile_checked_at = version
+    recorded = storage_profiles.recorded_profile(collection_name)
+    if recorded and recorded != profile["name"] and not os.getenv("STORAGE_PROFILE"):
+        print(f"Collection re-indexed, switching to storage profile '{recorded}'", file=sys.stderr)
+        profile = storage_profiles.get_profile(recorded)
+
+
+async def _search(query, top_k, filters=None, with_payload=True):
+    """Dense hits for `query`; with_payload=False returns ids and scores only (fusion candidates)."""
+    version = collection_version.read_version(collection_name)
+    follow_reindex(version)
+    await ensure_qdrant()
+    query_embedding = await embed_query(query)
+
+    scope = search_scope(top_k, filters, with_payload)
+    if result_cache is not None:
+        cached = result_cache.get(query_embedding, scope, version)
+        if cached is not None:
+            return cached
+
+    response = await qdrant.query_points(
+        collection_name=collection_name,
+        query=query_embedding,
+        query_filter=build_filter(**(filters or {})),
+        limit=top_k,
+        search_params=storage_profiles.search_params(profile),
+        with_payload=result_format.RESULT_FIELDS if with_payload else False,
+        with_vectors=False,
+    )
+    if result_cache is not None:
+        result_cache.put(query_embedding, scope, version, response.points)
+    return response.points
+
+
+async def fill_payloads(points):
+    """Fetch the result fields of points that came without a payload, in one retrieve, keeping their order."""
+    missing = [point.id for point in points if point.payload is None]
+    if not missing:
+        return points
+    records = await qdrant.retrieve(
+        collection_name=collection_name, ids=missing, with_payload=result_format.RESULT_FIELDS, with_vectors=False
+    )
+    payloads = {str(record.id): record.payload for record in records}
+    return [
+        point if point.payload is not None else point.model_copy(update={"payload": payloads.get(str(point.id))})
+        for point in points
+    ]
+
+
+async def fetch_context(points, window):
+    """
+    Messages within `window` exchanges of each hit, per conversation.
+
+    All neighbourhoods are fetched with a single scroll whose filter ORs one
+    (conversation_id, exchange_index range) clause per hit.
+    """
+    from qdrant_client.models import FieldCondition, Filter, MatchValue, Range
+
+    await ensure_qdrant()
+    anchors = {
+        (point.payload["conversation_id"], point.payload["exchange_index"])
+        for point in points
+        if point.payload and point.payload.get("conversation_id") and point.payload.get("exchange_index") is not None
+    }
+    if not anchors:
+        return {}
+
+    clauses = [
+        Filter(must=[
+            FieldCondition(key="conversation_id", match=MatchValue(value=conversation_id)),
+            FieldCondition(key="exchange_index", range=Range(gte=index - window, lte=index + window)),
+        ])
+        for conversation_id, index in anchors
+    ]
+    records, _ = await qdrant.scroll(
+        collection_name=collection_name,
+        scroll_filter=Filter(should=clauses),
+        # Two messages (user + assistant) per exchange
+        limit=len(anchors) * (2 * window + 1) * 2,
+        with_payload=["text", "role", "conversation_id", "exchange_index", "timestamp"],
+        with_vectors=False,
+    )
+    by_conversation = defaultdict(list)
+    for record in hydrate(records):
+        by_conversation[record.payload["conversation_id"]].append(record)
+    return by_conversation
+
+
+def attach_context(results, points, context, window, query, max_chars):
+    """Add each hit's neighbouring messages, in conversation order, as a "context" list within `max_chars`."""
+    role_order = {"user": 0, "assistant": 1}
+    neighbourhoods = []
+    for point in points:
+        payload = point.payload or {}
+        index = payload.get("exchange_index")
+        neighbours = [
+            record for record in context.get(payload.get("conversation_id"), [])
+            if index is not None
+            and abs(record.payload["exchange_index"] - index) <= window
+            and str(record.id) != str(point.id)
+        ]
+        neighbours.sort(key=lambda r: (r.payload["exchange_index"], role_order.get(r.payload.get("role"), 2)))
+        neighbourhoods.append(neighbours)
+
+    total = sum(len(n) for n in neighbourhoods)
+    share = max(max_chars // total, result_format.MIN_SNIPPET_CHARS) if total else 0
+    remaining = max_chars
+    for result, neighbours in zip(results, neighbourhoods):
+        if not neighbours or remaining < result_format.MIN_SNIPPET_CHARS:
+            continue
+        result["context"] = []
+        for record in neighbours:
+            if remaining < result_format.MIN_SNIPPET_CHARS:
+                break
+            snippet, truncated = result_format.extract_snippet(
+                record.payload.get("text") or "", query, min(share, remaining)
+            )
+            remaining -= len(snippet)
+            entry = {
+                "exchange_index": record.payload["exchange_index"],
+                "role": record.payload.get("role"),
+                "text": snippet,
+            }
+            if truncated:
+                entry["truncated"] = True
+            result["context"].append(entry)
+
+
+def _lexical_search(query, limit, filters=None):
+    """BM25 hits as ScoredPoints, so they fuse and format like dense ones."""
+    from qdrant_client.models import ScoredPoint
+
+    if lexical_index is None:
+        return []
+    points = []
+    for hit in lexical_index.search(query, limit, filters):
+        point_id, score = hit.pop("point_id"), hit.pop("score")
+        points.append(ScoredPoint(id=point_id, version=0, score=score, payload=hit))
+    return points
+
+
+def fuse_rrf(rankings, limit, k=RRF_K):
+    """Reciprocal-rank fusion: each hit scores sum(1 / (k + rank)) over the rankings it appears in."""
+    scores, points = {}, {}
+    for ranking in rankings:
+        for rank, point in enumerate(ranking, start=1):
+            key = str(point.id)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+            # Keep a copy that already carries its payload (lexical hits do)
+            if key not in points or points[key].payload is None:
+                points[key] = point
+    best = sorted(scores, key=scores.get, reverse=True)[:limit]
+    return [points[key].model_copy(update={"score": scores[key]}) for key in best]
+
 
 @mcp.tool()
-def search_memory(query: str, top_k: int = 5) -> list:
+@records_first_query
+async def search_memory(
+    query: str,
+    top_k: int = 5,
+    max_chars: int | None = None,
+    max_tokens: int | None = None,
+    mode: str | None = None,
+    provider: str | None = None,
+    conversation_id: str | None = None,
+    role: str | None = None,
+    since: str | None = None,
+    until: str | None = None,
+    context_window: int = 0,
+) -> list:
     """
     Search the vector database for similar entries to the query.
+
+    mode: "dense" (semantic), "lexical" (exact words, identifiers, error codes,
+    paths) or "hybrid" (both, fused by reciprocal rank; the default). If the
+    semantic search fails, hits come from the lexical index and are marked
+    "fallback": "lexical".
+
+    Optional filters: provider ("chatgpt.com", "claude.ai"), conversation_id,
+    role ("user" or "assistant"), and since/until as ISO dates or datetimes
+    (inclusive). context_window=N adds the messages of the N exchanges before
+    and after each hit in its conversation as "context".
+
+    Each hit's text is cut to a snippet around the passage that best matches the
+    query; all snippets together stay within max_chars (or max_tokens, ~4 chars
+    per token). Hits marked "truncated" report the full message length.
     """
+    mode = mode or SEARCH_MODE
+    if mode not in SEARCH_MODES:
+        return [{"error": f"Unknown search mode {mode!r}, expected one of {', '.join(SEARCH_MODES)}"}]
+    if max_tokens:
+        max_chars = max_tokens * result_format.CHARS_PER_TOKEN
+    budget = max_chars or SEARCH_MAX_CHARS
+    # With context, hits and their neighbours split the budget
+    hit_budget = budget // 2 if context_window else budget
+
+    filters = {"provider": provider, "conversation_id": conversation_id, "role": role,
+               "since": since, "until": until}
+    # Hybrid fuses deeper candidate lists than the final top_k. Dense candidates
+    # come without payloads; only the fused top_k are fetched afterwards.
+    candidates = max(top_k * 4, 20) if mode == "hybrid" else top_k
+    lexical = _lexical_search(query, candidates, filters) if mode != "dense" else None
+
     try:
-        query_embedding_response = openai.embeddings.create(
-            input=query,
-            model="text-embedding-3-small"
-        )
-        query_embedding = query_embedding_response.data[0].embedding
-        
-        results = qdrant.search(
-            collection_name=collection_name,
-            query_vector=query_embedding,
-            limit=top_k
-        )
+        if mode == "lexical":
+            results = lexical
+        else:
+            results = await asyncio.wait_for(
+                _search(query, candidates, filters, with_payload=mode != "hybrid"), timeout=SEARCH_DEADLINE
+            )
         
         if results is None:
             return []
+        if mode == "hybrid":
+            results = await asyncio.wait_for(
+                fill_payloads(fuse_rrf([results, lexical], top_k)), timeout=SEARCH_DEADLINE
+            )
         
-        # Format results for better readability
-        # formatted_results = []
-        # for result in results:
-        #     formatted_results.append({
-        #         "score": result.score,
-        #         "text": result.payload.get("text", ""),
-        #         "role": result.payload.get("role", ""),
-        #         "timestamp": result.payload.get("timestamp", ""),
-        #         "conversation_id": result.payload.get("conversation_id", ""),
-        #         "model": result.payload.get("model", "")
-        #     })
-        
-        return results
+        formatted = result_format.format_results(hydrate(results), query, hit_budget)
+        if context_window and results:
+            try:
+                context = await asyncio.wait_for(fetch_context(results, context_window), timeout=SEARCH_DEADLINE)
+                attach_context(formatted, results, context, context_window, query, budget - hit_budget)
+            except Exception as e:
+                print(f"Could not fetch context: {str(e)}", file=sys.stderr)
+        return formatted
     
+    except Exception as e:
+        if isinstance(e, asyncio.TimeoutError):
+            error_msg = f"Search timed out after {SEARCH_DEADLINE:.0f}s"
+        else:
+            error_msg = f"Error searching vector database: {str(e)}"
+        # stdout carries the MCP stdio protocol, so diagnostics go to stderr
+        print(error_msg, file=sys.stderr)
+
+        fallback = (lexical if lexical is not None else _lexical_search(query, top_k, filters))[:top_k]
+        if not fallback:
+            return [{"error": error_msg}]
+        results = result_format.format_results(fallback, query, budget)
+        for result in results:
+            result["fallback"] = "lexical"
+        return results
+
+
+async def _search_batch(queries, top_k):
+    from qdrant_client.models import QueryRequest
+
+    version = collection_version.read_version(collection_name)
+    follow_reindex(version)
+    await ensure_qdrant()
+    query_embeddings = await embed_queries(queries)
+
+    # Queries answered by the result cache are left out of the Qdrant batch
+    scope = search_scope(top_k)
+    point_lists = [
+        result_cache.get(embedding, scope, version) if result_cache is not None else None
+        for embedding in query_embeddings
+    ]
+    missing = [i for i, points in enumerate(point_lists) if points is None]
+    if not missing:
+        return point_lists
+
+    requests = [
+        QueryRequest(
+            query=query_embeddings[i],
+            limit=top_k,
+            params=storage_profiles.search_params(profile),
+            with_payload=result_format.RESULT_FIELDS,
+            with_vector=False,
+        )
+        for i in missing
+    ]
+    responses = await qdrant.query_batch_points(collection_name=collection_name, requests=requests)
+    for i, response in zip(missing, responses):
+        point_lists[i] = response.points
+        if result_cache is not None:
+            result_cache.put(query_embeddings[i], scope, version, response.points)
+    return point_lists
+
+
+def group_batch_hits(queries, point_lists):
+    """
+    Assign every hit to the query that scored it highest.
+
+    Returns one list of (point, also_matched) per query, where also_matched
+    names the other queries that returned the same message.
+    """
+    best = {}
+    matched_by = {}
+    for i, points in enumerate(point_lists):
+        for point in points:
+            matched_by.setdefault(point.id, []).append(i)
+            if point.id not in best or point.score > best[point.id][1].score:
+                best[point.id] = (i, point)
+
+    groups = [[] for _ in queries]
+    for point_id, (i, point) in best.items():
+        also = [queries[j] for j in matched_by[point_id] if j != i]
+        groups[i].append((point, also))
+    for group in groups:
+        group.sort(key=lambda hit: hit[0].score, reverse=True)
+    return groups
+
+
+@mcp.tool()
+@records_first_query
+async def search_memory_batch(queries: list[str], top_k: int = 5, max_chars: int | None = None) -> list:
+    """
+    Run several searches in one call: one embeddings request and one Qdrant batch query.
+
+    Results are grouped per query. A message found by more than one query is
+    listed once, under the query that scored it highest, with "also_matched"
+    naming the others. max_chars is shared by all queries.
+    """
+    if not queries:
+        return []
+    try:
+        point_lists = await asyncio.wait_for(_search_batch(queries, top_k), timeout=SEARCH_DEADLINE)
+
+        budget = (max_chars or SEARCH_MAX_CHARS) // len(queries)
+        groups = group_batch_hits(queries, point_lists)
+        hydrate([point for hits in groups for point, _ in hits])
+        grouped = []
+        for query, hits in zip(queries, groups):
+            results = result_format.format_results([point for point, _ in hits], query, budget)
+            for result, (_, also) in zip(results, hits):
+                if also:
+                    result["also_matched"] = also
+            grouped.append({"query": query, "results": results})
+        return grouped
+
+    except asyncio.TimeoutError:
+        error_msg = f"Batch search timed out after {SEARCH_DEADLINE:.0f}s"
+        print(error_msg, file=sys.stderr)
+        return [{"error": error_msg}]
     except Exception as e:
         error_msg = f"Error searching vector database: {str(e)}"
-        print(error_msg)
+        print(error_msg, file=sys.stderr)
         return [{"error": error_msg}]
 
 
+async def read_conversation(conversation_id, offset, limit):
+    """
+    Messages of the first `limit` stored exchanges with exchange_index >= offset, and the next offset.
+
+    One scroll over the conversation_id and exchange_index payload indexes,
+    ordered by exchange_index. An exchange has at most two messages, so
+    2 * limit + 1 messages are enough to fill the page and tell whether
+    another exchange follows.
+    """
+    from qdrant_client.models import FieldCondition, Filter, MatchValue, OrderBy, Range
+
+    fetch = 2 * limit + 1
+    records, _ = await qdrant.scroll(
+        collection_name=collection_name,
+        scroll_filter=Filter(must=[
+            FieldCondition(key="conversation_id", match=MatchValue(value=conversation_id)),
+            FieldCondition(key="exchange_index", range=Range(gte=offset)),
+        ]),
+        limit=fetch,
+        order_by=OrderBy(key="exchange_index"),
+        with_payload=["text", "role", "exchange_index", "timestamp", "model", "provider"],
+        with_vectors=False,
+    )
+    exchanges = list(dict.fromkeys(record.payload["exchange_index"] for record in records))
+    if len(exchanges) > limit:
+        keep, next_offset = exchanges[:limit], exchanges[limit]
+    elif len(records) == fetch and len(exchanges) > 1:
+        # The page filled up (re-stored messages) before the last exchange was complete
+        keep, next_offset = exchanges[:-1], exchanges[-1]
+    elif len(records) == fetch:
+        keep, next_offset = exchanges, exchanges[0] + 1
+    else:
+        keep, next_offset = exchanges, None
+
+    keep = set(keep)
+    role_order = {"user": 0, "assistant": 1}
+    page = [record for record in records if record.payload["exchange_index"] in keep]
+    page.sort(key=lambda r: (r.payload["exchange_index"], role_order.get(r.payload.get("role"), 2)))
+    return page, next_offset
+
+
+def fit_page(page, next_offset, max_chars):
+    """
+    Format a conversation page within `max_chars`. When the budget runs out
+    mid-page, the page ends before the first exchange that didn't fit and
+    next_offset moves back to it. Returns (messages, next_offset).
+    """
+    messages = result_format.format_messages(page, max_chars)
+    if len(messages) == len(page):
+        return messages, next_offset
+    cut = page[len(messages)].payload["exchange_index"]
+    whole = [m for m in messages if m["exchange_index"] < cut]
+    if whole:
+        return whole, cut
+    # Not even the first exchange fits: return it anyway, so paging moves on
+    first = [r for r in page if r.payload["exchange_index"] == cut]
+    later = [r.payload["exchange_index"] for r in page if r.payload["exchange_index"] > cut]
+    messages = result_format.format_messages(first, max(max_chars, result_format.MIN_SNIPPET_CHARS * len(first)))
+    return messages, later[0] if later else next_offset
+
+
+@mcp.tool()
+@records_first_query
+async def get_conversation(
+    conversation_id: str,
+    offset: int = 0,
+    limit: int = 10,
+    max_chars: int | None = None,
+    max_tokens: int | None = None,
+) -> dict:
+    """
+    Read a stored conversation in order, one page of exchanges at a time.
+
+    Returns the messages of up to `limit` exchanges (max 50) starting at
+    exchange_index `offset`, and "next_offset" to pass back for the next page
+    (null at the end). Message texts share max_chars (or max_tokens, ~4 chars
+    per token) per page; longer ones are cut and marked "truncated" with their
+    full length, and a page that runs out of budget ends early.
+    """
+    from qdrant_client.models import FieldCondition, Filter, MatchValue
+
+    limit = min(max(limit, 1), CONVERSATION_MAX_EXCHANGES)
+    if max_tokens:
+        max_chars = max_tokens * result_format.CHARS_PER_TOKEN
+    try:
+        await asyncio.wait_for(ensure_qdrant(), timeout=SEARCH_DEADLINE)
+        (page, next_offset), total = await asyncio.wait_for(
+            asyncio.gather(
+                read_conversation(conversation_id, max(offset, 0), limit),
+                qdrant.count(
+                    collection_name=collection_name,
+                    count_filter=Filter(must=[
+                        FieldCondition(key="conversation_id", match=MatchValue(value=conversation_id)),
+                    ]),
+                    exact=True,
+                ),
+            ),
+            timeout=SEARCH_DEADLINE,
+        )
+    except asyncio.TimeoutError:
+        error_msg = f"Reading conversation timed out after {SEARCH_DEADLINE:.0f}s"
+        print(error_msg, file=sys.stderr)
+        return {"error": error_msg}
+    except Exception as e:
+        error_msg = f"Error reading conversation: {str(e)}"
+        print(error_msg, file=sys.stderr)
+        return {"error": error_msg}
+
+    if not total.count:
+        return {"error": f"No stored messages for conversation {conversation_id}"}
+    result = {"conversation_id": conversation_id}
+    provider = next((r.payload["provider"] for r in page if r.payload.get("provider")), None)
+    if provider:
+        result["provider"] = provider
+    messages, next_offset = fit_page(hydrate(page), next_offset, max_chars or CONVERSATION_MAX_CHARS)
+    result.update({
+        "total_messages": total.count,
+        "offset": offset,
+        "next_offset": next_offset,
+        "messages": messages,
+    })
+    return result
+
+
+@mcp.tool()
+async def memory_stats() -> dict:
+    """
+    Report statistics for the memory server: startup timings (seconds from
+    process start until import, clients and warm connections; first query
+    duration), query-embedding cache and semantic result cache (hit and
+    near-hit rates, size, evictions, invalidations), and the ingestion outbox
+    (messages waiting to be embedded or upserted, and how long they have waited).
+    """
+    stats = {"startup": dict(startup, clients_ready=clients_ready())}
+    stats["embedding_cache"] = embedding_cache.snapshot()
+    if result_cache is not None:
+        stats["result_cache"] = result_cache.snapshot()
+    if lexical_index is not None:
+        stats["lexical_index"] = {"entries": lexical_index.count()}
+    if os.path.exists(outbox.OUTBOX_FILE):
+        box = outbox.Outbox()
+        try:
+            stats["outbox"] = box.stats()
+        finally:
+            box.close()
+    return stats
+
+
+startup["import_s"] = round(time.perf_counter() - STARTED, 3)
+
 if __name__ == "__main__":
     mcp.run()
\ No newline at end of file
@@ -0,0 +1,153 @@
+"""
+Query-embedding cache for the memory MCP server.
+
+Agents repeat the same (or trivially different) queries constantly, and the
+embeddings round trip dominates search latency. Entries are keyed on the
+normalised query text plus the embedding model/dimensions, live in an
+in-process LRU with a TTL and size bound, and can optionally be backed by a
+small SQLite file so they survive server restarts.
+"""
+
+import os
+import re
+import time
+import array
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_query(query):
+    """Canonical form of a query: NFKC, case-folded, whitespace collapsed."""
+    query = unicodedata.normalize("NFKC", query)
+    return _WHITESPACE_RE.sub(" ", query).strip().casefold()
+
+
+class EmbeddingCache:
+    def __init__(self, max_entries=1024, ttl_seconds=24 * 3600, persist_path=None, persist_max_entries=50_000):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.persist_max_entries = persist_max_entries
+        self._entries = OrderedDict()  # key -> (stored_at, vector)
+        self._lock = threading.Lock()
+        self._db = None
+        self.stats = {
+            "hits": 0,
+            "persistent_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expired": 0,
+        }
+
+        if persist_path:
+            os.makedirs(os.path.dirname(persist_path), exist_ok=True)
+            self._db = sqlite3.connect(persist_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS query_embeddings ("
+                " key TEXT PRIMARY KEY, vector BLOB NOT NULL, stored_at REAL NOT NULL, used_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def make_key(query, model, dimensions=None):
+        return f"{model}:{dimensions or ''}:{normalize_query(query)}"
+
+    def get(self, query, model, dimensions=None):
+        """Cached vector for the query, or None. Counts a hit or a miss."""
+        key = self.make_key(query, model, dimensions)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, vector = entry
+                if now - stored_at <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return vector
+                del self._entries[key]
+                self.stats["expired"] += 1
+
+            vector = self._persistent_get(key, now)
+            if vector is not None:
+                self.stats["persistent_hits"] += 1
+                self._remember(key, vector, now)
+                return vector
+
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, query, model, vector, dimensions=None):
+        key = self.make_key(query, model, dimensions)
+        now = time.time()
+        with self._lock:
+            self._remember(key, list(vector), now)
+            self._persistent_put(key, vector, now)
+
+    def get_or_compute(self, query, model, compute, dimensions=None):
+        """Return the cached vector, or call compute(query), cache and return its result."""
+        vector = self.get(query, model, dimensions)
+        if vector is None:
+            vector = compute(query)
+            self.put(query, model, vector, dimensions)
+        return vector
+
+    def snapshot(self):
+        """Counters plus size and hit rate, for the stats tool."""
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["persistent_hits"] + self.stats["misses"]
+            hits = self.stats["hits"] + self.stats["persistent_hits"]
+            result = dict(self.stats)
+            result["entries"] = len(self._entries)
+            result["max_entries"] = self.max_entries
+            result["ttl_seconds"] = self.ttl_seconds
+            result["hit_rate"] = round(hits / lookups, 4) if lookups else 0.0
+            if self._db is not None:
+                result["persistent_entries"] = self._db.execute("SELECT COUNT(*) FROM query_embeddings").fetchone()[0]
+            return result
+
+    # -- internals (called with the lock held) -------------------------------
+
+    def _remember(self, key, vector, now):
+        self._entries[key] = (now, vector)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _persistent_get(self, key, now):
+        if self._db is None:
+            return None
+        row = self._db.execute(
+            "SELECT vector, stored_at FROM query_embeddings WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        blob, stored_at = row
+        if now - stored_at > self.ttl_seconds:
+            self._db.execute("DELETE FROM query_embeddings WHERE key = ?", (key,))
+            self._db.commit()
+            self.stats["expired"] += 1
+            return None
+        self._db.execute("UPDATE query_embeddings SET used_at = ? WHERE key = ?", (now, key))
+        self._db.commit()
+        return array.array("f", blob).tolist()
+
+    def _persistent_put(self, key, vector, now):
+        if self._db is None:
+            return
+        blob = array.array("f", vector).tobytes()
+        self._db.execute(
+            "INSERT OR REPLACE INTO query_embeddings (key, vector, stored_at, used_at) VALUES (?, ?, ?, ?)",
+            (key, blob, now, now),
+        )
+        # Keep the file bounded: drop least recently used rows beyond the limit
+        self._db.execute(
+            "DELETE FROM query_embeddings WHERE key IN ("
+            " SELECT key FROM query_embeddings ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+            (self.persist_max_entries,),
+        )
+        self._db.commit()
@@ -0,0 +1,135 @@
+"""
+Semantic cache of recent dense search results for the memory MCP server.
+
+Agents keep asking the same thing in slightly different words ("how did we fix
+the ingest timeout" / "what fixed the ingestion timeout?"). Each entry maps a
+query vector, plus the search scope (limit and filters), to the points Qdrant
+returned for it. A later query whose vector is within `threshold` cosine
+similarity of a cached one, with the same scope, gets those points back
+without a Qdrant round trip.
+
+Entries are tagged with the collection version (collection_version.py); when
+ingestion bumps it, the whole cache is dropped on the next lookup.
+"""
+
+import time
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Hits at or above this similarity are the same query vector; below it they count as near hits
+EXACT_SIMILARITY = 1.0 - 1e-6
+
+
+class SemanticResultCache:
+    def __init__(self, max_entries=256, threshold=0.95, ttl_seconds=600):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.version = None
+        # Unit-length query vectors, one row per slot; free slots stay all-zero
+        self._matrix = None
+        self._entries = OrderedDict()  # slot -> (scope, stored_at, points), in LRU order
+        self._free = list(range(max_entries - 1, -1, -1))
+        self._lock = threading.Lock()
+        self.stats = {
+            "hits": 0,
+            "near_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expired": 0,
+            "invalidations": 0,
+        }
+
+    @staticmethod
+    def _unit(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+    def get(self, vector, scope, version):
+        """
+        Cached points for the closest stored query within the threshold, or None.
+
+        `scope` is any hashable describing everything besides the query vector
+        that shaped the results (limit, filters); only entries with an equal
+        scope are considered.
+        """
+        query = self._unit(vector)
+        now = time.time()
+        with self._lock:
+            self._check_version(version)
+            if not self._entries or self._matrix is None or self._matrix.shape[1] != query.shape[0]:
+                self.stats["misses"] += 1
+                return None
+
+            similarities = self._matrix @ query
+            candidates = np.flatnonzero(similarities >= self.threshold)
+            for slot in candidates[np.argsort(-similarities[candidates])].tolist():
+                entry = self._entries.get(slot)
+                if entry is None or entry[0] != scope:
+                    continue
+                if now - entry[1] > self.ttl_seconds:
+                    self._release(slot)
+                    self.stats["expired"] += 1
+                    continue
+                self._entries.move_to_end(slot)
+                self.stats["hits" if similarities[slot] >= EXACT_SIMILARITY else "near_hits"] += 1
+                return entry[2]
+
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, vector, scope, version, points):
+        query = self._unit(vector)
+        with self._lock:
+            if self.version is not None and version != self.version:
+                # Searched before a bump another lookup has already seen: don't store stale results
+                return
+            self._check_version(version)
+            if self._matrix is None or self._matrix.shape[1] != query.shape[0]:
+                self._matrix = np.zeros((self.max_entries, query.shape[0]), dtype=np.float32)
+                self._entries.clear()
+                self._free = list(range(self.max_entries - 1, -1, -1))
+            if not self._free:
+                self._release(next(iter(self._entries)))
+                self.stats["evictions"] += 1
+            slot = self._free.pop()
+            self._matrix[slot] = query
+            self._entries[slot] = (scope, time.time(), points)
+
+    def clear(self):
+        with self._lock:
+            for slot in list(self._entries):
+                self._release(slot)
+
+    def snapshot(self):
+        """Counters plus size and hit/near-hit rates, for the stats tool."""
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["near_hits"] + self.stats["misses"]
+            result = dict(self.stats)
+            result["entries"] = len(self._entries)
+            result["max_entries"] = self.max_entries
+            result["threshold"] = self.threshold
+            result["ttl_seconds"] = self.ttl_seconds
+            result["collection_version"] = self.version
+            result["hit_rate"] = round(self.stats["hits"] / lookups, 4) if lookups else 0.0
+            result["near_hit_rate"] = round(self.stats["near_hits"] / lookups, 4) if lookups else 0.0
+            return result
+
+    # -- internals (called with the lock held) -------------------------------
+
+    def _check_version(self, version):
+        if version == self.version:
+            return
+        if self._entries:
+            for slot in list(self._entries):
+                self._release(slot)
+            self.stats["invalidations"] += 1
+        self.version = version
+
+    def _release(self, slot):
+        del self._entries[slot]
+        self._matrix[slot] = 0.0
+        self._free.append(slot)
@@ -0,0 +1,159 @@
+"""
+Compact search results for the memory MCP server.
+
+Raw Qdrant hits carry the whole payload (full assistant answers, hashes, ids)
+into the agent's context. Results are trimmed to the fields an agent uses and
+each message text is cut to a snippet around the passage that best matches
+the query, with all snippets sharing one character budget per call.
+"""
+
+import re
+import bisect
+
+from embedding_cache import normalize_query
+
+# Payload fields fetched from Qdrant and returned to the agent
+RESULT_FIELDS = ["text", "role", "timestamp", "conversation_id", "provider", "model", "exchange_index"]
+
+# Roughly four characters per token for English text
+CHARS_PER_TOKEN = 4
+
+# Snippets shorter than this stop being useful, even if the budget is tight
+MIN_SNIPPET_CHARS = 120
+
+ELLIPSIS = "…"
+
+_TERM_RE = re.compile(r"\w+")
+_PASSAGE_END_RE = re.compile(r"[.!?\n]+")
+
+
+def query_terms(query):
+    """Distinct words of the query worth matching (3+ characters, or numbers)."""
+    terms = []
+    for term in _TERM_RE.findall(normalize_query(query)):
+        if (len(term) >= 3 or term.isdigit()) and term not in terms:
+            terms.append(term)
+    return terms
+
+
+def best_passage(text, terms):
+    """(start, end) of the sentence/line matching most query terms, or None."""
+    folded = text.casefold()
+    if len(folded) != len(text):
+        folded = text.lower()
+    # Sentence/line ends, found once; each term hit is mapped to its sentence by bisection
+    ends = [m.end() for m in _PASSAGE_END_RE.finditer(folded)]
+    ends.append(len(folded))
+
+    hits = {}
+    for term in terms:
+        position = folded.find(term)
+        while position != -1:
+            idx = bisect.bisect_right(ends, position)
+            hits.setdefault(idx, set()).add(term)
+            if idx >= len(ends) - 1:
+                break
+            position = folded.find(term, ends[idx])
+    if not hits:
+        return None
+    idx = max(hits, key=lambda i: (len(hits[i]), -i))
+    return (ends[idx - 1] if idx else 0), ends[idx]
+
+
+def extract_snippet(text, query, max_chars):
+    """
+    Cut `text` to at most `max_chars` characters around its best-matching passage.
+
+    Returns (snippet, truncated). Falls back to the start of the text when no
+    passage mentions any query term.
+    """
+    if len(text) <= max_chars:
+        return text, False
+
+    window = max(max_chars - 2 * len(ELLIPSIS), 1)
+    passage = best_passage(text, query_terms(query))
+    if passage is None:
+        start = 0
+    else:
+        passage_start, passage_end = passage
+        if passage_end - passage_start >= window:
+            start = passage_start
+        else:
+            centre = (passage_start + passage_end) // 2
+            start = max(0, min(centre - window // 2, len(text) - window))
+    end = min(len(text), start + window)
+
+    # Avoid cutting words in half when a nearby space allows it
+    if start > 0:
+        space = text.find(" ", start, start + 20)
+        if space != -1:
+            start = space + 1
+    if end < len(text):
+        space = text.rfind(" ", end - 20, end)
+        if space > start:
+            end = space
+
+    snippet = text[start:end].strip()
+    if start > 0:
+        snippet = ELLIPSIS + snippet
+    if end < len(text):
+        snippet = snippet + ELLIPSIS
+    return snippet, True
+
+
+def format_results(points, query, max_chars):
+    """
+    Turn scored points into small dicts whose texts fit in `max_chars` overall.
+
+    The budget is shared in rank order: each hit may use an equal share of
+    what is left, so short messages leave more room for the ones after them.
+    Once less than MIN_SNIPPET_CHARS is left, the remaining hits are dropped.
+    """
+    formatted = []
+    remaining = max_chars
+    for i, point in enumerate(points):
+        if formatted and remaining < MIN_SNIPPET_CHARS:
+            break
+        payload = point.payload or {}
+        share = min(max(remaining // (len(points) - i), MIN_SNIPPET_CHARS), remaining)
+        snippet, truncated = extract_snippet(payload.get("text") or "", query, share)
+        remaining = max(remaining - len(snippet), 0)
+
+        result = {"score": round(point.score, 4), "text": snippet}
+        for field in RESULT_FIELDS:
+            if field != "text" and payload.get(field) is not None:
+                result[field] = payload[field]
+        if truncated:
+            result["truncated"] = True
+            result["full_length"] = len(payload["text"])
+        formatted.append(result)
+    return formatted
+
+
+def format_messages(records, max_chars):
+    """
+    Conversation messages in the order given, as small dicts whose texts fit in `max_chars`.
+
+    Shared like format_results, but each text is cut from its start rather
+    than around a query match.
+    """
+    formatted = []
+    remaining = max_chars
+    for i, record in enumerate(records):
+        if formatted and remaining < MIN_SNIPPET_CHARS:
+            break
+        payload = record.payload or {}
+        share = min(max(remaining // (len(records) - i), MIN_SNIPPET_CHARS), remaining)
+        snippet, truncated = extract_snippet(payload.get("text") or "", "", share)
+        remaining = max(remaining - len(snippet), 0)
+
+        result = {}
+        for field in ("exchange_index", "role", "timestamp", "model"):
+            if payload.get(field) is not None:
+                result[field] = payload[field]
+        result["text"] = snippet
+        if truncated:
+            result["truncated"] = True
+            result["full_length"] = len(payload["text"])
+        formatted.append(result)
+    return formatted
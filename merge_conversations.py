@@ -7,12 +7,15 @@ Groups messages by conversation_id and extracts user inputs and assistant respon
 import json
 import os
 import glob
+import time
 from datetime import datetime
 from collections import defaultdict
 
+import tracing
+
 
 def extract_text_from_patches(events):
-    """Extract text content from patch events in the stream."""
+    """Extract text content from patch events in files captured without a text_decoder."""
     text_parts = []
     
     for event in events:
@@ -47,6 +50,7 @@ def parse_conversation_file(filepath):
         "request_url": data.get("request_url"),
         "events_count": data.get("events_count"),
         "conversation_id": data.get("conversation_id"),  # First check top-level conversation_id
+        "trace_id": data.get("trace_id"),
         "user_message": None,
         "assistant_response": None,
         "metadata": {}
@@ -126,15 +130,20 @@ def parse_conversation_file(filepath):
                     "request_id": event.get("metadata", {}).get("request_id"),
                 }
         
-        # Extract assistant response text from patches (ChatGPT)
-        result["assistant_response"] = extract_text_from_patches(events)
+        # capture_req.py decodes the delta stream while capturing; only files
+        # captured before that need their patches re-read
+        if data.get("text_decoder"):
+            result["assistant_response"] = data.get("reconstructed_text", "")
+        else:
+            result["assistant_response"] = extract_text_from_patches(events)
     
     return result
 
 
 def merge_conversations(parsed_dir="./parsed_matches", output_dir="./merged_conversations"):
     """Merge all parsed conversation files grouped by conversation_id."""
-    
+    merge_started = time.time()
+
     # Create output directory structure
     os.makedirs(output_dir, exist_ok=True)
     
@@ -222,7 +231,8 @@ def merge_conversations(parsed_dir="./parsed_matches", output_dir="./merged_conv
                     "model": exchange.get("metadata", {}).get("model") or
                              exchange.get("metadata", {}).get("model_slug") or 
                              exchange.get("metadata", {}).get("server_metadata", {}).get("model_slug"),
-                    "metadata": exchange.get("metadata")
+                    "metadata": exchange.get("metadata"),
+                    "trace_id": exchange.get("trace_id"),
                 }
                 
                 conversation["exchanges"].append(exchange_data)
@@ -234,8 +244,27 @@ def merge_conversations(parsed_dir="./parsed_matches", output_dir="./merged_conv
             conv_filename = f"{conv_id}__conversation_merged.json"
             conv_filepath = os.path.join(provider_dir, conv_filename)
             
-            with open(conv_filepath, 'w', encoding='utf-8') as f:
-                json.dump(conversation, f, indent=2, ensure_ascii=False)
+            # Only rewrite files whose content changed, so their mtime keeps telling
+            # store_chat_message.py which conversations need ingesting
+            content = json.dumps(conversation, indent=2, ensure_ascii=False)
+            existing = None
+            if os.path.exists(conv_filepath):
+                with open(conv_filepath, 'r', encoding='utf-8') as f:
+                    existing = f.read()
+            if existing != content:
+                with open(conv_filepath, 'w', encoding='utf-8') as f:
+                    f.write(content)
+                # Only exchanges new to this file get a merge span; re-merges don't add to old traces
+                merged_before = set()
+                if existing:
+                    try:
+                        merged_before = {ex.get("trace_id") for ex in json.loads(existing).get("exchanges", [])}
+                    except ValueError:
+                        pass
+                new_traces = [ex["trace_id"] for ex in conversation["exchanges"]
+                              if ex.get("trace_id") and ex["trace_id"] not in merged_before]
+                tracing.record_span(new_traces, "merge", merge_started, time.time(),
+                                    provider=provider, conversation_id=conv_id)
             
             print(f"  ✓ {conv_id}: {len(exchanges)} exchanges -> {conv_filename}")
             
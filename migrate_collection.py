@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Move an existing Qdrant collection to a different storage profile.
+
+Vectors are copied from the source collection (truncated and re-normalised when
+the target profile uses fewer dimensions), so no embedding calls are made.
+Afterwards recall@k of the target is measured against an exact (brute-force,
+full-precision) search on the source, using stored vectors as sample queries.
+
+With --reindex the source is the `chat_messages` alias (see
+collection_aliases.py) and the target its next version, chat_messages_vN.
+The copy is throttled with --max-points-per-s so live searches keep their
+latency, points written, changed or deleted by ingestion meanwhile are
+caught up, and the alias is only swapped once the counts match and recall
+reaches --min-recall.
+Ingestion and the MCP server keep addressing `chat_messages` throughout and
+pick up the new profile on their own (a running ingestion must be restarted
+when the dimensions change).
+
+Usage:
+    python migrate_collection.py --profile compact
+    python migrate_collection.py --source chat_messages --target chat_messages_tiny --profile tiny --k 10
+    python migrate_collection.py --target chat_messages_compact --profile compact --recall-only
+    python migrate_collection.py --reindex --profile compact --max-points-per-s 2000 [--drop-old]
+
+Without --reindex, point ingestion and the MCP server at the new collection
+with QDRANT_COLLECTION=<target> and STORAGE_PROFILE=<profile>.
+"""
+
+import os
+import sys
+import argparse
+import random
+import time
+
+import dotenv
+from qdrant_client.models import PointStruct
+
+import storage_profiles
+import collection_aliases
+import collection_version
+import vector_store
+
+
+def throttle(started, done, max_rate):
+    """Sleep until `done` items since `started` are within `max_rate` per second."""
+    if max_rate:
+        delay = started + done / max_rate - time.time()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def reduced_points(records, profile):
+    return [
+        PointStruct(
+            id=record.id,
+            vector=storage_profiles.reduce_vector(record.vector, profile["dimensions"]),
+            payload=record.payload,
+        )
+        for record in records
+    ]
+
+
+def copy_points(qdrant, source, target, profile, batch_size, sample_size, max_rate=None):
+    """
+    Copy every point from `source` into `target`, reducing vectors to the profile's size,
+    at no more than `max_rate` points per second if set.
+
+    Returns the number of points copied and a reservoir sample of point ids to use
+    as recall queries.
+    """
+    sample = []
+    copied = 0
+    offset = None
+    rng = random.Random(13)
+    started = time.time()
+
+    while True:
+        records, offset = qdrant.scroll(
+            collection_name=source,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True,
+        )
+        if not records:
+            break
+
+        # Intermediate batches don't wait; the final one below acts as the barrier
+        qdrant.upsert(collection_name=target, points=reduced_points(records, profile), wait=offset is None)
+
+        for record in records:
+            copied += 1
+            if len(sample) < sample_size:
+                sample.append(record.id)
+            else:
+                slot = rng.randrange(copied)
+                if slot < sample_size:
+                    sample[slot] = record.id
+
+        rate = copied / max(time.time() - started, 1e-9)
+        print(f"  Copied {copied} points ({rate:.0f} points/s)")
+
+        if offset is None:
+            break
+        throttle(started, copied, max_rate)
+
+    return copied, sample
+
+
+def catch_up(qdrant, source, target, profile, batch_size, max_rate=None, missing_only=False):
+    """
+    Bring `target` in line with what changed in `source` since the bulk copy:
+    points written meanwhile and points whose payload changed are (re-)copied,
+    and ids deleted from the source are deleted from the target. Vectors are
+    fetched for the points to copy alone. Returns (copied, deleted).
+
+    Once the alias points at `target`, ingestion writes there and the source is
+    stale, so with missing_only=True only points the target lacks are copied.
+    """
+    copied = 0
+    offset = None
+    started = time.time()
+    while True:
+        records, offset = qdrant.scroll(
+            collection_name=source, limit=batch_size, offset=offset, with_payload=not missing_only,
+            with_vectors=False,
+        )
+        ids = [record.id for record in records]
+        present = {
+            record.id: record.payload
+            for record in qdrant.retrieve(collection_name=target, ids=ids, with_payload=not missing_only)
+        }
+        stale = [
+            record.id for record in records
+            if record.id not in present or (not missing_only and present[record.id] != record.payload)
+        ]
+        if stale:
+            found = qdrant.retrieve(collection_name=source, ids=stale, with_payload=True, with_vectors=True)
+            qdrant.upsert(collection_name=target, points=reduced_points(found, profile), wait=True)
+            copied += len(found)
+        if offset is None:
+            break
+        throttle(started, copied, max_rate)
+
+    if missing_only:
+        return copied, 0
+    return copied, delete_removed(qdrant, source, target, batch_size)
+
+
+def delete_removed(qdrant, source, target, batch_size):
+    """Delete the points of `target` whose ids are gone from `source`. Returns the number deleted."""
+    from qdrant_client.models import PointIdsList
+
+    deleted = 0
+    offset = None
+    while True:
+        records, offset = qdrant.scroll(
+            collection_name=target, limit=batch_size, offset=offset, with_payload=False, with_vectors=False
+        )
+        ids = [record.id for record in records]
+        kept = {record.id for record in qdrant.retrieve(collection_name=source, ids=ids, with_payload=False)}
+        removed = [i for i in ids if i not in kept]
+        if removed:
+            qdrant.delete(collection_name=target, points_selector=PointIdsList(points=removed), wait=True)
+            deleted += len(removed)
+        if offset is None:
+            return deleted
+
+
+def measure_recall(qdrant, source, target, profile, sample_ids, k):
+    """Average recall@k of `target` (with its profile's search params) vs. exact search on `source`."""
+    if not sample_ids:
+        return None
+
+    records = qdrant.retrieve(collection_name=source, ids=sample_ids, with_vectors=True, with_payload=False)
+    exact_params = storage_profiles.search_params(profile, exact=True)
+    target_params = storage_profiles.search_params(profile)
+
+    recalls = []
+    approx_latencies = []
+    for record in records:
+        exact = qdrant.query_points(
+            collection_name=source,
+            query=record.vector,
+            limit=k,
+            search_params=exact_params,
+            with_payload=False,
+        ).points
+
+        started = time.perf_counter()
+        approx = qdrant.query_points(
+            collection_name=target,
+            query=storage_profiles.reduce_vector(record.vector, profile["dimensions"]),
+            limit=k,
+            search_params=target_params,
+            with_payload=False,
+        ).points
+        approx_latencies.append(time.perf_counter() - started)
+
+        expected = {p.id for p in exact}
+        if expected:
+            recalls.append(len(expected & {p.id for p in approx}) / len(expected))
+
+    approx_latencies.sort()
+    return {
+        "queries": len(recalls),
+        "recall": sum(recalls) / len(recalls) if recalls else 0.0,
+        "p50_ms": approx_latencies[len(approx_latencies) // 2] * 1000,
+    }
+
+
+def reindex(qdrant, alias, profile, args):
+    """
+    Build the next version of `alias` with `profile` and swap the alias to it
+    once verified. Returns 0 on success, 1 if verification failed (the new
+    collection is kept for inspection and the alias is left alone).
+    """
+    source = collection_aliases.resolve(qdrant, alias)
+    bootstrap = source == alias
+    target = args.target or collection_aliases.next_version_name(qdrant, alias)
+    if qdrant.collection_exists(target):
+        raise SystemExit(f"❌ Target collection {target} already exists")
+
+    print(f"Re-indexing {alias} ({source}) -> {target} (profile: {profile['name']}"
+          + (f", at most {args.max_points_per_s:.0f} points/s)" if args.max_points_per_s else ")"))
+    storage_profiles.create_collection(qdrant, target, profile)
+    storage_profiles.ensure_payload_indexes(qdrant, target)
+
+    copied, sample_ids = copy_points(
+        qdrant, source, target, profile, args.batch_size, args.recall_samples, args.max_points_per_s
+    )
+    late, removed = catch_up(qdrant, source, target, profile, args.batch_size, args.max_points_per_s)
+    source_count = qdrant.count(collection_name=source, exact=True).count
+    target_count = qdrant.count(collection_name=target, exact=True).count
+    print(f"✓ Copied {copied} points, caught up {late} written or changed meanwhile and deleted {removed} "
+          f"removed meanwhile (source: {source_count}, target: {target_count})")
+    if target_count < source_count:
+        print(f"❌ {target} is missing {source_count - target_count} points; alias not swapped")
+        return 1
+
+    report = measure_recall(qdrant, source, target, profile, sample_ids, args.k)
+    if report is not None:
+        print(f"Recall@{args.k} vs. exact search on {source}: {report['recall']:.4f} "
+              f"over {report['queries']} queries (p50 {report['p50_ms']:.1f} ms)")
+        if report["recall"] < args.min_recall:
+            print(f"❌ Recall below --min-recall {args.min_recall}; alias not swapped, {target} kept for inspection")
+            return 1
+
+    if bootstrap:
+        # A real collection holds the alias's name; it has to go before the alias can exist
+        print(f"⚠️  {alias} is a collection, not an alias yet: replacing it (searches fail for a moment)")
+        catch_up(qdrant, source, target, profile, args.batch_size)
+        qdrant.delete_collection(source)
+        collection_aliases.point_alias(qdrant, alias, target)
+    else:
+        collection_aliases.point_alias(qdrant, alias, target)
+        # Writes that reached the old collection between the catch-up and the swap
+        late, _ = catch_up(qdrant, source, target, profile, args.batch_size, missing_only=True)
+        if late:
+            print(f"  Caught up {late} points written during the swap")
+    storage_profiles.record_profile(alias, profile["name"])
+    collection_version.bump_version(alias)
+    print(f"✓ {alias} now points to {target}")
+
+    if not bootstrap:
+        if args.drop_old:
+            qdrant.delete_collection(source)
+            print(f"✓ Dropped {source}")
+        else:
+            print(f"  {source} is kept for rollback; delete it once {target} has proven itself")
+    return 0
+
+
+def main():
+    dotenv.load_dotenv()
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", default=storage_profiles.COLLECTION_NAME)
+    parser.add_argument("--target", help="target collection (default: <source>_<profile>)")
+    parser.add_argument("--profile", choices=sorted(storage_profiles.STORAGE_PROFILES),
+                        help="target storage profile (required unless --reindex, which defaults to the current one)")
+    parser.add_argument("--host", default=os.getenv("QDRANT_HOST", "localhost"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("QDRANT_PORT", "6333")))
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--k", type=int, default=10, help="k for recall@k")
+    parser.add_argument("--recall-samples", type=int, default=200)
+    parser.add_argument("--recall-only", action="store_true", help="skip copying, only measure recall")
+    parser.add_argument("--reindex", action="store_true",
+                        help="build the next <source>_vN and swap the <source> alias to it once verified")
+    parser.add_argument("--max-points-per-s", type=float, default=None, help="throttle the copy (default: unthrottled)")
+    parser.add_argument("--min-recall", type=float, default=0.9, help="--reindex: recall@k needed to swap")
+    parser.add_argument("--drop-old", action="store_true", help="--reindex: delete the previous version after the swap")
+    args = parser.parse_args()
+    if not args.profile and not args.reindex:
+        parser.error("--profile is required without --reindex")
+
+    profile = storage_profiles.get_profile(args.profile)
+    target = args.target or f"{args.source}_{profile['name']}"
+    qdrant = vector_store.open_client(host=args.host, port=args.port, timeout=120)
+
+    if not qdrant.collection_exists(args.source):
+        raise SystemExit(f"❌ Source collection {args.source} does not exist")
+
+    source_dims = storage_profiles.collection_dimensions(qdrant, args.source)
+    if source_dims < profile["dimensions"]:
+        raise SystemExit(
+            f"❌ Source has {source_dims}-dim vectors; profile '{profile['name']}' needs "
+            f"{profile['dimensions']}. Growing vectors requires re-embedding."
+        )
+
+    if args.reindex:
+        return reindex(qdrant, args.source, profile, args)
+
+    if args.recall_only:
+        sample_ids = [
+            record.id
+            for record in qdrant.scroll(collection_name=args.source, limit=args.recall_samples, with_payload=False)[0]
+        ]
+    else:
+        if qdrant.collection_exists(target):
+            raise SystemExit(f"❌ Target collection {target} already exists")
+
+        print(f"Migrating {args.source} ({source_dims} dims) -> {target} (profile: {profile['name']})")
+        storage_profiles.create_collection(qdrant, target, profile)
+        storage_profiles.ensure_payload_indexes(qdrant, target)
+
+        copied, sample_ids = copy_points(
+            qdrant, args.source, target, profile, args.batch_size, args.recall_samples
+        )
+        source_count = qdrant.count(collection_name=args.source, exact=True).count
+        target_count = qdrant.count(collection_name=target, exact=True).count
+        print(f"✓ Copied {copied} points (source: {source_count}, target: {target_count})")
+
+    report = measure_recall(qdrant, args.source, target, profile, sample_ids, args.k)
+    if report is None:
+        print("⊘ Source collection is empty, nothing to measure")
+        return
+
+    print(f"\nRecall@{args.k} vs. exact search on {args.source}: {report['recall']:.4f} "
+          f"over {report['queries']} queries (p50 {report['p50_ms']:.1f} ms)")
+    print(f"\nTo use it: QDRANT_COLLECTION={target} STORAGE_PROFILE={profile['name']}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
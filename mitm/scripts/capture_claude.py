@@ -4,14 +4,28 @@ import os
 import json
 import time
 import gzip
+import sys
+import logging
 import subprocess
-from mitmproxy import http, ctx
+from mitmproxy import http
 
 HOST_RE = re.compile(r"(?:^|\.)claude\.ai$", re.IGNORECASE)
 PATH_RE = re.compile(r"^/api/organizations/[^/]+/chat_conversations/[^/]+/completion$", re.IGNORECASE)
 OUT_DIR = "./parsed_matches"
+# Set DEX_BRIDGE_AUTO_PIPELINE=0 to only write the parsed files, without running merge/store after each one
+AUTO_PIPELINE = os.getenv("DEX_BRIDGE_AUTO_PIPELINE", "1") != "0"
 os.makedirs(OUT_DIR, exist_ok=True)
 
+# tracing.py lives in the project root; without its dependencies the addon just captures untraced
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+try:
+    import tracing
+except ImportError:
+    tracing = None
+
+# mitmproxy shows standard logging records in its event log (ctx.log was removed in mitmproxy 11)
+logger = logging.getLogger(__name__)
+
 
 def try_json_load(s):
     try:
@@ -191,7 +205,7 @@ class ClaudeStreamParserAddon:
         if HOST_RE.search(host) and PATH_RE.search(path):
             # Disable streaming for this response so we can capture the full content
             flow.response.stream = False
-            ctx.log.info(f"[CLAUDE PARSER] disabled streaming for {host}{path}")
+            logger.info(f"[CLAUDE PARSER] disabled streaming for {host}{path}")
     
     def response(self, flow: http.HTTPFlow) -> None:
         # Only operate on matching host/path
@@ -207,7 +221,8 @@ class ClaudeStreamParserAddon:
         if not (HOST_RE.search(host) and PATH_RE.search(path)):
             return
 
-        ctx.log.info(f"[CLAUDE PARSER] matched response for {host}{path}")
+        logger.info(f"[CLAUDE PARSER] matched response for {host}{path}")
+        parse_started = time.time()
 
         # Get response text - mitmproxy handles decompression automatically
         text = None
@@ -217,10 +232,10 @@ class ClaudeStreamParserAddon:
             text = flow.response.get_text(strict=False)
             
             if text:
-                ctx.log.info(f"[CLAUDE PARSER] got response text, length: {len(text)}")
+                logger.info(f"[CLAUDE PARSER] got response text, length: {len(text)}")
             
         except Exception as e:
-            ctx.log.warn(f"[CLAUDE PARSER] failed to get response text: {e}")
+            logger.warning(f"[CLAUDE PARSER] failed to get response text: {e}")
             
             # Fallback: try to decode raw content manually
             try:
@@ -235,14 +250,14 @@ class ClaudeStreamParserAddon:
                     # Check if it's gzip compressed
                     if raw_bytes[:2] == b'\x1f\x8b':
                         text = gzip.decompress(raw_bytes).decode("utf-8", errors="replace")
-                        ctx.log.info("[CLAUDE PARSER] manually decompressed gzip")
+                        logger.info("[CLAUDE PARSER] manually decompressed gzip")
                     else:
                         text = raw_bytes.decode("utf-8", errors="replace")
             except Exception as e2:
-                ctx.log.warn(f"[CLAUDE PARSER] manual decode also failed: {e2}")
+                logger.warning(f"[CLAUDE PARSER] manual decode also failed: {e2}")
 
         if not text:
-            ctx.log.warn("[CLAUDE PARSER] no response text to parse")
+            logger.warning("[CLAUDE PARSER] no response text to parse")
             return
 
         # Extract user input from request body
@@ -257,9 +272,9 @@ class ClaudeStreamParserAddon:
                     # Claude request format: {"prompt": "...", "parent_message_uuid": "...", ...}
                     user_input = request_data.get("prompt")
                     parent_message_uuid = request_data.get("parent_message_uuid")
-                    ctx.log.info(f"[CLAUDE PARSER] extracted user prompt: {user_input[:50] if user_input else 'None'}...")
+                    logger.info(f"[CLAUDE PARSER] extracted user prompt: {user_input[:50] if user_input else 'None'}...")
         except Exception as e:
-            ctx.log.warn(f"[CLAUDE PARSER] failed to parse request body: {e}")
+            logger.warning(f"[CLAUDE PARSER] failed to parse request body: {e}")
 
         # Heuristic: try SSE -> NDJSON -> full JSON
         events = parse_sse_like(text)
@@ -295,6 +310,8 @@ class ClaudeStreamParserAddon:
                     conversation_id = e["conversation_id"]
                     break
 
+        trace_id = tracing.new_trace_id() if tracing else None
+
         # Build final JSON structure
         result = {
             "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
@@ -302,6 +319,7 @@ class ClaudeStreamParserAddon:
             "host": host,
             "path": path,
             "conversation_id": conversation_id,
+            "trace_id": trace_id,
             "user_input": user_input,
             "parent_message_uuid": parent_message_uuid,
             "reconstructed_text": reconstructed_text,
@@ -309,6 +327,14 @@ class ClaudeStreamParserAddon:
             "parsed_events_preview": parsed_events,  # save all events, not just preview
         }
 
+        if trace_id:
+            attributes = {"provider": host, "conversation_id": conversation_id}
+            request_started = getattr(flow.request, "timestamp_start", None)
+            response_ended = getattr(flow.response, "timestamp_end", None)
+            if request_started and response_ended:
+                tracing.record_span(trace_id, "capture", request_started, response_ended, **attributes)
+            tracing.record_span(trace_id, "parse", parse_started, time.time(), events=len(events), **attributes)
+
         # Create provider-specific subdirectory
         safe_host = re.sub(r"[^\w\-\_\.]", "_", host)
         provider_dir = os.path.join(OUT_DIR, safe_host)
@@ -322,13 +348,19 @@ class ClaudeStreamParserAddon:
             fname = os.path.join(provider_dir, f"{ts}__conversation_parsed.json")
         
         try:
+            write_started = time.time()
             with open(fname, "w", encoding="utf-8") as f:
                 json.dump(result, f, indent=2, ensure_ascii=False)
-            ctx.log.info(f"[CLAUDE PARSER] wrote parsed JSON -> {fname}")
+            if trace_id:
+                tracing.record_span(trace_id, "write", write_started, time.time(), file=os.path.basename(fname))
+            logger.info(f"[CLAUDE PARSER] wrote parsed JSON -> {fname}")
             
+            if not AUTO_PIPELINE:
+                return
+
             # Auto-run merge script
             try:
-                ctx.log.info("[CLAUDE PARSER] running merge script...")
+                logger.info("[CLAUDE PARSER] running merge script...")
                 # Get the project root directory (two levels up from mitm/scripts/)
                 script_dir = os.path.dirname(os.path.abspath(__file__))
                 project_root = os.path.dirname(os.path.dirname(script_dir))
@@ -339,11 +371,11 @@ class ClaudeStreamParserAddon:
                     stderr=subprocess.PIPE
                 )
             except Exception as e:
-                ctx.log.warn(f"[CLAUDE PARSER] failed to run merge script: {e}")
+                logger.warning(f"[CLAUDE PARSER] failed to run merge script: {e}")
 
             # Auto-run store script in background (don't wait for completion)
             try:
-                ctx.log.info("[CLAUDE PARSER] running store script in background...")
+                logger.info("[CLAUDE PARSER] running store script in background...")
                 # Get the project root directory (two levels up from mitm/scripts/)
                 script_dir = os.path.dirname(os.path.abspath(__file__))
                 project_root = os.path.dirname(os.path.dirname(script_dir))
@@ -356,12 +388,12 @@ class ClaudeStreamParserAddon:
                     stderr=subprocess.DEVNULL,  # Don't capture errors
                     start_new_session=True  # Detach from parent process
                 )
-                ctx.log.info("[CLAUDE PARSER] ✓ Store script started in background")
+                logger.info("[CLAUDE PARSER] ✓ Store script started in background")
             except Exception as e:
-                ctx.log.warn(f"[CLAUDE PARSER] failed to run store script: {e}")
+                logger.warning(f"[CLAUDE PARSER] failed to run store script: {e}")
                 
         except Exception as e:
-            ctx.log.warn(f"[CLAUDE PARSER] failed to write {fname}: {e}")
+            logger.warning(f"[CLAUDE PARSER] failed to write {fname}: {e}")
 
 
 addons = [
@@ -3,13 +3,29 @@ import re
 import os
 import json
 import time
+import sys
+import logging
 import subprocess
-from mitmproxy import http, ctx
+from mitmproxy import http
 
 HOST_RE = re.compile(r"(?:^|\.)chatgpt\.com$", re.IGNORECASE)
 PATH_RE = re.compile(r"^/backend-api/f/conversation$", re.IGNORECASE)
 OUT_DIR = "./parsed_matches"
+# Set DEX_BRIDGE_AUTO_PIPELINE=0 to only write the parsed files, without running merge/store after each one
+AUTO_PIPELINE = os.getenv("DEX_BRIDGE_AUTO_PIPELINE", "1") != "0"
 os.makedirs(OUT_DIR, exist_ok=True)
+# Recorded in each parsed file whose reconstructed_text came from DeltaDecoder
+TEXT_DECODER = "delta-v1"
+
+# tracing.py lives in the project root; without its dependencies the addon just captures untraced
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+try:
+    import tracing
+except ImportError:
+    tracing = None
+
+# mitmproxy shows standard logging records in its event log (ctx.log was removed in mitmproxy 11)
+logger = logging.getLogger(__name__)
 
 
 def try_json_load(s):
@@ -78,6 +94,147 @@ def extract_text_from_event(obj):
     return pieces
 
 
+class DeltaDecoder:
+    """
+    Rebuilds the messages of one ChatGPT response from its delta-encoded events.
+
+    The stream opens each message with {"p": "", "o": "add", "v": {"message": ...}, "c": N}
+    and then edits it with JSON-pointer operations (add, replace, append, truncate,
+    remove), either one per event or several in an {"o": "patch", "v": [...]} event.
+    Events may leave out "p", "o" and "c": they then carry over from the previous
+    top-level operation or the last append to a content part inside a patch (not
+    from the status/end_turn updates that usually close a patch), so a run of
+    {"v": " more text"} events keeps appending to /message/content/parts/0 of the
+    same message. Feed events in order with apply(); text() returns the
+    assistant's answer.
+    """
+
+    def __init__(self):
+        self.messages = {}  # "c" channel -> {"message": {...}, ...}
+        self.channel = 0
+        self.path = ""
+        self.op = "add"
+        self._pending = None  # ((channel, path), pieces, container, key) of the string being appended to
+
+    def apply(self, event):
+        """Apply one parsed event. Returns False for events that aren't deltas (input_message, metadata, ...)."""
+        if not isinstance(event, dict) or "type" in event:
+            return False
+        if not ("v" in event or "o" in event or "p" in event):
+            # Non-delta streams send the whole message so far in every event
+            message = event.get("message")
+            if isinstance(message, dict):
+                self._flush()
+                self.messages[message.get("id") or self.channel] = {"message": message}
+                return True
+            return False
+
+        if "c" in event:
+            self.channel = event["c"]
+        value = event.get("v")
+        op = event.get("o", self.op)
+        if op == "patch" or ("o" not in event and "p" not in event and is_patch_list(value)):
+            for operation in value:
+                if isinstance(operation, dict):
+                    path, op = operation.get("p", self.path), operation.get("o", self.op)
+                    self._apply(path, op, operation.get("v"))
+                    if op == "append" and "/content/parts/" in path:
+                        self.path, self.op = path, op
+            return True
+        self.path = event.get("p", self.path)
+        self.op = op
+        self._apply(self.path, op, value)
+        return True
+
+    def _apply(self, path, op, value):
+        if op == "append" and isinstance(value, str) and self._pending and self._pending[0] == (self.channel, path):
+            self._pending[1].append(value)
+            return
+        self._flush()
+        if path == "":
+            if op in ("add", "replace") and isinstance(value, dict):
+                self.messages[self.channel] = value
+            return
+        keys = [key.replace("~1", "/").replace("~0", "~") for key in path.lstrip("/").split("/")]
+        parent = self.messages.setdefault(self.channel, {})
+        for key, following in zip(keys, keys[1:]):
+            parent = child(parent, key, create=list if following.isdigit() else dict)
+            if parent is None:
+                return
+        last = keys[-1]
+        if isinstance(parent, list):
+            if not last.isdigit():
+                return
+            last = int(last)
+            while len(parent) <= last and op != "remove":
+                parent.append("")
+            if last >= len(parent):
+                return
+        current = parent.get(last) if isinstance(parent, dict) else parent[last]
+
+        if op in ("add", "replace"):
+            parent[last] = value
+        elif op == "append":
+            if isinstance(current, list):
+                current.extend(value if isinstance(value, list) else [value])
+            elif isinstance(current, dict) and isinstance(value, dict):
+                current.update(value)
+            elif isinstance(value, str):
+                parent[last] = current if isinstance(current, str) else ""
+                # Following appends to the same string are joined once, not copied per event
+                self._pending = ((self.channel, path), [value], parent, last)
+            else:
+                parent[last] = value
+        elif op == "truncate" and isinstance(current, (str, list)) and isinstance(value, int):
+            parent[last] = current[:value]
+        elif op == "remove" and (isinstance(parent, list) or last in parent):
+            del parent[last]
+
+    def _flush(self):
+        if self._pending:
+            _, pieces, parent, last = self._pending
+            parent[last] += "".join(pieces)
+            self._pending = None
+
+    def text(self):
+        """The assistant's answer: the text parts of its text messages, in stream order."""
+        self._flush()
+        answers = []
+        for state in self.messages.values():
+            message = state.get("message") if isinstance(state, dict) else None
+            if not isinstance(message, dict):
+                continue
+            role = (message.get("author") or {}).get("role", "assistant")
+            content = message.get("content") or {}
+            # Reasoning ("thoughts") and tool calls ("code") stream as their own messages
+            if role != "assistant" or content.get("content_type", "text") != "text":
+                continue
+            if message.get("recipient", "all") != "all":
+                continue
+            text = "".join(part for part in content.get("parts") or [] if isinstance(part, str))
+            if text:
+                answers.append(text)
+        return "\n\n".join(answers).strip()
+
+
+def is_patch_list(value):
+    return isinstance(value, list) and bool(value) and all(isinstance(v, dict) and "o" in v for v in value)
+
+
+def child(node, key, create=None):
+    """node[key] for a dict key or list index; a missing one is set to create() when given."""
+    if isinstance(node, dict):
+        if key not in node and create is not None:
+            node[key] = create()
+        return node.get(key)
+    if isinstance(node, list) and key.isdigit():
+        index = int(key)
+        while create is not None and len(node) <= index:
+            node.append(create())
+        return node[index] if index < len(node) else None
+    return None
+
+
 def parse_sse_like(text):
     """
     Parse SSE-like text into a list of JSON-parsed events.
@@ -156,7 +313,7 @@ class StreamParserAddon:
         if HOST_RE.search(host) and PATH_RE.search(path):
             # Disable streaming for this response so we can capture the full content
             flow.response.stream = False
-            ctx.log.info(f"[PARSER] disabled streaming for {host}{path}")
+            logger.info(f"[PARSER] disabled streaming for {host}{path}")
     
     def response(self, flow: http.HTTPFlow) -> None:
         # Only operate on matching host/path
@@ -172,7 +329,8 @@ class StreamParserAddon:
         if not (HOST_RE.search(host) and PATH_RE.search(path)):
             return
 
-        ctx.log.info(f"[PARSER] matched response for {host}{path}")
+        logger.info(f"[PARSER] matched response for {host}{path}")
+        parse_started = time.time()
 
         # Try multiple ways to get response bytes/text:
         text = None
@@ -186,14 +344,14 @@ class StreamParserAddon:
                 # fallback to get_text()
                 text = flow.response.get_text(strict=False)
         except Exception as e:
-            ctx.log.warn(f"[PARSER] failed to decode response content: {e}")
+            logger.warning(f"[PARSER] failed to decode response content: {e}")
             try:
                 text = flow.response.get_text(strict=False)
             except Exception:
                 text = None
 
         if not text:
-            ctx.log.warn("[PARSER] no response text to parse (response might be streamed and not buffered).")
+            logger.warning("[PARSER] no response text to parse (response might be streamed and not buffered).")
             # You may need to use mitmproxy's streaming hooks or dump raw TCP if responses are truly unbuffered.
             return
 
@@ -207,16 +365,20 @@ class StreamParserAddon:
             if obj is not None:
                 events = [obj]
 
-        # Extract textual pieces from each event
+        # One pass: ChatGPT's delta events go through the decoder, anything else
+        # (choices/delta shapes) through the generic extractor
+        decoder = DeltaDecoder()
         pieces = []
         parsed_events = []
         for e in events:
             parsed_events.append(e)
+            if decoder.apply(e):
+                continue
             extracted = extract_text_from_event(e)
             if extracted:
                 pieces.extend(extracted)
 
-        reconstructed_text = "".join(pieces).strip()
+        reconstructed_text = decoder.text() or "".join(pieces).strip()
 
         # Extract conversation_id from events
         conversation_id = None
@@ -225,6 +387,8 @@ class StreamParserAddon:
                 conversation_id = e["conversation_id"]
                 break
 
+        trace_id = tracing.new_trace_id() if tracing else None
+
         # Build final JSON structure
         result = {
             "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
@@ -232,11 +396,22 @@ class StreamParserAddon:
             "host": host,
             "path": path,
             "conversation_id": conversation_id,
+            "trace_id": trace_id,
             "reconstructed_text": reconstructed_text,
+            # merge_conversations.py takes reconstructed_text as the answer instead of re-reading the events
+            "text_decoder": TEXT_DECODER if decoder.messages else None,
             "events_count": len(events),
             "parsed_events_preview": parsed_events,  # save all events, not just preview
         }
 
+        if trace_id:
+            attributes = {"provider": host, "conversation_id": conversation_id}
+            request_started = getattr(flow.request, "timestamp_start", None)
+            response_ended = getattr(flow.response, "timestamp_end", None)
+            if request_started and response_ended:
+                tracing.record_span(trace_id, "capture", request_started, response_ended, **attributes)
+            tracing.record_span(trace_id, "parse", parse_started, time.time(), events=len(events), **attributes)
+
         # Create provider-specific subdirectory
         safe_host = re.sub(r"[^\w\-\_\.]", "_", host)
         provider_dir = os.path.join(OUT_DIR, safe_host)
@@ -250,13 +425,19 @@ class StreamParserAddon:
             fname = os.path.join(provider_dir, f"{ts}__conversation_parsed.json")
         
         try:
+            write_started = time.time()
             with open(fname, "w", encoding="utf-8") as f:
                 json.dump(result, f, indent=2, ensure_ascii=False)
-            ctx.log.info(f"[PARSER] wrote parsed JSON -> {fname}")
+            if trace_id:
+                tracing.record_span(trace_id, "write", write_started, time.time(), file=os.path.basename(fname))
+            logger.info(f"[PARSER] wrote parsed JSON -> {fname}")
             
+            if not AUTO_PIPELINE:
+                return
+
             # Auto-run merge script
             try:
-                ctx.log.info("[PARSER] running merge script...")
+                logger.info("[PARSER] running merge script...")
                 # Get the project root directory (two levels up from mitm/scripts/)
                 script_dir = os.path.dirname(os.path.abspath(__file__))
                 project_root = os.path.dirname(os.path.dirname(script_dir))
@@ -267,11 +448,11 @@ class StreamParserAddon:
                     stderr=subprocess.PIPE
                 )
             except Exception as e:
-                ctx.log.warn(f"[PARSER] failed to run merge script: {e}")
+                logger.warning(f"[PARSER] failed to run merge script: {e}")
 
             # Auto-run store script in background (don't wait for completion)
             try:
-                ctx.log.info("[PARSER] running store script in background...")
+                logger.info("[PARSER] running store script in background...")
                 # Get the project root directory (two levels up from mitm/scripts/)
                 script_dir = os.path.dirname(os.path.abspath(__file__))
                 project_root = os.path.dirname(os.path.dirname(script_dir))
@@ -284,12 +465,12 @@ class StreamParserAddon:
                     stderr=subprocess.DEVNULL,  # Don't capture errors
                     start_new_session=True  # Detach from parent process
                 )
-                ctx.log.info("[PARSER] ✓ Store script started in background")
+                logger.info("[PARSER] ✓ Store script started in background")
             except Exception as e:
-                ctx.log.warn(f"[PARSER] failed to run store script: {e}")
+                logger.warning(f"[PARSER] failed to run store script: {e}")
                 
         except Exception as e:
-            ctx.log.warn(f"[PARSER] failed to write {fname}: {e}")
+            logger.warning(f"[PARSER] failed to write {fname}: {e}")
 
 
 addons = [
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate detection before embedding (MinHash + LSH in SQLite).
+
+content_hash only catches byte-identical messages. Re-pasted prompts with a
+whitespace change, regenerated answers that differ by a sentence and "thanks!"
+turns each cost an embedding and a vector. Every message that gets stored
+registers a MinHash signature of its word 3-grams, banded into LSH buckets.
+The Ingestor checks new messages against the index before embedding them:
+
+    link   (default) don't embed or store the message; remember which point it
+           duplicates in the links table. Saves the embedding, but the message is
+           missing from Qdrant: get_conversation shows a gap where it was, and
+           only this host's near_dup.sqlite (not snapshots) records it
+    store  embed and store it anyway, with "near_duplicate_of" in its payload
+
+NEAR_DUP_THRESHOLD is the estimated Jaccard similarity (default 0.8) at
+which two messages count as duplicates; NEAR_DUP=0 turns the check off.
+
+Usage:
+    python near_dup.py rebuild        # index the messages already in the collection
+    python near_dup.py stats
+    python near_dup.py check "text to look up"
+"""
+
+import os
+import re
+import sys
+import time
+import zlib
+import sqlite3
+import hashlib
+import argparse
+import threading
+
+from storage_profiles import STATE_DIR
+
+NEAR_DUP_FILE = os.path.join(STATE_DIR, "near_dup.sqlite")
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.8"))
+NEAR_DUP_POLICY = os.getenv("NEAR_DUP_POLICY", "link")
+POLICIES = ("link", "store")
+
+NUM_PERM = 128
+SHINGLE_WORDS = 3
+# Candidates from the LSH buckets that get their full signature compared
+MAX_CANDIDATES = 64
+
+_WORD_RE = re.compile(r"\w+")
+_MERSENNE_PRIME = (1 << 61) - 1
+
+
+def shingles(text):
+    """Word 3-grams of the lowercased text, ignoring punctuation and whitespace."""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < SHINGLE_WORDS:
+        return {" ".join(words) or text.strip()}
+    return {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def rows_per_band(threshold, num_perm=NUM_PERM):
+    """
+    Largest LSH band size whose S-curve midpoint (1/b)^(1/r) stays clearly
+    below the threshold, so pairs at the threshold are nearly always candidates.
+    """
+    best = 1
+    for rows in (1, 2, 4, 8, 16, 32):
+        bands = num_perm // rows
+        if (1 / bands) ** (1 / rows) <= threshold - 0.05:
+            best = rows
+    return best
+
+
+class NearDuplicateIndex:
+    def __init__(self, path=NEAR_DUP_FILE, threshold=NEAR_DUP_THRESHOLD, policy=NEAR_DUP_POLICY, num_perm=NUM_PERM):
+        import numpy as np
+
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown NEAR_DUP_POLICY '{policy}'. Available: {', '.join(POLICIES)}")
+        self.np = np
+        self.path = path
+        self.threshold = threshold
+        self.policy = policy
+        self.num_perm = num_perm
+        self.rows = rows_per_band(threshold, num_perm)
+        # Fixed seed: signatures stored by earlier runs must stay comparable
+        rng = np.random.RandomState(1)
+        self.a = rng.randint(1, _MERSENNE_PRIME, num_perm, dtype=np.uint64)
+        self.b = rng.randint(0, _MERSENNE_PRIME, num_perm, dtype=np.uint64)
+
+        self.lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS signatures (point_id TEXT PRIMARY KEY, signature BLOB NOT NULL);
+            CREATE TABLE IF NOT EXISTS buckets (key INTEGER NOT NULL, point_id TEXT NOT NULL);
+            CREATE INDEX IF NOT EXISTS buckets_key ON buckets (key);
+            CREATE INDEX IF NOT EXISTS buckets_point ON buckets (point_id);
+            CREATE TABLE IF NOT EXISTS links (
+                point_id TEXT PRIMARY KEY, canonical_id TEXT NOT NULL, similarity REAL,
+                conversation_id TEXT, role TEXT, created REAL
+            );
+        """)
+        self.db.commit()
+
+    # -- signatures -----------------------------------------------------------
+
+    def signature(self, text):
+        np = self.np
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles(text)), dtype=np.uint64)
+        # Universal hashing (a*x + b) mod p; the uint64 product may wrap, which is fine for hashing
+        permuted = (np.outer(hashes, self.a) + self.b) % _MERSENNE_PRIME
+        return (permuted & 0xFFFFFFFF).min(axis=0).astype(np.uint32)
+
+    def bucket_keys(self, signature):
+        keys = []
+        for band in range(self.num_perm // self.rows):
+            chunk = signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            digest = hashlib.blake2b(band.to_bytes(2, "big") + chunk, digest_size=8).digest()
+            keys.append(int.from_bytes(digest, "big", signed=True))
+        return keys
+
+    def similarity(self, left, right):
+        """Estimated Jaccard similarity of two signatures."""
+        return float(self.np.count_nonzero(left == right)) / self.num_perm
+
+    # -- lookups ----------------------------------------------------------------
+
+    def _find(self, signature, keys, exclude=None):
+        placeholders = ", ".join("?" for _ in keys)
+        candidates = [
+            row[0] for row in self.db.execute(
+                f"SELECT DISTINCT point_id FROM buckets WHERE key IN ({placeholders}) LIMIT ?",
+                keys + [MAX_CANDIDATES],
+            )
+            if row[0] != exclude
+        ]
+        if not candidates:
+            return None
+        best = None
+        rows = self.db.execute(
+            f"SELECT point_id, signature FROM signatures WHERE point_id IN ({', '.join('?' for _ in candidates)})",
+            candidates,
+        )
+        for point_id, blob in rows:
+            score = self.similarity(signature, self.np.frombuffer(blob, dtype=self.np.uint32))
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (point_id, score)
+        return best
+
+    def find(self, text, exclude=None):
+        """(point_id, similarity) of the closest indexed near-duplicate of `text`, or None."""
+        signature = self.signature(text)
+        with self.lock:
+            return self._find(signature, self.bucket_keys(signature), exclude)
+
+    def check(self, point_id, text):
+        """
+        Return (canonical_point_id, similarity) if `text` nearly duplicates an
+        indexed message; otherwise register it under `point_id` and return None.
+        Lookup and registration happen under one lock, so concurrent workers
+        can't both register the same near-duplicate.
+        """
+        signature = self.signature(text)
+        keys = self.bucket_keys(signature)
+        with self.lock:
+            match = self._find(signature, keys, exclude=str(point_id))
+            if match is None:
+                self._add(str(point_id), signature, keys)
+            return match
+
+    def _add(self, point_id, signature, keys):
+        self.db.execute("INSERT OR REPLACE INTO signatures (point_id, signature) VALUES (?, ?)",
+                        (point_id, signature.tobytes()))
+        self.db.execute("DELETE FROM buckets WHERE point_id = ?", (point_id,))
+        self.db.executemany("INSERT INTO buckets (key, point_id) VALUES (?, ?)", [(k, point_id) for k in keys])
+
+    def add(self, point_id, text):
+        """Register a stored message without checking it."""
+        signature = self.signature(text)
+        with self.lock:
+            self._add(str(point_id), signature, self.bucket_keys(signature))
+
+    def discard(self, point_ids):
+        """Forget messages that were registered but then not stored (e.g. embedding failed)."""
+        rows = [(str(point_id),) for point_id in point_ids]
+        with self.lock:
+            self.db.executemany("DELETE FROM signatures WHERE point_id = ?", rows)
+            self.db.executemany("DELETE FROM buckets WHERE point_id = ?", rows)
+
+    def link(self, point_id, canonical_id, similarity, payload):
+        """Record that `point_id` was not stored because it duplicates `canonical_id`."""
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO links (point_id, canonical_id, similarity, conversation_id, role, created) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (str(point_id), str(canonical_id), similarity, payload.get("conversation_id"),
+                 payload.get("role"), time.time()),
+            )
+
+    def stats(self):
+        with self.lock:
+            indexed = self.db.execute("SELECT COUNT(*) FROM signatures").fetchone()[0]
+            linked = self.db.execute("SELECT COUNT(*) FROM links").fetchone()[0]
+        return {"indexed": indexed, "linked": linked, "threshold": self.threshold, "policy": self.policy,
+                "bands": self.num_perm // self.rows, "rows_per_band": self.rows}
+
+    def commit(self):
+        with self.lock:
+            self.db.commit()
+
+    def clear(self):
+        with self.lock:
+            self.db.execute("DELETE FROM signatures")
+            self.db.execute("DELETE FROM buckets")
+            self.db.commit()
+
+    def close(self):
+        with self.lock:
+            self.db.commit()
+            self.db.close()
+
+
+def rebuild(index, qdrant, collection_name, batch_size=512):
+    """Register every message of the collection (links are kept); lean payloads get their text from the text store."""
+    import text_store
+
+    store = text_store.TextStore() if os.path.exists(text_store.TEXT_STORE_FILE) else None
+    index.clear()
+    indexed = 0
+    offset = None
+    while True:
+        records, offset = qdrant.scroll(
+            collection_name=collection_name,
+            limit=batch_size,
+            offset=offset,
+            with_payload=["text"],
+            with_vectors=False,
+        )
+        for record in text_store.hydrate(records, store):
+            index.add(record.id, (record.payload or {}).get("text") or "")
+        indexed += len(records)
+        print(f"  Indexed {indexed} messages...", end="\r", file=sys.stderr)
+        if offset is None:
+            break
+    index.commit()
+    return indexed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Near-duplicate index consulted before embedding.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    rebuild_parser = sub.add_parser("rebuild", help="register every message in the Qdrant collection")
+    rebuild_parser.add_argument("--collection", default=None)
+    rebuild_parser.add_argument("--host", default=os.getenv("QDRANT_HOST", "localhost"))
+    rebuild_parser.add_argument("--port", type=int, default=int(os.getenv("QDRANT_PORT", "6333")))
+
+    sub.add_parser("stats", help="indexed messages and links")
+
+    check_parser = sub.add_parser("check", help="look up the closest near-duplicate of a text")
+    check_parser.add_argument("text")
+
+    parser.add_argument("--index", default=NEAR_DUP_FILE)
+    args = parser.parse_args(argv)
+
+    index = NearDuplicateIndex(args.index)
+    if args.command == "rebuild":
+        import storage_profiles
+        import vector_store
+
+        collection = args.collection or storage_profiles.COLLECTION_NAME
+        qdrant = vector_store.open_client(host=args.host, port=args.port)
+        print(f"Rebuilding near-duplicate index from {collection}...")
+        indexed = rebuild(index, qdrant, collection)
+        print(f"\n✓ Indexed {indexed} messages into {args.index}")
+    elif args.command == "stats":
+        stats = index.stats()
+        print(f"{stats['indexed']} messages indexed, {stats['linked']} near-duplicates linked instead of embedded")
+        print(f"threshold {stats['threshold']}, policy {stats['policy']}, "
+              f"{stats['bands']} bands x {stats['rows_per_band']} rows")
+    else:
+        match = index.find(args.text)
+        print(f"{match[0]}  (similarity {match[1]:.2f})" if match else "⊘ No near-duplicate")
+    index.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Durable outbox for messages that could not be embedded or upserted.
+
+When the embeddings API or Qdrant is down, store_chat_message.py used to drop
+the affected messages and hold the conversation's checkpoint back, so they
+were only retried by the next run that re-read those conversations. Now they
+go into STATE_DIR/outbox.sqlite instead and the checkpoint moves on:
+
+    embed   text and payload; needs an embeddings request
+    upsert  text, payload and the vector already paid for; needs only Qdrant
+
+Each entry has an attempt count and a next-retry time with exponential
+backoff (OUTBOX_RETRY_BASE_S doubling up to OUTBOX_RETRY_MAX_S). Every
+ingestion run drains the due entries first; `drain --watch` keeps doing so
+in the background. OUTBOX=0 restores the old behaviour.
+
+Usage:
+    python outbox.py stats [--json]
+    python outbox.py drain [--watch --interval 60] [--all]
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import threading
+from collections import namedtuple
+
+from storage_profiles import STATE_DIR
+
+OUTBOX_FILE = os.path.join(STATE_DIR, "outbox.sqlite")
+OUTBOX_RETRY_BASE_S = float(os.getenv("OUTBOX_RETRY_BASE_S", "30"))
+OUTBOX_RETRY_MAX_S = float(os.getenv("OUTBOX_RETRY_MAX_S", "3600"))
+
+Entry = namedtuple("Entry", "point_id collection text payload vector attempts")
+
+
+def retry_delay(attempts):
+    """Seconds to wait after `attempts` failures: base, 2 x base, 4 x base, ... capped."""
+    return min(OUTBOX_RETRY_BASE_S * 2 ** max(attempts - 1, 0), OUTBOX_RETRY_MAX_S)
+
+
+def vector_blob(vector):
+    import numpy as np
+
+    return None if vector is None else np.asarray(vector, dtype=np.float32).tobytes()
+
+
+class Outbox:
+    def __init__(self, path=OUTBOX_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                point_id TEXT PRIMARY KEY,
+                collection TEXT NOT NULL,
+                text TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                vector BLOB,
+                attempts INTEGER NOT NULL DEFAULT 1,
+                next_retry REAL NOT NULL,
+                created REAL NOT NULL,
+                last_error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS outbox_due ON outbox (collection, next_retry);
+        """)
+        self.db.commit()
+
+    def add(self, collection, messages, error, vectors=None):
+        """
+        Queue messages ({"point_id", "text", "payload"}) whose embedding or upsert failed.
+
+        With `vectors` they only need an upsert. A message already queued keeps
+        its creation time and attempt count, and gets the vector if one is given.
+        """
+        vectors = vectors or [None] * len(messages)
+        now = time.time()
+        rows = [
+            (
+                str(m["point_id"]), collection, m["text"], json.dumps(m["payload"], ensure_ascii=False),
+                vector_blob(vector), now + retry_delay(1), now, str(error)[:500],
+            )
+            for m, vector in zip(messages, vectors)
+        ]
+        with self.lock:
+            self.db.executemany(
+                "INSERT INTO outbox (point_id, collection, text, payload, vector, next_retry, created, last_error) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (point_id) DO UPDATE SET vector = COALESCE(excluded.vector, vector), "
+                "payload = excluded.payload, last_error = excluded.last_error",
+                rows,
+            )
+            self.db.commit()
+
+    def due(self, collection, limit, now=None, include_waiting=False):
+        """Up to `limit` entries for `collection` whose retry time has come, oldest retry first."""
+        import numpy as np
+
+        now = time.time() if now is None else now
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT point_id, collection, text, payload, vector, attempts FROM outbox "
+                "WHERE collection = ? AND next_retry <= ? ORDER BY next_retry LIMIT ?",
+                (collection, float("inf") if include_waiting else now, limit),
+            ).fetchall()
+        return [
+            Entry(point_id, coll, text, json.loads(payload),
+                  None if vector is None else np.frombuffer(vector, dtype=np.float32).tolist(), attempts)
+            for point_id, coll, text, payload, vector, attempts in rows
+        ]
+
+    def retry_later(self, entries, error, vectors=None):
+        """Count another failed attempt and push the entries' next retry out, keeping any vectors obtained."""
+        vectors = vectors or [None] * len(entries)
+        now = time.time()
+        rows = [
+            (vector_blob(vector), now + retry_delay(entry.attempts + 1), str(error)[:500], entry.point_id)
+            for entry, vector in zip(entries, vectors)
+        ]
+        with self.lock:
+            self.db.executemany(
+                "UPDATE outbox SET vector = COALESCE(?, vector), attempts = attempts + 1, next_retry = ?, "
+                "last_error = ? WHERE point_id = ?",
+                rows,
+            )
+            self.db.commit()
+
+    def remove(self, point_ids):
+        with self.lock:
+            self.db.executemany("DELETE FROM outbox WHERE point_id = ?", [(str(p),) for p in point_ids])
+            self.db.commit()
+
+    def stats(self, now=None):
+        """Queue depth (total, needing embedding, due now) and the age of the oldest entry."""
+        now = time.time() if now is None else now
+        with self.lock:
+            depth, embed, due, oldest, attempts, next_retry = self.db.execute(
+                "SELECT COUNT(*), SUM(vector IS NULL), SUM(next_retry <= ?), MIN(created), MAX(attempts), "
+                "MIN(next_retry) FROM outbox",
+                (now,),
+            ).fetchone()
+            last_error = self.db.execute(
+                "SELECT last_error FROM outbox ORDER BY rowid DESC LIMIT 1"
+            ).fetchone()
+        return {
+            "depth": depth,
+            "needs_embedding": embed or 0,
+            "needs_upsert": depth - (embed or 0),
+            "due": due or 0,
+            "oldest_age_s": round(now - oldest, 1) if oldest else None,
+            "max_attempts": attempts or 0,
+            "next_retry_in_s": round(max(next_retry - now, 0), 1) if next_retry else None,
+            "last_error": last_error[0] if last_error else None,
+        }
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Outbox of messages waiting to be embedded or upserted.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    stats_parser = sub.add_parser("stats", help="queue depth and age")
+    stats_parser.add_argument("--json", action="store_true")
+
+    drain_parser = sub.add_parser("drain", help="retry due entries")
+    drain_parser.add_argument("--all", action="store_true", help="retry every entry, due or not")
+    drain_parser.add_argument("--watch", action="store_true", help="keep draining every --interval seconds")
+    drain_parser.add_argument("--interval", type=float, default=60.0)
+
+    parser.add_argument("--outbox", default=OUTBOX_FILE)
+    args = parser.parse_args(argv)
+
+    outbox = Outbox(args.outbox)
+    if args.command == "stats":
+        stats = outbox.stats()
+        if args.json:
+            print(json.dumps(stats, indent=2))
+        elif not stats["depth"]:
+            print("✓ Outbox is empty")
+        else:
+            print(f"{stats['depth']} messages waiting ({stats['needs_embedding']} to embed, "
+                  f"{stats['needs_upsert']} to upsert), {stats['due']} due now")
+            print(f"oldest {stats['oldest_age_s']:.0f}s old, up to {stats['max_attempts']} attempts, "
+                  f"next retry in {stats['next_retry_in_s']:.0f}s")
+            print(f"last error: {stats['last_error']}")
+        return 0
+
+    from store_chat_message import Ingestor
+
+    ingestor = Ingestor(outbox=outbox)
+    try:
+        while True:
+            stored = ingestor.drain_outbox(include_waiting=args.all)
+            stats = outbox.stats()
+            if stored or not args.watch:
+                print(f"✓ Stored {stored} messages from the outbox, {stats['depth']} still waiting")
+            if not args.watch:
+                return 0 if not stats["due"] else 1
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        outbox.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,213 @@
+"""
+Named storage profiles for the chat_messages collection.
+
+A profile decides how much memory each message costs in Qdrant: the embedding
+dimensions (text-embedding-3 models accept a `dimensions` option), optional
+scalar int8 or binary quantisation with rescoring, whether the original vectors
+live on disk, and the HNSW graph parameters.
+
+Select one with the STORAGE_PROFILE environment variable (default: "default",
+or the profile recorded by the last re-index of the collection, see
+collection_aliases.py). The same profile must be used by ingestion and by the
+MCP server, since the query embedding has to match the collection's vector size.
+"""
+
+import os
+import math
+
+import dotenv
+
+# Settings below (STORAGE_PROFILE, QDRANT_COLLECTION, ...) may come from .env
+dotenv.load_dotenv()
+
+# qdrant_client is imported inside the functions below so that reading the
+# profile table stays cheap for callers that never touch Qdrant.
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_DIMENSIONS = 1536
+
+COLLECTION_NAME = os.getenv("QDRANT_COLLECTION", "chat_messages")
+
+# Local state kept next to the collection (ingestion checkpoints, caches, ...)
+STATE_DIR = os.getenv(
+    "DEX_BRIDGE_STATE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".dex_bridge"),
+)
+
+STORAGE_PROFILES = {
+    # Full-size float32 vectors in RAM. ~6 KB per message before HNSW overhead.
+    "default": {
+        "dimensions": 1536,
+        "quantization": None,
+        "on_disk": False,
+        "hnsw_m": 16,
+        "hnsw_ef_construct": 100,
+        "oversampling": None,
+    },
+    # 768 dims, int8 copy in RAM, float32 originals on disk for rescoring. ~0.8 KB in RAM.
+    "compact": {
+        "dimensions": 768,
+        "quantization": "int8",
+        "on_disk": True,
+        "hnsw_m": 16,
+        "hnsw_ef_construct": 100,
+        "oversampling": 2.0,
+    },
+    # Full dims, 1 bit per dimension in RAM, originals on disk. ~0.2 KB in RAM.
+    "binary": {
+        "dimensions": 1536,
+        "quantization": "binary",
+        "on_disk": True,
+        "hnsw_m": 16,
+        "hnsw_ef_construct": 128,
+        "oversampling": 3.0,
+    },
+    # Smallest footprint: 256 dims, int8, sparser graph. ~0.25 KB in RAM.
+    "tiny": {
+        "dimensions": 256,
+        "quantization": "int8",
+        "on_disk": True,
+        "hnsw_m": 8,
+        "hnsw_ef_construct": 64,
+        "oversampling": 2.0,
+    },
+}
+
+
+def profile_path(collection_name):
+    return os.path.join(STATE_DIR, f"{collection_name}.profile")
+
+
+def recorded_profile(collection_name=COLLECTION_NAME):
+    """Name of the profile the collection was last re-indexed with, or None."""
+    try:
+        with open(profile_path(collection_name), "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def record_profile(collection_name, name):
+    """Remember which profile `collection_name` now uses, written atomically."""
+    path = profile_path(collection_name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(name)
+    os.replace(tmp_path, path)
+
+
+DEFAULT_PROFILE = os.getenv("STORAGE_PROFILE") or recorded_profile() or "default"
+
+
+def get_profile(name=None):
+    """Return the profile dict for `name` (or the default profile), with its name included."""
+    name = name or DEFAULT_PROFILE
+    if name not in STORAGE_PROFILES:
+        raise ValueError(f"Unknown storage profile '{name}'. Available: {', '.join(STORAGE_PROFILES)}")
+    return dict(STORAGE_PROFILES[name], name=name)
+
+
+def embedding_kwargs(profile):
+    """Keyword arguments for embeddings.create() that produce vectors for this profile."""
+    kwargs = {"model": EMBEDDING_MODEL}
+    if profile["dimensions"] != EMBEDDING_DIMENSIONS:
+        kwargs["dimensions"] = profile["dimensions"]
+    return kwargs
+
+
+def reduce_vector(vector, dimensions):
+    """
+    Shorten a text-embedding-3 vector to `dimensions`.
+
+    Truncating and re-normalising gives the same result as requesting the smaller
+    size from the API, so existing vectors can be migrated without re-embedding.
+    """
+    if len(vector) == dimensions:
+        return list(vector)
+    if len(vector) < dimensions:
+        raise ValueError(f"Cannot grow a {len(vector)}-dim vector to {dimensions} dims without re-embedding")
+    head = vector[:dimensions]
+    norm = math.sqrt(sum(x * x for x in head)) or 1.0
+    return [x / norm for x in head]
+
+
+def quantization_config(profile):
+    from qdrant_client.models import (
+        BinaryQuantization,
+        BinaryQuantizationConfig,
+        ScalarQuantization,
+        ScalarQuantizationConfig,
+        ScalarType,
+    )
+
+    if profile["quantization"] == "int8":
+        return ScalarQuantization(
+            scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True)
+        )
+    if profile["quantization"] == "binary":
+        return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=True))
+    return None
+
+
+def search_params(profile, exact=False):
+    """SearchParams for queries against a collection built with this profile."""
+    from qdrant_client.models import QuantizationSearchParams, SearchParams
+
+    if exact:
+        return SearchParams(exact=True, quantization=QuantizationSearchParams(ignore=True))
+    if not profile["quantization"]:
+        return None
+    return SearchParams(
+        quantization=QuantizationSearchParams(rescore=True, oversampling=profile["oversampling"])
+    )
+
+
+def create_collection(qdrant, collection_name, profile):
+    """Create `collection_name` with the vector, HNSW and quantisation settings of `profile`."""
+    from qdrant_client.models import Distance, HnswConfigDiff, VectorParams
+
+    qdrant.create_collection(
+        collection_name=collection_name,
+        vectors_config=VectorParams(
+            size=profile["dimensions"],
+            distance=Distance.COSINE,
+            on_disk=profile["on_disk"],
+        ),
+        hnsw_config=HnswConfigDiff(m=profile["hnsw_m"], ef_construct=profile["hnsw_ef_construct"]),
+        quantization_config=quantization_config(profile),
+    )
+
+
+def payload_indexes():
+    """Payload fields we filter on (dedup lookups, search filters) and their index types."""
+    from qdrant_client.models import PayloadSchemaType
+
+    return {
+        "content_hash": PayloadSchemaType.KEYWORD,
+        "conversation_id": PayloadSchemaType.KEYWORD,
+        "provider": PayloadSchemaType.KEYWORD,
+        "role": PayloadSchemaType.KEYWORD,
+        "timestamp": PayloadSchemaType.DATETIME,
+        "exchange_index": PayloadSchemaType.INTEGER,
+    }
+
+
+def ensure_payload_indexes(qdrant, collection_name):
+    """Create any missing payload indexes so filtered lookups don't scan the whole collection."""
+    existing = qdrant.get_collection(collection_name).payload_schema or {}
+    for field_name, field_schema in payload_indexes().items():
+        if field_name in existing:
+            continue
+        qdrant.create_payload_index(
+            collection_name=collection_name,
+            field_name=field_name,
+            field_schema=field_schema,
+            wait=True,
+        )
+        print(f"Created payload index: {field_name} ({field_schema.value})")
+
+
+def collection_dimensions(qdrant, collection_name):
+    """Vector size of an existing collection."""
+    return qdrant.get_collection(collection_name).config.params.vectors.size
@@ -1,207 +1,861 @@
-import dotenv
+"""
+Embed merged conversations and store them in the Qdrant chat_messages collection.
+
+Can be used as a library:
+
+    from store_chat_message import Ingestor
+
+    with Ingestor() as ingestor:
+        ingestor.store_directory("./merged_conversations/chatgpt.com")
+
+or run as a script:
+
+    python store_chat_message.py [--providers chatgpt.com claude.ai] [--full]
+    python store_chat_message.py ./merged_conversations/claude.ai
+
+Importing this module is cheap: the Qdrant and OpenAI clients (and the
+qdrant_client/openai/httpx packages) are only loaded when first needed.
+"""
+
 import os
+import sys
 import json
 import glob
 import uuid
 import hashlib
-import ssl
-import httpx
 import time
-from qdrant_client import QdrantClient
-from qdrant_client.models import VectorParams, Distance, Filter, FieldCondition, MatchValue
-from openai import OpenAI
-
-
-dotenv.load_dotenv()
-qdrant = QdrantClient(host="localhost", port=6333)
-
-# Create custom httpx client with timeout and no SSL verification
-http_client = httpx.Client(
-    verify=False,
-    timeout=60.0  # 60 second timeout
-)
-
-client = OpenAI(
-    api_key=os.getenv("OPENAI_API_KEY"),
-    http_client=http_client,
-    max_retries=3  # Retry up to 3 times
-)
-
-collection_name = "chat_messages"
-
-# Use create_collection instead of deprecated recreate_collection
-if not qdrant.collection_exists(collection_name):
-    qdrant.create_collection(
-        collection_name=collection_name,
-        vectors_config=VectorParams(size=1536, distance=Distance.COSINE),
-    )
-    print(f"Created collection: {collection_name}")
-else:
-    print(f"Collection {collection_name} already exists, will skip duplicates")
-
-# Load conversations from merged_conversations directory (ChatGPT only)
-MERGED_DIR = "./merged_conversations/chatgpt.com"
-conversation_files = glob.glob(os.path.join(MERGED_DIR, "*__conversation_merged.json"))
-
-print(f"Found {len(conversation_files)} ChatGPT conversations\n")
-
-def get_embedding(text, max_retries=3):
-    """Get embedding with retry logic for timeout errors."""
-    for attempt in range(max_retries):
-        try:
-            response = client.embeddings.create(
-                input=text,
-                model="text-embedding-3-small"
-            )
-            return response.data[0].embedding
-        except Exception as e:
-            error_msg = str(e)
-            if attempt < max_retries - 1:
-                wait_time = (attempt + 1) * 2  # Exponential backoff: 2s, 4s, 6s
-                print(f"  ⚠️  API error (attempt {attempt + 1}/{max_retries}): {error_msg[:80]}...")
-                print(f"     Retrying in {wait_time} seconds...")
-                time.sleep(wait_time)
-            else:
-                print(f"  ❌ Failed after {max_retries} attempts: {error_msg[:100]}")
-                raise
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import storage_profiles
+import collection_version
+import collection_aliases
+import tracing
+from ingest_checkpoint import IngestCheckpoint
+
+# Merged conversations live in one subdirectory per provider
+MERGED_ROOT = "./merged_conversations"
+PROVIDERS = [p.strip() for p in os.getenv("INGEST_PROVIDERS", "chatgpt.com,claude.ai").split(",") if p.strip()]
+
+# Where to find a message id for each role, per provider, in order of preference.
+# The exchange metadata describes the assistant message, whose parent is the
+# user message. Claude exchanges have no user_message_id at all, so there the
+# human message's uuid comes from the assistant's parent_uuid. Claude assistant
+# messages key on their uuid rather than the message_start id: the uuid is
+# also what claude.ai exports carry, so a captured and then imported message
+# lands on the same point. file_source (one capture file per exchange) is the
+# last resort so ids never collapse to "None".
+ID_FALLBACKS = {
+    "chatgpt.com": {
+        "user": ["user_message_id", "metadata.parent_id", "file_source"],
+        "assistant": ["assistant_message_id", "user_message_id", "file_source"],
+    },
+    "claude.ai": {
+        "user": ["user_message_id", "metadata.parent_uuid", "file_source"],
+        "assistant": ["metadata.assistant_uuid", "assistant_message_id", "file_source"],
+    },
+}
+DEFAULT_ID_FALLBACKS = {
+    "user": ["user_message_id", "file_source"],
+    "assistant": ["assistant_message_id", "file_source"],
+}
+
+QDRANT_HOST = os.getenv("QDRANT_HOST", "localhost")
+QDRANT_PORT = int(os.getenv("QDRANT_PORT", "6333"))
+
+# Points are sent to Qdrant in batches of this size instead of one request per conversation
+UPSERT_BATCH_SIZE = int(os.getenv("UPSERT_BATCH_SIZE", "256"))
+
+# Number of texts sent in one embeddings request
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+
 
 def generate_content_hash(text):
     """Generate SHA256 hash of text content for deduplication."""
     return hashlib.sha256(text.encode('utf-8')).hexdigest()
 
-def check_if_exists(content_hash):
-    """Check if a message with this content hash already exists in Qdrant."""
-    try:
-        results = qdrant.scroll(
-            collection_name=collection_name,
-            scroll_filter=Filter(
-                must=[
-                    FieldCondition(
-                        key="content_hash",
-                        match=MatchValue(value=content_hash)
-                    )
-                ]
-            ),
-            limit=1
+
+def resolve_message_id(provider, role, exch):
+    """First non-empty id for `role` from the provider's fallback chain."""
+    for path in ID_FALLBACKS.get(provider, DEFAULT_ID_FALLBACKS)[role]:
+        value = exch
+        for key in path.split("."):
+            value = value.get(key) if isinstance(value, dict) else None
+        if value:
+            return value
+    # Nothing usable: derive one from the content so distinct messages stay distinct
+    text = exch.get("user_input") if role == "user" else exch.get("assistant_response")
+    return generate_content_hash(f"{exch.get('timestamp')}__{text or ''}")
+
+
+def point_id_for(conversation_id, role, message_id):
+    """Deterministic Qdrant point id for a message."""
+    return str(uuid.uuid5(uuid.NAMESPACE_DNS, f"{conversation_id}__{role}__{message_id}"))
+
+
+class Ingestor:
+    """
+    Embeds exchanges and upserts them into Qdrant.
+
+    Points are buffered and sent in batches of `upsert_batch_size` with
+    wait=False; call flush(final=True) or close() (or use the Ingestor as a
+    context manager) to send the rest, wait until Qdrant has applied
+    everything, and persist the ingestion checkpoint.
+
+    Every upserted message is also written to the local BM25 index
+    (lexical_index.py) used by hybrid search, unless LEXICAL_INDEX=0.
+
+    Before embedding, new messages are checked against the near-duplicate
+    index (near_dup.py) unless NEAR_DUP=0; see suppress_near_duplicates().
+
+    Messages whose embedding or upsert fails go to the outbox (outbox.py)
+    unless OUTBOX=0, and are retried by drain_outbox() instead of holding
+    the checkpoint back.
+
+    With LEAN_PAYLOADS=1 message texts go to the local text store
+    (text_store.py) and the points carry only the other payload fields.
+    """
+
+    def __init__(
+        self,
+        collection_name=None,
+        profile=None,
+        qdrant=None,
+        openai_client=None,
+        checkpoint=None,
+        upsert_batch_size=UPSERT_BATCH_SIZE,
+        embed_batch_size=EMBED_BATCH_SIZE,
+        full_rescan=False,
+        provider=None,
+        lexical_index=None,
+        near_duplicates=None,
+        outbox=None,
+        text_store=None,
+    ):
+        self.provider = provider
+        self.collection_name = collection_name or storage_profiles.COLLECTION_NAME
+        self.profile = profile or storage_profiles.get_profile()
+        self.checkpoint = checkpoint if checkpoint is not None else IngestCheckpoint()
+        self.upsert_batch_size = upsert_batch_size
+        self.embed_batch_size = embed_batch_size
+        self.full_rescan = full_rescan
+
+        self._qdrant = qdrant
+        self._openai = openai_client
+        self._lexical_index = lexical_index
+        self._near_duplicates = near_duplicates
+        self._outbox = outbox
+        self._text_store = text_store
+        self._collection_ready = False
+
+        # Points waiting to be upserted, and the content hashes queued during this run.
+        # Batches are sent with wait=False, so Qdrant may not have applied them yet when
+        # a later exchange with the same text is checked.
+        self.pending_points = []
+        self.queued_hashes = set()
+        # Lexical index rows for pending points, written once Qdrant has taken them
+        self.pending_lexical = {}
+        self.upsert_failed = False
+
+        # Traces whose points were sent with wait=False and aren't known to be applied yet
+        self.unconfirmed_traces = set()
+
+        self.stats = {
+            "conversations": 0,
+            "unchanged_conversations": 0,
+            "exchanges": 0,
+            "inserted": 0,
+            "skipped": 0,
+            "errors": 0,
+            "upserted": 0,
+            "embedding_requests": 0,
+            "near_duplicates": 0,
+            "embeddings_saved": 0,
+            "outboxed": 0,
+            "drained": 0,
+            "started": time.time(),
+        }
+
+    def log(self, message):
+        """print() with the provider as prefix, so concurrent providers stay readable."""
+        if self.provider:
+            message = "\n".join(f"[{self.provider}] {line}" if line else line for line in message.split("\n"))
+        print(message)
+
+    def for_provider(self, provider):
+        """A child Ingestor for one provider sharing this one's clients, checkpoint and dedup state."""
+        self.ensure_collection()
+        child = Ingestor(
+            collection_name=self.collection_name,
+            profile=self.profile,
+            qdrant=self.qdrant,
+            openai_client=self.openai,
+            checkpoint=self.checkpoint,
+            upsert_batch_size=self.upsert_batch_size,
+            embed_batch_size=self.embed_batch_size,
+            full_rescan=self.full_rescan,
+            provider=provider,
+            lexical_index=self.lexical_index or False,
+            near_duplicates=self.near_duplicates or False,
+            outbox=self.outbox or False,
+            text_store=self.text_store or False,
         )
-        return len(results[0]) > 0
-    except Exception as e:
-        return False
+        child._collection_ready = True
+        child.queued_hashes = self.queued_hashes
+        return child
 
-# Load each conversation
-for filepath in conversation_files:
-    try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            conversation = json.load(f)
-        
-        conversation_id = conversation['conversation_id']
-        provider = conversation.get('provider', 'chatgpt.com')
+    # -- lazily created clients ---------------------------------------------
 
-        points = []
-        skipped_count = 0
-        inserted_count = 0
-        
-        print(f"Loading ChatGPT conversation: {conversation_id}")
-        
-        # You can access:
-        # - conversation_id: The unique conversation ID
-        # - conversation['exchanges']: List of all exchanges
-        # - Each exchange has: user_input, assistant_response, timestamp, model, etc.
-
-        for idx, exch in enumerate(conversation["exchanges"], start=1):
+    @property
+    def qdrant(self):
+        if self._qdrant is None:
+            import vector_store
+
+            self._qdrant = vector_store.open_client(host=QDRANT_HOST, port=QDRANT_PORT)
+        return self._qdrant
+
+    @property
+    def lexical_index(self):
+        """The local BM25 index written alongside Qdrant, or None when LEXICAL_INDEX=0."""
+        if self._lexical_index is None:
+            if os.getenv("LEXICAL_INDEX", "1") == "0":
+                self._lexical_index = False
+            else:
+                from lexical_index import LexicalIndex
+
+                self._lexical_index = LexicalIndex()
+        return self._lexical_index or None
+
+    @property
+    def near_duplicates(self):
+        """The near-duplicate index consulted before embedding, or None when NEAR_DUP=0."""
+        if self._near_duplicates is None:
+            if os.getenv("NEAR_DUP", "1") == "0":
+                self._near_duplicates = False
+            else:
+                from near_dup import NearDuplicateIndex
+
+                self._near_duplicates = NearDuplicateIndex()
+        return self._near_duplicates or None
+
+    @property
+    def outbox(self):
+        """The outbox of messages to retry, or None when OUTBOX=0."""
+        if self._outbox is None:
+            if os.getenv("OUTBOX", "1") == "0":
+                self._outbox = False
+            else:
+                from outbox import Outbox
+
+                self._outbox = Outbox()
+        return self._outbox or None
+
+    @property
+    def text_store(self):
+        """Where message texts go instead of the payload with LEAN_PAYLOADS=1, else None."""
+        if self._text_store is None:
+            import text_store
+
+            self._text_store = text_store.TextStore() if text_store.LEAN_PAYLOADS else False
+        return self._text_store or None
+
+    @property
+    def openai(self):
+        if self._openai is None:
+            import httpx
+            from openai import OpenAI
+
+            # Create custom httpx client with timeout and no SSL verification
+            http_client = httpx.Client(
+                verify=False,
+                timeout=60.0  # 60 second timeout
+            )
+            self._openai = OpenAI(
+                api_key=os.getenv("OPENAI_API_KEY"),
+                http_client=http_client,
+                max_retries=3  # Retry up to 3 times
+            )
+        return self._openai
+
+    def ensure_collection(self):
+        """Create the collection and its payload indexes on first use."""
+        if self._collection_ready:
+            return
+
+        # New collections are versioned behind an alias so they can be re-indexed without downtime
+        if not self.qdrant.collection_exists(self.collection_name):
+            target = collection_aliases.create_versioned(self.qdrant, self.collection_name, self.profile)
+            self.log(f"Created collection: {target} as {self.collection_name} (profile: {self.profile['name']})")
+        else:
+            self.log(f"Collection {self.collection_name} already exists, will skip duplicates")
+            existing_dims = storage_profiles.collection_dimensions(self.qdrant, self.collection_name)
+            if existing_dims != self.profile["dimensions"]:
+                raise RuntimeError(
+                    f"Collection {self.collection_name} has {existing_dims}-dim vectors but profile "
+                    f"'{self.profile['name']}' produces {self.profile['dimensions']}. "
+                    f"Run migrate_collection.py --reindex or set STORAGE_PROFILE to match."
+                )
+
+        # Also covers collections created before the indexes existed
+        storage_profiles.ensure_payload_indexes(self.qdrant, self.collection_name)
+        self._collection_ready = True
+
+    # -- embedding and dedup --------------------------------------------------
+
+    def get_embeddings(self, texts, max_retries=3):
+        """Embed a list of texts in one request, with retry logic for timeout errors."""
+        for attempt in range(max_retries):
             try:
-                user_input = exch["user_input"].strip()
-                user_content_hash = generate_content_hash(user_input)
-                
-                # Check if user message already exists
-                if check_if_exists(user_content_hash):
-                    print(f"  Skipping exchange {idx}: User message already exists (hash: {user_content_hash[:16]}...)")
-                    skipped_count += 1
+                self.stats["embedding_requests"] += 1
+                response = self.openai.embeddings.create(
+                    input=texts,
+                    **storage_profiles.embedding_kwargs(self.profile)
+                )
+                return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+            except Exception as e:
+                error_msg = str(e)
+                if attempt < max_retries - 1:
+                    wait_time = (attempt + 1) * 2  # Backoff: 2s, 4s
+                    self.log(f"  ⚠️  API error (attempt {attempt + 1}/{max_retries}): {error_msg[:80]}...")
+                    self.log(f"     Retrying in {wait_time} seconds...")
+                    time.sleep(wait_time)
                 else:
-                    user_vector = get_embedding(user_input)
-                    
-                    # Generate UUID for Qdrant point ID
-                    user_point_id = str(uuid.uuid5(uuid.NAMESPACE_DNS, f"{conversation_id}__user__{exch['user_message_id']}"))
-                    print(f"  Processing exchange {idx}: User message ID {exch['user_message_id']}, Point ID {user_point_id}")
-
-                    
-                    points.append({
-                        "id": user_point_id,
-                        "vector": user_vector,
-                        "payload": {
-                            "conversation_id": conversation_id,
-                            "role": "user",
-                            "text": user_input,
-                            "timestamp": exch["timestamp"],
-                            "message_id": exch["user_message_id"],
-                            "model": exch.get("model", ""),
-                            "exchange_index": idx,
-                            "provider": provider,
-                            "content_hash": user_content_hash,
-                        }
-                    })
-                    inserted_count += 1
-
-                if exch.get("assistant_response"):
-                    assistant_response = exch["assistant_response"].strip()
-                    assistant_content_hash = generate_content_hash(assistant_response)
-                    
-                    # Check if assistant message already exists
-                    if check_if_exists(assistant_content_hash):
-                        print(f"  Skipping exchange {idx}: Assistant message already exists (hash: {assistant_content_hash[:16]}...)")
-                        skipped_count += 1
-                    else:
-                        assistant_vector = get_embedding(assistant_response)
-                        
-                        # Generate UUID for Qdrant point ID
-                        assistant_msg_id = exch['assistant_message_id'] or exch['user_message_id']
-                        assistant_point_id = str(uuid.uuid5(uuid.NAMESPACE_DNS, f"{conversation_id}__assistant__{assistant_msg_id}"))
-                        
-                        points.append({
-                            "id": assistant_point_id,
-                            "vector": assistant_vector,
-                            "payload": {
-                                "conversation_id": conversation_id,
-                                "role": "assistant",
-                                "text": assistant_response,
-                                "timestamp": exch["timestamp"],
-                                "message_id": exch["assistant_message_id"],
-                                "model": exch.get("model", ""),
-                                "exchange_index": idx,
-                                "provider": provider,
-                                "content_hash": assistant_content_hash,
-                            }
-                        })
-                        inserted_count += 1
-            
+                    self.log(f"  ❌ Failed after {max_retries} attempts: {error_msg[:100]}")
+                    raise
+
+    def get_embedding(self, text, max_retries=3):
+        """Embed a single text."""
+        return self.get_embeddings([text], max_retries=max_retries)[0]
+
+    def existing_hashes(self, content_hashes):
+        """Return the subset of content hashes already stored in Qdrant or queued in this run."""
+        from qdrant_client.models import Filter, FieldCondition, MatchAny
+
+        found = {h for h in content_hashes if h in self.queued_hashes}
+        remaining = [h for h in set(content_hashes) if h not in found]
+        if not remaining:
+            return found
+
+        try:
+            records, _ = self.qdrant.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=Filter(
+                    must=[
+                        FieldCondition(
+                            key="content_hash",
+                            match=MatchAny(any=remaining)
+                        )
+                    ]
+                ),
+                limit=len(remaining),
+                with_payload=["content_hash"],
+            )
+            found.update(record.payload["content_hash"] for record in records)
+        except Exception:
+            pass
+        return found
+
+    def check_if_exists(self, content_hash):
+        """Check if a message with this content hash already exists in Qdrant."""
+        return content_hash in self.existing_hashes([content_hash])
+
+    # -- building points ------------------------------------------------------
+
+    def messages_for_exchange(self, conversation_id, provider, exch, idx):
+        """Turn one merged exchange into the user/assistant messages to store."""
+        messages = []
+
+        user_input = (exch.get("user_input") or "").strip()
+        if user_input:
+            user_msg_id = resolve_message_id(provider, "user", exch)
+            messages.append({
+                "exchange_index": idx,
+                "point_id": point_id_for(conversation_id, "user", user_msg_id),
+                "text": user_input,
+                "payload": {
+                    "conversation_id": conversation_id,
+                    "role": "user",
+                    "text": user_input,
+                    "timestamp": exch["timestamp"],
+                    "message_id": user_msg_id,
+                    "model": exch.get("model", ""),
+                    "exchange_index": idx,
+                    "provider": provider,
+                    "content_hash": generate_content_hash(user_input),
+                },
+            })
+
+        if exch.get("assistant_response"):
+            assistant_response = exch["assistant_response"].strip()
+            assistant_msg_id = resolve_message_id(provider, "assistant", exch)
+            messages.append({
+                "exchange_index": idx,
+                "point_id": point_id_for(conversation_id, "assistant", assistant_msg_id),
+                "text": assistant_response,
+                "payload": {
+                    "conversation_id": conversation_id,
+                    "role": "assistant",
+                    "text": assistant_response,
+                    "timestamp": exch["timestamp"],
+                    "message_id": assistant_msg_id,
+                    "model": exch.get("model", ""),
+                    "exchange_index": idx,
+                    "provider": provider,
+                    "content_hash": generate_content_hash(assistant_response),
+                },
+            })
+
+        # Set by the capture addon; lets tracing.py follow the exchange into Qdrant
+        if exch.get("trace_id"):
+            for message in messages:
+                message["payload"]["trace_id"] = exch["trace_id"]
+
+        return messages
+
+    # -- storing --------------------------------------------------------------
+
+    def store_batch(self, conversation_id, provider, indexed_exchanges):
+        """
+        Embed and queue a batch of exchanges from one conversation.
+
+        `indexed_exchanges` is a list of (exchange_index, exchange) pairs in order.
+        Returns the set of exchange indexes that failed, so callers can hold
+        the checkpoint back.
+        """
+        return self.store_conversations([(conversation_id, provider, indexed_exchanges)])[conversation_id]
+
+    def store_conversations(self, batches):
+        """
+        Embed and queue exchanges from several conversations at once.
+
+        `batches` is a list of (conversation_id, provider, indexed_exchanges).
+        Embeddings requests are filled across conversations, so a bulk import
+        of many short conversations still sends full requests. Returns
+        {conversation_id: set of failed exchange indexes}.
+        """
+        self.ensure_collection()
+        failed = {conversation_id: set() for conversation_id, _, _ in batches}
+        messages = []
+
+        for conversation_id, provider, indexed_exchanges in batches:
+            for idx, exch in indexed_exchanges:
+                self.stats["exchanges"] += 1
+                try:
+                    messages.extend(self.messages_for_exchange(conversation_id, provider, exch, idx))
+                except Exception as e:
+                    self.log(f"  ❌ Error processing exchange {idx}: {str(e)[:150]}")
+                    self.log(f"     Continuing with next exchange...")
+                    failed[conversation_id].add(idx)
+                    self.stats["errors"] += 1
+
+        existing = self.existing_hashes([m["payload"]["content_hash"] for m in messages])
+        new_messages = []
+        for message in messages:
+            content_hash = message["payload"]["content_hash"]
+            if content_hash in existing:
+                self.log(f"  Skipping exchange {message['exchange_index']}: {message['payload']['role'].capitalize()} "
+                      f"message already exists (hash: {content_hash[:16]}...)")
+                self.stats["skipped"] += 1
+            elif content_hash in self.queued_hashes:
+                # Same text twice within this batch
+                self.stats["skipped"] += 1
+            else:
+                self.queued_hashes.add(content_hash)
+                new_messages.append(message)
+
+        if self.near_duplicates is not None:
+            new_messages = self.suppress_near_duplicates(new_messages)
+
+        points = []
+        stored = []
+        for start in range(0, len(new_messages), self.embed_batch_size):
+            chunk = new_messages[start:start + self.embed_batch_size]
+            try:
+                with tracing.span([m["payload"].get("trace_id") for m in chunk], "embed", texts=len(chunk)):
+                    vectors = self.get_embeddings([m["text"] for m in chunk])
             except Exception as e:
-                print(f"  ❌ Error processing exchange {idx}: {str(e)[:150]}")
-                print(f"     Continuing with next exchange...")
+                for m in chunk:
+                    self.queued_hashes.discard(m["payload"]["content_hash"])
+                if self.outbox is not None:
+                    # Retried from the outbox later; the checkpoint can move past them
+                    self.outbox.add(self.collection_name, chunk, e)
+                    self.stats["outboxed"] += len(chunk)
+                    continue
+                for m in chunk:
+                    failed[m["payload"]["conversation_id"]].add(m["exchange_index"])
+                if self.near_duplicates is not None:
+                    self.near_duplicates.discard(m["point_id"] for m in chunk)
+                self.stats["errors"] += len(chunk)
                 continue
+            points.extend(self.build_points(chunk, vectors))
+            stored.extend(chunk)
 
         if points:
-            qdrant.upsert(
-                collection_name=collection_name,
-                points=points
+            if self.lexical_index is not None:
+                # From the messages: lean points no longer carry the text
+                self.pending_lexical.update((m["point_id"], m["payload"]) for m in stored)
+            self.pending_points.extend(points)
+            self.stats["inserted"] += len(points)
+            try:
+                self.flush()
+            except Exception:
+                self.upsert_failed = True
+                raise
+
+        return failed
+
+    def suppress_near_duplicates(self, messages):
+        """
+        Check messages against the near-duplicate index before they are embedded.
+
+        Messages without a near-duplicate are registered in the index. With
+        policy "link" (the default) a near-duplicate is dropped (its link to the
+        stored point is kept only in near_dup.sqlite), costs no embedding and
+        counts in stats["embeddings_saved"]; with "store" it is kept and tagged
+        with near_duplicate_of.
+        """
+        index = self.near_duplicates
+        kept = []
+        for message in messages:
+            match = index.check(message["point_id"], message["text"])
+            if match is None:
+                kept.append(message)
+                continue
+            canonical_id, similarity = match
+            self.stats["near_duplicates"] += 1
+            if index.policy == "link":
+                index.link(message["point_id"], canonical_id, similarity, message["payload"])
+                self.stats["embeddings_saved"] += 1
+                self.log(f"  Linking exchange {message['exchange_index']}: {message['payload']['role'].capitalize()} "
+                         f"message nearly duplicates {canonical_id} (similarity {similarity:.2f})")
+            else:
+                message["payload"]["near_duplicate_of"] = canonical_id
+                kept.append(message)
+        return kept
+
+    def build_points(self, messages, vectors):
+        """PointStructs for embedded messages; with a text store, texts are written there first."""
+        from qdrant_client.models import PointStruct
+        from text_store import lean_payload
+
+        if self.text_store is None:
+            payloads = [m["payload"] for m in messages]
+        else:
+            self.text_store.put_many((m["point_id"], m["text"]) for m in messages)
+            payloads = [lean_payload(m["payload"]) for m in messages]
+        return [
+            PointStruct(id=m["point_id"], vector=vector, payload=payload)
+            for m, vector, payload in zip(messages, vectors, payloads)
+        ]
+
+    def store_exchange(self, conversation_id, provider, exchange, exchange_index):
+        """Embed and queue a single exchange. Returns True on success."""
+        return not self.store_batch(conversation_id, provider, [(exchange_index, exchange)])
+
+    def store_conversation_file(self, filepath):
+        """Ingest the exchanges of one merged conversation file that aren't stored yet."""
+        checkpoint_key = os.path.join(os.path.basename(os.path.dirname(filepath)), os.path.basename(filepath))
+        file_stat = os.stat(filepath)
+        if not self.full_rescan and self.checkpoint.is_unchanged(checkpoint_key, file_stat):
+            self.stats["unchanged_conversations"] += 1
+            return
+
+        with open(filepath, 'r', encoding='utf-8') as f:
+            conversation = json.load(f)
+
+        conversation_id = conversation['conversation_id']
+        provider = conversation.get('provider') or self.provider or 'unknown'
+        exchanges = conversation["exchanges"]
+        start_index = 0 if self.full_rescan else self.checkpoint.resume_index(checkpoint_key, exchanges)
+        self.stats["conversations"] += 1
+
+        self.log(f"Loading conversation: {conversation_id} ({len(exchanges) - start_index} new exchanges)")
+
+        inserted_before = self.stats["inserted"]
+        skipped_before = self.stats["skipped"]
+        failed = self.store_batch(
+            conversation_id,
+            provider,
+            list(enumerate(exchanges[start_index:], start=start_index + 1)),
+        )
+
+        # A failed exchange holds the watermark back so the next run retries it
+        ingested_upto = min(failed) - 1 if failed else len(exchanges)
+        self.checkpoint.advance(checkpoint_key, file_stat, exchanges, ingested_upto)
+
+        inserted = self.stats["inserted"] - inserted_before
+        skipped = self.stats["skipped"] - skipped_before
+        if inserted:
+            self.log(f"✓ Queued {inserted} messages from conversation {conversation_id}")
+        else:
+            self.log(f"⊘ No new messages to insert from conversation {conversation_id}")
+        self.log(f"  Stats: {inserted} inserted, {skipped} skipped (duplicates)\n")
+
+    def store_directory(self, merged_dir):
+        """Ingest every *__conversation_merged.json file in `merged_dir`."""
+        conversation_files = glob.glob(os.path.join(merged_dir, "*__conversation_merged.json"))
+        self.log(f"Found {len(conversation_files)} conversations in {merged_dir}\n")
+
+        for done, filepath in enumerate(conversation_files, start=1):
+            try:
+                self.store_conversation_file(filepath)
+            except Exception as e:
+                self.log(f"❌ Error processing file {os.path.basename(filepath)}: {str(e)[:200]}")
+                self.log(f"   Continuing with next conversation...\n")
+            if done % 10 == 0 or done == len(conversation_files):
+                self.log(f"Progress: {done}/{len(conversation_files)} conversations, "
+                         f"{self.stats['inserted']} messages queued")
+
+    def store_providers(self, providers=None, merged_root=MERGED_ROOT):
+        """
+        Ingest several providers concurrently, one worker per provider.
+
+        Each provider's points are flushed by its own worker; the checkpoint is
+        only committed by close(), after every provider's final barrier succeeded.
+        Returns the per-provider Ingestors so callers can read their stats.
+        """
+        providers = providers or PROVIDERS
+        children = [self.for_provider(provider) for provider in providers]
+
+        def run(child):
+            merged_dir = os.path.join(merged_root, child.provider)
+            if not os.path.isdir(merged_dir):
+                child.log(f"⊘ No merged conversations in {merged_dir}")
+                return child
+            child.store_directory(merged_dir)
+            try:
+                child.flush(final=True)
+            except Exception as e:
+                child.upsert_failed = True
+                child.log(f"❌ Error upserting final batch: {str(e)[:200]}")
+            return child
+
+        with ThreadPoolExecutor(max_workers=max(len(children), 1)) as pool:
+            list(pool.map(run, children))
+
+        for child in children:
+            for key in ("conversations", "unchanged_conversations", "exchanges", "inserted", "skipped", "errors",
+                        "upserted", "embedding_requests", "near_duplicates", "embeddings_saved", "outboxed",
+                        "drained"):
+                self.stats[key] += child.stats[key]
+            self.upsert_failed = self.upsert_failed or child.upsert_failed
+        return children
+
+    def flush(self, final=False):
+        """
+        Upsert buffered points in fixed-size batches.
+
+        Full batches go out with wait=False so embedding keeps running while Qdrant
+        applies them. At least one point is always held back until the final flush,
+        which is sent with wait=True: Qdrant applies a collection's updates in order,
+        so once that call returns every earlier batch has been applied as well.
+
+        Every flush that sends points bumps the collection version, which tells
+        the MCP server to drop its cached search results. The final flush also
+        marks every trace sent so far as searchable.
+        """
+        sent = 0
+        while len(self.pending_points) > self.upsert_batch_size:
+            batch = self.pending_points[:self.upsert_batch_size]
+            del self.pending_points[:self.upsert_batch_size]
+            sent += self.upsert(batch, wait=False)
+
+        if final and self.pending_points:
+            batch = list(self.pending_points)
+            self.pending_points.clear()
+            sent += self.upsert(batch, wait=True)
+
+        if final and self.unconfirmed_traces:
+            now = time.time()
+            tracing.record_span(self.unconfirmed_traces, "searchable", now, now, collection=self.collection_name)
+            self.unconfirmed_traces.clear()
+
+        if sent:
+            collection_version.bump_version(self.collection_name)
+        self.stats["upserted"] += sent
+        return sent
+
+    def upsert(self, batch, wait):
+        """
+        Send one batch of points. If Qdrant can't take it and there is an
+        outbox, the points (vectors included) are parked there instead of
+        failing the run. Returns the number of points sent.
+
+        Only sent points go into the lexical index; outboxed ones are indexed
+        when drain_outbox stores them.
+        """
+        trace_ids = [p.payload.get("trace_id") for p in batch]
+        lexical = [(p.id, self.pending_lexical.pop(p.id)) for p in batch if p.id in self.pending_lexical]
+        try:
+            with tracing.span(trace_ids, "upsert", points=len(batch), wait=wait):
+                self.qdrant.upsert(collection_name=self.collection_name, points=batch, wait=wait)
+        except Exception as e:
+            if self.outbox is None:
+                raise
+            texts = self.text_store.get_many(p.id for p in batch) if self.text_store is not None else {}
+            self.outbox.add(
+                self.collection_name,
+                [{"point_id": p.id, "text": p.payload.get("text") or texts.get(str(p.id), ""), "payload": p.payload}
+                 for p in batch],
+                e,
+                vectors=[p.vector for p in batch],
             )
-            print(f"✓ Inserted {len(points)} messages from conversation {conversation_id}")
+            # Not stored yet, so drain_outbox mustn't take them for stored ones
+            self.queued_hashes.difference_update(p.payload.get("content_hash") for p in batch)
+            self.stats["outboxed"] += len(batch)
+            self.log(f"  ⚠️  Upsert failed, {len(batch)} points moved to the outbox: {str(e)[:100]}")
+            return 0
+        self.unconfirmed_traces.update(t for t in trace_ids if t)
+        if lexical:
+            self.lexical_index.add_many(lexical)
+        return len(batch)
+
+    def drain_outbox(self, include_waiting=False):
+        """
+        Store the outbox entries whose retry time has come (all of them with
+        include_waiting=True), one embeddings request and one waited-for upsert
+        per batch. Stops at the first batch that fails again, since the API or
+        Qdrant is evidently still down. Returns the number of messages stored.
+        """
+        outbox = self.outbox
+        if outbox is None:
+            return 0
+        self.ensure_collection()
+        dimensions = self.profile["dimensions"]
+        stored = 0
+        while True:
+            entries = outbox.due(self.collection_name, self.embed_batch_size, include_waiting=include_waiting)
+            if not entries:
+                break
+
+            # Stored in the meantime, e.g. by a full rescan
+            existing = self.existing_hashes([e.payload["content_hash"] for e in entries if e.payload.get("content_hash")])
+            outbox.remove(e.point_id for e in entries if e.payload.get("content_hash") in existing)
+            entries = [e for e in entries if e.payload.get("content_hash") not in existing]
+
+            # A vector from before a re-index to a smaller profile can be reduced; otherwise re-embed
+            vectors = [
+                storage_profiles.reduce_vector(e.vector, dimensions)
+                if e.vector is not None and len(e.vector) >= dimensions else None
+                for e in entries
+            ]
+            missing = [i for i, vector in enumerate(vectors) if vector is None]
+            if missing:
+                try:
+                    with tracing.span([entries[i].payload.get("trace_id") for i in missing], "embed",
+                                      texts=len(missing), outbox=True):
+                        embedded = self.get_embeddings([entries[i].text for i in missing], max_retries=1)
+                except Exception as e:
+                    outbox.retry_later(entries, e, vectors)
+                    self.log(f"  ⚠️  Outbox: embedding still failing, {len(entries)} messages wait longer")
+                    break
+                for i, vector in zip(missing, embedded):
+                    vectors[i] = vector
+
+            messages = [{"point_id": e.point_id, "text": e.text, "payload": e.payload} for e in entries]
+            points = self.build_points(messages, vectors)
+            trace_ids = [p.payload.get("trace_id") for p in points]
+            try:
+                with tracing.span(trace_ids, "upsert", points=len(points), wait=True, outbox=True):
+                    if points:
+                        self.qdrant.upsert(collection_name=self.collection_name, points=points, wait=True)
+            except Exception as e:
+                outbox.retry_later(entries, e, vectors)
+                self.log(f"  ⚠️  Outbox: upsert still failing, {len(entries)} messages wait longer")
+                break
+            now = time.time()
+            tracing.record_span(trace_ids, "searchable", now, now, collection=self.collection_name)
+            outbox.remove(e.point_id for e in entries)
+            if points and self.lexical_index is not None:
+                self.lexical_index.add_many((e.point_id, dict(e.payload, text=e.text)) for e in entries)
+                self.lexical_index.commit()
+            stored += len(points)
+
+        if stored:
+            collection_version.bump_version(self.collection_name)
+            self.log(f"✓ Stored {stored} messages from the outbox")
+        self.stats["drained"] += stored
+        self.stats["upserted"] += stored
+        return stored
+
+    def close(self):
+        """Send the remaining points, wait until Qdrant has applied everything and save the checkpoint."""
+        try:
+            self.flush(final=True)
+        except Exception:
+            self.upsert_failed = True
+            raise
+        finally:
+            if self.lexical_index is not None:
+                self.lexical_index.commit()
+            if self.near_duplicates is not None:
+                self.near_duplicates.commit()
+            if self.upsert_failed:
+                self.log("⚠️  Some batches failed to upsert, checkpoint not advanced")
+            else:
+                self.checkpoint.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def metrics(self):
+        """Counters plus elapsed time and throughput for this Ingestor."""
+        elapsed = time.time() - self.stats["started"]
+        metrics = {k: v for k, v in self.stats.items() if k != "started"}
+        metrics["elapsed_s"] = round(elapsed, 3)
+        metrics["messages_per_s"] = round(self.stats["upserted"] / elapsed, 2) if elapsed > 0 else 0.0
+        metrics["exchanges_per_s"] = round(self.stats["exchanges"] / elapsed, 2) if elapsed > 0 else 0.0
+        return metrics
+
+    def summary(self):
+        m = self.metrics()
+        label = f"[{self.provider}] " if self.provider else ""
+        return (
+            f"{label}✓ Upserted {m['upserted']} messages in {m['elapsed_s']:.1f}s ({m['messages_per_s']:.1f} msg/s, "
+            f"{m['exchanges']} exchanges, {m['embedding_requests']} embedding requests)\n"
+            f"{label}⊘ {m['unchanged_conversations']} unchanged conversations skipped via checkpoint, "
+            f"{m['skipped']} duplicate messages, {m['near_duplicates']} near-duplicates "
+            f"({m['embeddings_saved']} embeddings saved), {m['errors']} errors"
+            + (f"\n{label}⚠️  {m['outboxed']} messages moved to the outbox for retry" if m["outboxed"] else "")
+            + (f"\n{label}✓ {m['drained']} messages stored from the outbox" if m["drained"] else "")
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Embed merged conversations into Qdrant.")
+    parser.add_argument("merged_dir", nargs="?", help="ingest a single provider directory instead")
+    parser.add_argument("--merged-root", default=MERGED_ROOT)
+    parser.add_argument("--providers", nargs="+", default=PROVIDERS,
+                        help="provider subdirectories of --merged-root (default: $INGEST_PROVIDERS)")
+    parser.add_argument("--full", action="store_true",
+                        default=os.getenv("INGEST_FULL_RESCAN") == "1",
+                        help="ignore the checkpoint and walk every exchange again")
+    args = parser.parse_args(argv)
+
+    ingestor = Ingestor(full_rescan=args.full)
+    children = []
+    try:
+        # Messages left over from earlier runs go first, once their retry time has come
+        ingestor.drain_outbox()
+        if args.merged_dir:
+            ingestor.store_directory(args.merged_dir)
         else:
-            print(f"⊘ No new messages to insert from conversation {conversation_id}")
-        
-        print(f"  Stats: {inserted_count} inserted, {skipped_count} skipped (duplicates)\n")
-    
+            children = ingestor.store_providers(args.providers, args.merged_root)
+        ingestor.close()
     except Exception as e:
-        print(f"❌ Error processing file {os.path.basename(filepath)}: {str(e)[:200]}")
-        print(f"   Continuing with next conversation...\n")
-        continue
-
+        print(f"❌ Error upserting final batch: {str(e)[:200]}")
+        return 1
 
+    print()
+    for child in children:
+        print(child.summary())
+    print(ingestor.summary())
+    return 0
 
-    
-    # Example: Print first exchange
-    # if conversation['exchanges']:
-    #     first_exchange = conversation['exchanges'][0]
-    #     second_exchange = conversation['exchanges'][1] if len(conversation['exchanges']) > 1 else None
-    #     print(f"  First message: {first_exchange.get('user_input', '')[:50]}...")
-    #     print(f"  Second message: {second_exchange.get('assistant_response', '')[:50]}..." if second_exchange else "  Second message: None")
 
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The modules are flat scripts in the project root, as the benchmarks import them
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "mitm", "scripts"))
+sys.path.insert(0, os.path.join(ROOT, "memory_mcp"))
@@ -0,0 +1,49 @@
+import pytest
+
+pytest.importorskip("mitmproxy")
+
+from capture_req import DeltaDecoder
+
+
+def decode(events):
+    decoder = DeltaDecoder()
+    for event in events:
+        decoder.apply(event)
+    return decoder
+
+
+def assistant_add(channel=0):
+    return {"p": "", "o": "add", "c": channel, "v": {"message": {
+        "id": "m", "author": {"role": "assistant"}, "content": {"content_type": "text", "parts": [""]},
+        "status": "in_progress",
+    }}}
+
+
+def test_bare_chunks_after_a_patch_keep_appending_to_the_text():
+    decoder = decode([
+        assistant_add(),
+        {"p": "/message/content/parts/0", "o": "append", "v": "Hello"},
+        {"o": "patch", "v": [
+            {"p": "/message/content/parts/0", "o": "append", "v": ", wor"},
+            {"p": "/message/status", "o": "replace", "v": "in_progress"},
+            {"p": "/message/end_turn", "o": "replace", "v": False},
+        ]},
+        {"v": "ld"},
+        {"v": "!"},
+    ])
+    assert decoder.text() == "Hello, world!"
+    assert decoder.messages[0]["message"]["status"] == "in_progress"
+
+
+def test_bare_chunks_after_a_top_level_op_follow_it():
+    decoder = decode([assistant_add(), {"p": "/message/content/parts/0", "o": "append", "v": "a"}, {"v": "b"}])
+    assert decoder.text() == "ab"
+
+
+def test_numeric_segments_of_a_message_never_added_create_lists():
+    decoder = decode([
+        {"p": "/message/content/parts/0", "o": "append", "v": "no "},
+        {"v": "add event"},
+    ])
+    assert decoder.text() == "no add event"
+    assert decoder.messages[0]["message"]["content"]["parts"] == ["no add event"]
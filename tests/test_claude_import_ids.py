@@ -0,0 +1,94 @@
+import json
+import types
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("qdrant_client")
+
+import collection_version
+import import_export
+import merge_conversations
+import storage_profiles
+import vector_store
+from ingest_checkpoint import IngestCheckpoint
+
+store_chat_message = pytest.importorskip("store_chat_message")
+
+PROFILE = storage_profiles.get_profile("default")
+CONVERSATION = "6f1c2a80-0000-4000-8000-000000000001"
+HUMAN = "6f1c2a80-0000-4000-8000-0000000000a1"
+ASSISTANT = "6f1c2a80-0000-4000-8000-0000000000b2"
+
+
+class FakeEmbeddings:
+    def create(self, input, **kwargs):
+        data = []
+        for i, text in enumerate(input):
+            vector = [0.0] * PROFILE["dimensions"]
+            vector[hash(text) % len(vector)] = 1.0
+            data.append(types.SimpleNamespace(index=i, embedding=vector))
+        return types.SimpleNamespace(data=data)
+
+
+def captured_exchange_file(tmp_path):
+    """The merged conversation file live capture produces for one Claude turn."""
+    parsed = tmp_path / "parsed" / "claude.ai"
+    parsed.mkdir(parents=True)
+    (parsed / "turn_parsed.json").write_text(json.dumps({
+        "timestamp": "2026-03-02T09:15:00",
+        "conversation_id": CONVERSATION,
+        "user_input": "How do I re-index without downtime?",
+        "parent_message_uuid": "00000000-0000-4000-8000-000000000000",
+        # Deltas are concatenated, so the block boundary leaves no newline
+        "reconstructed_text": "Build the new collection behind an alias.Then swap the alias.",
+        "parsed_events_preview": [{
+            "type": "message_start",
+            "message": {"id": "chatcompl_01abc", "uuid": ASSISTANT, "parent_uuid": HUMAN,
+                        "model": "claude-sonnet-4-5"},
+        }],
+    }))
+    merge_conversations.merge_conversations(str(tmp_path / "parsed"), str(tmp_path / "merged"))
+    return str(tmp_path / "merged" / "claude.ai" / f"{CONVERSATION}__conversation_merged.json")
+
+
+def exported_conversation():
+    return {
+        "uuid": CONVERSATION,
+        "chat_messages": [
+            {"uuid": HUMAN, "sender": "human", "created_at": "2026-03-02T09:15:00Z",
+             "text": "How do I re-index without downtime?"},
+            {"uuid": ASSISTANT, "sender": "assistant", "created_at": "2026-03-02T09:15:04Z",
+             "parent_message_uuid": HUMAN,
+             "content": [{"type": "text", "text": "Build the new collection behind an alias."},
+                         {"type": "text", "text": "Then swap the alias."}]},
+        ],
+    }
+
+
+def test_captured_then_imported_claude_messages_share_point_ids(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage_profiles, "STATE_DIR", str(tmp_path / "state"))
+    monkeypatch.setattr(collection_version, "STATE_DIR", str(tmp_path / "state"))
+    qdrant = vector_store.open_client("numpy", path=str(tmp_path / "vectors"))
+    ingestor = store_chat_message.Ingestor(
+        collection_name="chat_messages",
+        profile=PROFILE,
+        qdrant=qdrant,
+        openai_client=types.SimpleNamespace(embeddings=FakeEmbeddings()),
+        checkpoint=IngestCheckpoint(str(tmp_path / "checkpoint.json")),
+        lexical_index=False,
+        near_duplicates=False,
+        outbox=False,
+        text_store=False,
+    )
+    ingestor.log = lambda *args, **kwargs: None
+
+    with ingestor:
+        ingestor.store_conversation_file(captured_exchange_file(tmp_path))
+        exchanges = import_export.claude_exchanges(exported_conversation(), "import:export.zip")
+        ingestor.store_batch(CONVERSATION, "claude.ai", list(enumerate(exchanges)))
+
+    # The assistant texts differ (block separator), so only the ids keep this at two points
+    records, _ = qdrant.scroll(collection_name="chat_messages", limit=10, with_payload=True)
+    assert sorted(r.payload["role"] for r in records) == ["assistant", "user"]
+    assert {r.payload["message_id"] for r in records} == {HUMAN, ASSISTANT}
@@ -0,0 +1,17 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import collection_version
+
+
+def test_concurrent_bumps_are_not_lost(tmp_path, monkeypatch):
+    monkeypatch.setattr(collection_version, "STATE_DIR", str(tmp_path))
+
+    def bump_many(_):
+        return [collection_version.bump_version("chat_messages") for _ in range(300)]
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        returned = [v for versions in pool.map(bump_many, range(4)) for v in versions]
+
+    assert collection_version.read_version("chat_messages") == 1200
+    assert sorted(returned) == list(range(1, 1201))
+    assert not list(tmp_path.glob("*.tmp"))
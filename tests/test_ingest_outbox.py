@@ -0,0 +1,130 @@
+import types
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("qdrant_client")
+
+import collection_version
+import storage_profiles
+import vector_store
+from ingest_checkpoint import IngestCheckpoint
+from lexical_index import LexicalIndex
+from outbox import Outbox
+
+store_chat_message = pytest.importorskip("store_chat_message")
+
+PROFILE = storage_profiles.get_profile("default")
+
+
+class FakeEmbeddings:
+    def create(self, input, **kwargs):
+        data = []
+        for i, text in enumerate(input):
+            vector = [0.0] * PROFILE["dimensions"]
+            vector[hash(text) % len(vector)] = 1.0
+            data.append(types.SimpleNamespace(index=i, embedding=vector))
+        return types.SimpleNamespace(data=data)
+
+
+class FlakyQdrant:
+    """A numpy store whose upserts fail while `down` is set."""
+
+    def __init__(self, store):
+        self.store = store
+        self.down = False
+
+    def upsert(self, *args, **kwargs):
+        if self.down:
+            raise ConnectionError("qdrant is down")
+        return self.store.upsert(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.store, name)
+
+
+@pytest.fixture
+def state(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage_profiles, "STATE_DIR", str(tmp_path / "state"))
+    monkeypatch.setattr(collection_version, "STATE_DIR", str(tmp_path / "state"))
+    return tmp_path
+
+
+def make_ingestor(tmp_path, qdrant, lexical, outbox):
+    ingestor = store_chat_message.Ingestor(
+        collection_name="chat_messages",
+        profile=PROFILE,
+        qdrant=qdrant,
+        openai_client=types.SimpleNamespace(embeddings=FakeEmbeddings()),
+        checkpoint=IngestCheckpoint(str(tmp_path / "checkpoint.json")),
+        lexical_index=lexical,
+        near_duplicates=False,
+        outbox=outbox,
+        text_store=False,
+    )
+    ingestor.log = lambda *args, **kwargs: None
+    return ingestor
+
+
+def exchange(user, assistant):
+    return {"user_input": user, "assistant_response": assistant, "timestamp": "2026-01-05T10:00:00Z"}
+
+
+def test_drain_stores_points_parked_by_a_failed_upsert(state):
+    qdrant = FlakyQdrant(vector_store.open_client("numpy", path=str(state / "vectors")))
+    outbox = Outbox(str(state / "outbox.sqlite"))
+    ingestor = make_ingestor(state, qdrant, False, outbox)
+
+    qdrant.down = True
+    with ingestor:
+        ingestor.store_batch("conv-1", "chatgpt", [(0, exchange("where is the outbox file", "in the state dir"))])
+
+    assert ingestor.stats["outboxed"] == 2
+    assert outbox.stats()["needs_upsert"] == 2
+
+    # Same process, so the hashes it queued must not count as stored
+    qdrant.down = False
+    assert ingestor.drain_outbox(include_waiting=True) == 2
+
+    assert ingestor.stats["drained"] == 2
+    assert outbox.stats()["depth"] == 0
+    records, _ = qdrant.scroll(collection_name="chat_messages", limit=10, with_payload=True)
+    assert sorted(r.payload["role"] for r in records) == ["assistant", "user"]
+    assert ingestor.drain_outbox(include_waiting=True) == 0
+
+
+def test_outboxed_points_reach_the_lexical_index_only_when_drained(state):
+    qdrant = FlakyQdrant(vector_store.open_client("numpy", path=str(state / "vectors")))
+    lexical = LexicalIndex(str(state / "lexical.sqlite"))
+    outbox = Outbox(str(state / "outbox.sqlite"))
+    ingestor = make_ingestor(state, qdrant, lexical, outbox)
+
+    qdrant.down = True
+    with ingestor:
+        ingestor.store_batch("conv-1", "chatgpt", [(0, exchange("where is the outbox file", "in the state dir"))])
+
+    assert ingestor.stats["outboxed"] == 2
+    assert lexical.count() == 0
+    assert lexical.search("outbox") == []
+
+    qdrant.down = False
+    assert ingestor.drain_outbox(include_waiting=True) == 2
+
+    assert lexical.count() == 2
+    records, _ = qdrant.scroll(collection_name="chat_messages", limit=10)
+    indexed = {hit["point_id"] for hit in lexical.search("outbox OR state")}
+    assert indexed == {str(r.id) for r in records}
+
+
+def test_sent_points_are_indexed_after_the_upsert(state):
+    qdrant = FlakyQdrant(vector_store.open_client("numpy", path=str(state / "vectors")))
+    lexical = LexicalIndex(str(state / "lexical.sqlite"))
+    ingestor = make_ingestor(state, qdrant, lexical, False)
+
+    with ingestor:
+        ingestor.store_batch("conv-1", "chatgpt", [(0, exchange("how are traces exported", "over otlp"))])
+        # The last point is held back until the final flush
+        assert lexical.count() == 0
+
+    assert lexical.count() == 2
+    assert ingestor.pending_lexical == {}
@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("mcp")
+
+import access_llm_memory as server
+
+
+@pytest.fixture
+def fresh_clients(monkeypatch):
+    monkeypatch.setattr(server, "_client_tasks", {})
+    monkeypatch.setattr(server, "qdrant", None)
+    monkeypatch.setattr(server, "openai", None)
+
+
+def test_failed_client_creation_is_retried(fresh_clients, monkeypatch):
+    attempts = []
+
+    def create_qdrant():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError("Qdrant not up yet")
+        server.qdrant = object()
+
+    monkeypatch.setattr(server, "_create_qdrant", create_qdrant)
+
+    async def run():
+        with pytest.raises(ConnectionError):
+            await server.ensure_qdrant()
+        await server.ensure_qdrant()
+
+    asyncio.run(run())
+    assert len(attempts) == 2
+    assert server.qdrant is not None
+
+
+def test_openai_failure_does_not_block_qdrant_only_tools(fresh_clients, monkeypatch):
+    def create_openai():
+        raise RuntimeError("OPENAI_API_KEY is not set")
+
+    def create_qdrant():
+        server.qdrant = object()
+
+    monkeypatch.setattr(server, "_create_openai", create_openai)
+    monkeypatch.setattr(server, "_create_qdrant", create_qdrant)
+
+    async def run():
+        with pytest.raises(RuntimeError):
+            await server.ensure_clients()
+        await server.ensure_qdrant()
+
+    asyncio.run(run())
+    assert server.qdrant is not None
@@ -0,0 +1,17 @@
+import pytest
+
+pytest.importorskip("mcp")
+
+import access_llm_memory
+
+
+@pytest.mark.parametrize("tool, arguments", [
+    ("search_memory", {"query": "x", "max_chars": None, "max_tokens": None, "mode": None, "provider": None,
+                       "conversation_id": None, "role": None, "since": None, "until": None}),
+    ("search_memory_batch", {"queries": ["x"], "max_chars": None}),
+    ("get_conversation", {"conversation_id": "c", "max_chars": None, "max_tokens": None}),
+])
+def test_optional_arguments_accept_explicit_null(tool, arguments):
+    arg_model = access_llm_memory.mcp._tool_manager.get_tool(tool).fn_metadata.arg_model
+    validated = arg_model.model_validate(arguments)
+    assert all(getattr(validated, key) is None for key, value in arguments.items() if value is None)
@@ -0,0 +1,67 @@
+import uuid
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("dotenv")
+models = pytest.importorskip("qdrant_client.models")
+
+import migrate_collection
+import storage_profiles
+import vector_store
+
+PROFILE = dict(storage_profiles.get_profile("default"), dimensions=8)
+
+
+def point(i, **payload):
+    vector = [0.0] * PROFILE["dimensions"]
+    vector[i % len(vector)] = 1.0
+    return models.PointStruct(id=str(uuid.UUID(int=i + 1)), vector=vector, payload={"text": f"m{i}", **payload})
+
+
+def copied_store(tmp_path):
+    store = vector_store.open_client("numpy", path=str(tmp_path / "vectors"))
+    for name in ("chat_messages_v1", "chat_messages_v2"):
+        store.create_collection(name, vectors_config=models.VectorParams(size=PROFILE["dimensions"],
+                                                                         distance=models.Distance.COSINE))
+    store.upsert("chat_messages_v1", [point(i) for i in range(10)])
+    migrate_collection.copy_points(store, "chat_messages_v1", "chat_messages_v2", PROFILE, batch_size=4,
+                                   sample_size=0)
+    return store
+
+
+def payloads(store, collection):
+    records, _ = store.scroll(collection_name=collection, limit=100, with_payload=True)
+    return {r.id: r.payload for r in records}
+
+
+def test_catch_up_copies_updates_and_deletes_removed_points(tmp_path):
+    store = copied_store(tmp_path)
+
+    # Ingestion keeps writing to the source during the copy
+    store.upsert("chat_messages_v1", [point(3, near_duplicate_of="x"), point(10)])
+    store.delete("chat_messages_v1", points_selector=models.PointIdsList(points=[point(5).id]))
+
+    copied, deleted = migrate_collection.catch_up(store, "chat_messages_v1", "chat_messages_v2", PROFILE,
+                                                  batch_size=4)
+
+    assert (copied, deleted) == (2, 1)
+    assert payloads(store, "chat_messages_v2") == payloads(store, "chat_messages_v1")
+    assert migrate_collection.catch_up(store, "chat_messages_v1", "chat_messages_v2", PROFILE,
+                                       batch_size=4) == (0, 0)
+
+
+def test_catch_up_after_the_swap_only_adds_missing_points(tmp_path):
+    store = copied_store(tmp_path)
+
+    # Swapped: the target gets new writes, the source only stragglers
+    store.upsert("chat_messages_v2", [point(3, near_duplicate_of="x"), point(11)])
+    store.upsert("chat_messages_v1", [point(10)])
+
+    copied, deleted = migrate_collection.catch_up(store, "chat_messages_v1", "chat_messages_v2", PROFILE,
+                                                  batch_size=4, missing_only=True)
+
+    assert (copied, deleted) == (1, 0)
+    target = payloads(store, "chat_messages_v2")
+    assert len(target) == 12
+    assert target[point(3).id]["near_duplicate_of"] == "x"
@@ -0,0 +1,43 @@
+import os
+
+import pytest
+
+import near_dup
+
+store_chat_message = pytest.importorskip("store_chat_message")
+
+TEXT = "could you explain how the checkpoint file decides which conversations get embedded again"
+
+
+def message(point_id, text):
+    return {"point_id": point_id, "text": text, "exchange_index": 1,
+            "payload": {"role": "user", "text": text, "conversation_id": "c"}}
+
+
+def test_store_policy_keeps_near_duplicates_tagged(tmp_path):
+    index = near_dup.NearDuplicateIndex(str(tmp_path / "near_dup.sqlite"), policy="store")
+    ingestor = store_chat_message.Ingestor(near_duplicates=index)
+    ingestor.log = lambda *args, **kwargs: None
+
+    kept = ingestor.suppress_near_duplicates([message("a", TEXT), message("b", TEXT + "!")])
+
+    assert [m["point_id"] for m in kept] == ["a", "b"]
+    assert kept[1]["payload"]["near_duplicate_of"] == "a"
+    assert "near_duplicate_of" not in kept[0]["payload"]
+
+
+def test_link_policy_skips_the_embedding_and_counts_it(tmp_path):
+    index = near_dup.NearDuplicateIndex(str(tmp_path / "near_dup.sqlite"), policy="link")
+    ingestor = store_chat_message.Ingestor(near_duplicates=index)
+    ingestor.log = lambda *args, **kwargs: None
+
+    kept = ingestor.suppress_near_duplicates([message("a", TEXT), message("b", TEXT + "!")])
+
+    assert [m["point_id"] for m in kept] == ["a"]
+    assert ingestor.stats["near_duplicates"] == 1
+    assert ingestor.stats["embeddings_saved"] == 1
+
+
+@pytest.mark.skipif("NEAR_DUP_POLICY" in os.environ, reason="NEAR_DUP_POLICY is set")
+def test_link_is_the_default_policy():
+    assert near_dup.NEAR_DUP_POLICY == "link"
@@ -0,0 +1,106 @@
+import asyncio
+import types
+
+import pytest
+
+pytest.importorskip("mcp")
+np = pytest.importorskip("numpy")
+models = pytest.importorskip("qdrant_client.models")
+
+import access_llm_memory as server
+import result_format
+import vector_store
+from lexical_index import LexicalIndex
+
+DIMENSIONS = 8
+LONG = "the alias swap waits for the catch-up to finish. " * 40
+
+
+def scored(i, text):
+    return models.ScoredPoint(id=i, version=0, score=1.0 / (i + 1), payload={"text": text, "exchange_index": i})
+
+
+@pytest.mark.parametrize("max_chars", [100, 300, 1000, 4000])
+def test_snippets_stay_within_the_budget(max_chars):
+    results = result_format.format_results([scored(i, LONG) for i in range(20)], "alias swap", max_chars)
+
+    assert results
+    assert sum(len(r["text"]) for r in results) <= max_chars
+    # Hits that would get less than MIN_SNIPPET_CHARS are dropped rather than squeezed
+    assert len(results) <= max(max_chars // 100, 1)
+
+
+def test_conversation_page_ends_before_the_exchange_that_did_not_fit():
+    page = [
+        types.SimpleNamespace(id=f"{i}-{role}", payload={"text": LONG, "exchange_index": i, "role": role})
+        for i in range(5) for role in ("user", "assistant")
+    ]
+
+    messages, next_offset = server.fit_page(page, 5, 600)
+
+    assert sum(len(m["text"]) for m in messages) <= 600
+    assert next_offset == max(m["exchange_index"] for m in messages) + 1
+    assert len(messages) == 2 * next_offset
+
+    # A budget too small for one exchange still returns it and moves on
+    messages, next_offset = server.fit_page(page, 5, 50)
+    assert [m["role"] for m in messages] == ["user", "assistant"]
+    assert next_offset == 1
+
+
+class Recorder:
+    """Records the with_payload argument of every query and the ids of every retrieve."""
+
+    def __init__(self, store):
+        self.store = store
+        self.calls = []
+
+    def query_points(self, *args, **kwargs):
+        self.calls.append(("query_points", kwargs["with_payload"], kwargs["limit"]))
+        return self.store.query_points(*args, **kwargs)
+
+    def retrieve(self, *args, **kwargs):
+        self.calls.append(("retrieve", kwargs["with_payload"], len(kwargs["ids"])))
+        return self.store.retrieve(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.store, name)
+
+
+def test_hybrid_fetches_payloads_for_the_final_hits_only(tmp_path, monkeypatch):
+    rng = np.random.default_rng(4)
+    store = vector_store.open_client("numpy", path=str(tmp_path / "vectors"))
+    store.create_collection("messages", vectors_config=models.VectorParams(size=DIMENSIONS,
+                                                                           distance=models.Distance.COSINE))
+    points = [
+        models.PointStruct(id=i, vector=rng.standard_normal(DIMENSIONS).tolist(),
+                           payload={"text": f"message {i} about payload indexes", "role": "user",
+                                    "conversation_id": "c", "exchange_index": i})
+        for i in range(60)
+    ]
+    store.upsert("messages", points)
+    lexical = LexicalIndex(str(tmp_path / "lexical.sqlite"))
+    lexical.add_points(points[:10])
+    recorder = Recorder(store)
+
+    async def embed_query(query):
+        return points[30].vector
+
+    async def ready():
+        pass
+
+    monkeypatch.setattr(server, "qdrant", vector_store.AsyncNumpyVectorStore(recorder))
+    monkeypatch.setattr(server, "ensure_qdrant", ready)
+    monkeypatch.setattr(server, "embed_query", embed_query)
+    monkeypatch.setattr(server, "collection_name", "messages")
+    monkeypatch.setattr(server, "result_cache", None)
+    monkeypatch.setattr(server, "lexical_index", lexical)
+
+    results = asyncio.run(server.search_memory("payload indexes", top_k=5, mode="hybrid"))
+
+    assert len(results) == 5
+    assert all(r["text"].startswith("message ") for r in results)
+    assert recorder.calls[0] == ("query_points", False, 20)
+    # Lexical hits carry their payload already; at most the dense-only ones are retrieved
+    assert all(call[0] != "retrieve" or (call[1] == result_format.RESULT_FIELDS and call[2] <= 5)
+               for call in recorder.calls[1:])
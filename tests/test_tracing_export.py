@@ -0,0 +1,60 @@
+import json
+import os
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+import tracing
+
+
+@pytest.fixture
+def collector(tmp_path, monkeypatch):
+    """Span names received by a fake OTLP collector, in order."""
+    received = []
+
+    def handler(request):
+        for resource in json.loads(request.content)["resourceSpans"]:
+            for scope in resource["scopeSpans"]:
+                received.extend(s["name"] for s in scope["spans"])
+        return httpx.Response(200)
+
+    client = httpx.Client
+    monkeypatch.setattr(httpx, "Client", lambda **kwargs: client(transport=httpx.MockTransport(handler)))
+    monkeypatch.setattr(tracing, "EXPORT_OFFSET_FILE", str(tmp_path / "traces.exported"))
+    monkeypatch.setattr(tracing, "TRACING", True)
+    return received
+
+
+def test_export_follows_rotation_and_truncation(tmp_path, collector):
+    path = str(tmp_path / "traces.jsonl")
+    tracing.record_span("t1", "capture", 1.0, 2.0, path=path)
+    assert tracing.export("http://collector", path) == 1
+
+    # Written after the export, then rotated away before the next one
+    tracing.record_span("t1", "parse", 2.0, 3.0, path=path)
+    os.replace(path, path + ".1")
+    tracing.record_span("t1", "embed", 3.0, 4.0, path=path)
+    tracing.record_span("t1", "upsert", 4.0, 5.0, path=path)
+    assert tracing.export("http://collector", path) == 3
+    assert collector == ["capture", "parse", "embed", "upsert"]
+
+    # Truncated in place: same inode, now shorter than the offset
+    with open(path, "w", encoding="utf-8"):
+        pass
+    tracing.record_span("t2", "searchable", 5.0, 6.0, path=path)
+    assert tracing.export("http://collector", path) == 1
+    assert collector[-1] == "searchable"
+    assert tracing.export("http://collector", path) == 0
+
+
+def test_export_reads_a_plain_offset_file(tmp_path, collector):
+    path = str(tmp_path / "traces.jsonl")
+    tracing.record_span("t1", "capture", 1.0, 2.0, path=path)
+    size = os.path.getsize(path)
+    tracing.record_span("t1", "parse", 2.0, 3.0, path=path)
+    with open(tracing.EXPORT_OFFSET_FILE, "w", encoding="utf-8") as f:
+        f.write(str(size))
+
+    assert tracing.export("http://collector", path) == 1
+    assert collector == ["parse"]
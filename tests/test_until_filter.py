@@ -0,0 +1,39 @@
+import warnings
+
+import pytest
+
+from lexical_index import LexicalIndex, until_bound
+
+
+def test_date_only_until_covers_the_whole_day():
+    assert until_bound("2025-03-01") == ("2025-03-02", False)
+    assert until_bound("2025-03-01T12:00:00") == ("2025-03-01T12:00:00", True)
+
+
+def test_lexical_until_date_keeps_that_days_messages():
+    index = LexicalIndex(":memory:")
+    index.add_many([
+        ("a", {"text": "deploy notes", "timestamp": "2025-03-01T15:00:00"}),
+        ("b", {"text": "deploy notes", "timestamp": "2025-03-02T00:00:00"}),
+    ])
+    index.commit()
+    hits = index.search("deploy", filters={"until": "2025-03-01"})
+    assert [hit["point_id"] for hit in hits] == ["a"]
+
+
+def test_qdrant_until_date_keeps_that_days_messages():
+    pytest.importorskip("mcp")
+    from qdrant_client import QdrantClient
+    from qdrant_client.models import Distance, PointStruct, VectorParams
+
+    from access_llm_memory import build_filter
+
+    warnings.filterwarnings("ignore", message="Payload indexes have no effect")
+    client = QdrantClient(":memory:")
+    client.create_collection("messages", vectors_config=VectorParams(size=2, distance=Distance.COSINE))
+    client.upsert("messages", points=[
+        PointStruct(id=1, vector=[1.0, 0.0], payload={"timestamp": "2025-03-01T15:00:00"}),
+        PointStruct(id=2, vector=[1.0, 0.0], payload={"timestamp": "2025-03-02T00:00:00"}),
+    ])
+    records, _ = client.scroll("messages", scroll_filter=build_filter(until="2025-03-01"))
+    assert [r.id for r in records] == [1]
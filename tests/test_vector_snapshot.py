@@ -0,0 +1,109 @@
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("numpy")
+qdrant_models = pytest.importorskip("qdrant_client.models")
+
+import storage_profiles
+import text_store
+import vector_snapshot
+import vector_store
+
+
+def test_lean_round_trip_keeps_texts(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage_profiles, "STATE_DIR", str(tmp_path / "state"))
+    monkeypatch.setattr(vector_snapshot.collection_version, "STATE_DIR", str(tmp_path / "state"))
+    profile = storage_profiles.get_profile("default")
+    texts = {str(uuid.UUID(int=i + 1)): f"message number {i}" for i in range(20)}
+
+    # Source host: lean payloads, texts only in its text store
+    source = vector_store.open_client("numpy", path=str(tmp_path / "source"))
+    source_store = text_store.TextStore(str(tmp_path / "source_texts.sqlite"))
+    storage_profiles.create_collection(source, "chat_messages_v1", profile)
+    source_store.put_many(texts.items())
+    vector = [1.0] + [0.0] * (profile["dimensions"] - 1)
+    source.upsert(collection_name="chat_messages_v1", points=[
+        qdrant_models.PointStruct(id=point_id, vector=vector, payload={"conversation_id": "c", "role": "user"})
+        for point_id in texts
+    ])
+    vector_snapshot.export_snapshot(source, "chat_messages_v1", str(tmp_path / "snap"), store=source_store)
+
+    # Target host: LEAN_PAYLOADS=1 with an empty text store
+    target = vector_store.open_client("numpy", path=str(tmp_path / "target"))
+    target_store = text_store.TextStore(str(tmp_path / "target_texts.sqlite"))
+    loaded = vector_snapshot.import_snapshot(target, str(tmp_path / "snap"), "chat_messages_v1", profile,
+                                             workers=2, store=target_store)
+
+    assert loaded == len(texts)
+    records, _ = target.scroll(collection_name="chat_messages_v1", limit=100, with_payload=True)
+    assert all("text" not in r.payload for r in records)
+    text_store.hydrate(records, target_store)
+    assert {str(r.id): r.payload["text"] for r in records} == texts
+
+
+def test_restore_imports_a_new_version_and_swaps_the_alias(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage_profiles, "STATE_DIR", str(tmp_path / "state"))
+    monkeypatch.setattr(vector_snapshot.collection_version, "STATE_DIR", str(tmp_path / "state"))
+    profile = storage_profiles.get_profile("default")
+    vector = [1.0] + [0.0] * (profile["dimensions"] - 1)
+
+    source = vector_store.open_client("numpy", path=str(tmp_path / "source"))
+    vector_snapshot.collection_aliases.create_versioned(source, "chat_messages", profile)
+    source.upsert(collection_name="chat_messages", points=[
+        qdrant_models.PointStruct(id=str(uuid.UUID(int=i + 1)), vector=vector, payload={"text": f"m{i}"})
+        for i in range(5)
+    ])
+    vector_snapshot.export_snapshot(source, "chat_messages", str(tmp_path / "snap"))
+
+    # The target already serves chat_messages_v1; the restore becomes v2
+    target = vector_store.open_client("numpy", path=str(tmp_path / "target"))
+    vector_snapshot.collection_aliases.create_versioned(target, "chat_messages", profile)
+    collection, loaded = vector_snapshot.restore_snapshot(target, str(tmp_path / "snap"), "chat_messages", profile)
+
+    assert (collection, loaded) == ("chat_messages_v2", 5)
+    assert vector_snapshot.collection_aliases.resolve(target, "chat_messages") == "chat_messages_v2"
+    assert target.count(collection_name="chat_messages", exact=True).count == 5
+    assert target.collection_exists("chat_messages_v1")
+
+
+class ThresholdRecorder:
+    """A numpy store that reports an optimizer config and records updates to it, as Qdrant would."""
+
+    def __init__(self, store, indexing_threshold):
+        self.store = store
+        self.indexing_threshold = indexing_threshold
+        self.thresholds = []
+
+    def get_collection(self, collection_name):
+        info = self.store.get_collection(collection_name)
+        info.config.optimizer_config = SimpleNamespace(indexing_threshold=self.indexing_threshold)
+        return info
+
+    def update_collection(self, collection_name, optimizers_config=None, **_):
+        self.thresholds.append(optimizers_config.indexing_threshold)
+        self.indexing_threshold = optimizers_config.indexing_threshold
+
+    def __getattr__(self, name):
+        return getattr(self.store, name)
+
+
+def test_import_restores_the_configured_indexing_threshold(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage_profiles, "STATE_DIR", str(tmp_path / "state"))
+    monkeypatch.setattr(vector_snapshot.collection_version, "STATE_DIR", str(tmp_path / "state"))
+    profile = storage_profiles.get_profile("default")
+    vector = [1.0] + [0.0] * (profile["dimensions"] - 1)
+
+    source = vector_store.open_client("numpy", path=str(tmp_path / "source"))
+    storage_profiles.create_collection(source, "chat_messages_v1", profile)
+    source.upsert(collection_name="chat_messages_v1", points=[
+        qdrant_models.PointStruct(id=str(uuid.UUID(int=i + 1)), vector=vector, payload={"text": f"m{i}"})
+        for i in range(5)
+    ])
+    vector_snapshot.export_snapshot(source, "chat_messages_v1", str(tmp_path / "snap"))
+
+    target = ThresholdRecorder(vector_store.open_client("numpy", path=str(tmp_path / "target")), 5000)
+    vector_snapshot.import_snapshot(target, str(tmp_path / "snap"), "chat_messages_v1", profile)
+
+    assert target.thresholds == [0, 5000]
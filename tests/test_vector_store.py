@@ -0,0 +1,89 @@
+import threading
+
+import pytest
+
+np = pytest.importorskip("numpy")
+models = pytest.importorskip("qdrant_client.models")
+
+import vector_store
+
+DIMENSIONS = 8
+
+
+def open_store(tmp_path):
+    store = vector_store.open_client("numpy", path=str(tmp_path / "vectors"))
+    store.create_collection("messages", vectors_config=models.VectorParams(size=DIMENSIONS,
+                                                                           distance=models.Distance.COSINE))
+    return store
+
+
+def points(start, count, rng):
+    return [
+        models.PointStruct(id=start + i, vector=rng.standard_normal(DIMENSIONS).tolist(),
+                           payload={"role": "user" if (start + i) % 2 else "assistant", "provider": "claude.ai"})
+        for i in range(count)
+    ]
+
+
+def test_queries_during_upserts_see_consistent_snapshots(tmp_path):
+    store = open_store(tmp_path)
+    rng = np.random.default_rng(0)
+    store.upsert("messages", points(0, 200, rng))
+    errors = []
+    done = threading.Event()
+
+    def write():
+        for start in range(200, 2200, 100):
+            store.upsert("messages", points(start, 100, rng))
+            # Re-upserting hides earlier rows, so the alive mask changes too
+            store.upsert("messages", points(start - 50, 50, rng))
+        done.set()
+
+    def read():
+        flt = models.Filter(must=[models.FieldCondition(key="role", match=models.MatchValue(value="user"))])
+        try:
+            while not done.is_set():
+                hits = store.query_points("messages", query=[1.0] * DIMENSIONS, query_filter=flt, limit=10).points
+                assert all(hit.id % 2 == 1 for hit in hits)
+                store.scroll("messages", scroll_filter=flt, limit=50)
+        except Exception as e:  # noqa: BLE001 - reported below
+            errors.append(e)
+
+    threads = [threading.Thread(target=write)] + [threading.Thread(target=read) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert store.count("messages").count == 2200
+
+
+def test_filters_beyond_match_and_range(tmp_path):
+    store = open_store(tmp_path)
+    store.upsert("messages", points(0, 10, np.random.default_rng(1)))
+
+    has_id = models.Filter(must=[models.HasIdCondition(has_id=[1, 2, 3])])
+    assert store.count("messages", count_filter=has_id).count == 3
+    except_ = models.Filter(must=[models.FieldCondition(key="role", match=models.MatchExcept(**{"except": ["user"]}))])
+    assert store.count("messages", count_filter=except_).count == 5
+
+
+def test_unsupported_filter_names_itself(tmp_path):
+    store = open_store(tmp_path)
+    store.upsert("messages", points(0, 2, np.random.default_rng(2)))
+    flt = models.Filter(must=[models.IsEmptyCondition(is_empty=models.PayloadField(key="not_a_column"))])
+    with pytest.raises(ValueError, match="not_a_column"):
+        store.count("messages", count_filter=flt)
+
+
+def test_deleted_points_stay_deleted_after_reopening(tmp_path):
+    store = open_store(tmp_path)
+    store.upsert("messages", points(0, 10, np.random.default_rng(2)))
+    store.delete("messages", points_selector=models.PointIdsList(points=[3, 4]))
+
+    reopened = vector_store.open_client("numpy", path=str(tmp_path / "vectors"))
+    assert reopened.count("messages").count == 8
+    assert reopened.retrieve("messages", ids=[3, 4, 5]) == reopened.retrieve("messages", ids=[5])
+    # Upserting a deleted id brings it back
+    reopened.upsert("messages", points(3, 1, np.random.default_rng(3)))
+    assert reopened.count("messages").count == 9
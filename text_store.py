@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Message texts kept out of the Qdrant payloads, compressed in local SQLite.
+
+With LEAN_PAYLOADS=1 ingestion writes each message's text here, keyed by
+point id, and upserts the point with only the small filterable fields (ids,
+role, timestamp, hashes). That keeps Qdrant's payload storage and snapshots
+small and search responses short; the MCP server fetches the text of only the
+hits it actually returns. Texts are zstd-compressed when the zstandard package
+is installed and zlib-compressed otherwise; every row records its codec, so
+either can read the other's rows.
+
+Usage:
+    python text_store.py stats              # sizes and the savings per 1M points
+    python text_store.py slim               # move texts of existing points out of their payloads
+    python text_store.py get <point_id>
+"""
+
+import os
+import sys
+import json
+import zlib
+import sqlite3
+import argparse
+import threading
+
+from storage_profiles import STATE_DIR
+
+TEXT_STORE_FILE = os.path.join(STATE_DIR, "text_store.sqlite")
+LEAN_PAYLOADS = os.getenv("LEAN_PAYLOADS", "0") == "1"
+TEXT_STORE_LEVEL = int(os.getenv("TEXT_STORE_LEVEL", "6"))
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+CODEC = "zstd" if zstandard is not None else "zlib"
+
+
+def lean_payload(payload):
+    """The payload without its text."""
+    return {key: value for key, value in payload.items() if key != "text"}
+
+
+class TextStore:
+    def __init__(self, path=TEXT_STORE_FILE, level=TEXT_STORE_LEVEL):
+        self.path = path
+        self.level = level
+        self.lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS texts ("
+            "point_id TEXT PRIMARY KEY, codec TEXT NOT NULL, length INTEGER NOT NULL, data BLOB NOT NULL)"
+        )
+        self.db.commit()
+        if zstandard is not None:
+            self._compressor = zstandard.ZstdCompressor(level=level)
+            self._decompressor = zstandard.ZstdDecompressor()
+
+    def compress(self, text):
+        raw = text.encode("utf-8")
+        if zstandard is not None:
+            return CODEC, len(raw), self._compressor.compress(raw)
+        return CODEC, len(raw), zlib.compress(raw, self.level)
+
+    def decompress(self, codec, data):
+        if codec == "zlib":
+            return zlib.decompress(data).decode("utf-8")
+        if zstandard is None:
+            raise RuntimeError("Text stored with zstd; install the zstandard package to read it")
+        return self._decompressor.decompress(data).decode("utf-8")
+
+    def put_many(self, items):
+        """Store (point_id, text) pairs, replacing earlier texts of the same points, and commit."""
+        # zstd (de)compressor objects must not be shared between threads, so they run under the lock
+        with self.lock:
+            rows = [(str(point_id), *self.compress(text or "")) for point_id, text in items]
+            self.db.executemany(
+                "INSERT OR REPLACE INTO texts (point_id, codec, length, data) VALUES (?, ?, ?, ?)", rows
+            )
+            self.db.commit()
+
+    def get_many(self, point_ids):
+        """{point_id: text} for the ids that are stored."""
+        point_ids = [str(point_id) for point_id in point_ids]
+        if not point_ids:
+            return {}
+        with self.lock:
+            rows = self.db.execute(
+                f"SELECT point_id, codec, data FROM texts WHERE point_id IN ({', '.join('?' for _ in point_ids)})",
+                point_ids,
+            ).fetchall()
+            return {point_id: self.decompress(codec, data) for point_id, codec, data in rows}
+
+    def stats(self):
+        with self.lock:
+            count, raw, stored = self.db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(length), 0), COALESCE(SUM(LENGTH(data)), 0) FROM texts"
+            ).fetchone()
+        return {"texts": count, "raw_bytes": raw, "stored_bytes": stored, "codec": CODEC}
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+def hydrate(records, store):
+    """Fill in payload["text"] of records (points or hits) whose payload doesn't carry it. Returns records."""
+    missing = [r for r in records if r.payload is not None and "text" not in r.payload]
+    if missing and store is not None:
+        texts = store.get_many(r.id for r in missing)
+        for record in missing:
+            record.payload["text"] = texts.get(str(record.id), "")
+    return records
+
+
+def per_million(stats):
+    """Qdrant payload bytes saved and text store bytes used, extrapolated to 1M points."""
+    if not stats["texts"]:
+        return None
+    # A JSON-encoded text is about its UTF-8 length plus the key and quotes.
+    # N bytes per point are N MB per million points.
+    payload_per_point = stats["raw_bytes"] / stats["texts"] + len('"text": "",')
+    return {
+        "payload_saved_mb": round(payload_per_point, 1),
+        "text_store_mb": round(stats["stored_bytes"] / stats["texts"], 1),
+        "compression_ratio": round(stats["raw_bytes"] / max(stats["stored_bytes"], 1), 2),
+    }
+
+
+def slim(qdrant, collection_name, store, batch_size=256):
+    """
+    Move the text of every point that still carries one into the store and
+    drop it from the payload. Returns the number of points slimmed.
+    """
+    slimmed = 0
+    offset = None
+    while True:
+        records, offset = qdrant.scroll(
+            collection_name=collection_name, limit=batch_size, offset=offset,
+            with_payload=True, with_vectors=not hasattr(qdrant, "delete_payload"),
+        )
+        heavy = [r for r in records if r.payload and "text" in r.payload]
+        if heavy:
+            # Text first, so a reader never finds a point whose text is nowhere
+            store.put_many((r.id, r.payload["text"]) for r in heavy)
+            if hasattr(qdrant, "delete_payload"):
+                qdrant.delete_payload(collection_name=collection_name, keys=["text"], points=[r.id for r in heavy])
+            else:
+                from qdrant_client.models import PointStruct
+
+                # The numpy backend is append-only: re-append the rows with the lean payload
+                qdrant.upsert(collection_name=collection_name, points=[
+                    PointStruct(id=r.id, vector=r.vector, payload=lean_payload(r.payload)) for r in heavy
+                ])
+            slimmed += len(heavy)
+        print(f"  Slimmed {slimmed} points...", end="\r", file=sys.stderr)
+        if offset is None:
+            return slimmed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compressed message texts kept out of the Qdrant payloads.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    stats_parser = sub.add_parser("stats", help="stored texts, compression and savings per 1M points")
+    stats_parser.add_argument("--json", action="store_true")
+
+    slim_parser = sub.add_parser("slim", help="move texts of existing points into the store")
+    slim_parser.add_argument("--collection", default=None)
+    slim_parser.add_argument("--host", default=os.getenv("QDRANT_HOST", "localhost"))
+    slim_parser.add_argument("--port", type=int, default=int(os.getenv("QDRANT_PORT", "6333")))
+
+    get_parser = sub.add_parser("get", help="print one message's text")
+    get_parser.add_argument("point_id")
+
+    parser.add_argument("--store", default=TEXT_STORE_FILE)
+    args = parser.parse_args(argv)
+
+    store = TextStore(args.store)
+    try:
+        if args.command == "stats":
+            stats = store.stats()
+            stats["per_million_points"] = per_million(stats)
+            if args.json:
+                print(json.dumps(stats, indent=2))
+            elif not stats["texts"]:
+                print("⊘ Text store is empty (LEAN_PAYLOADS=1 or `slim` fills it)")
+            else:
+                savings = stats["per_million_points"]
+                print(f"{stats['texts']} texts, {stats['raw_bytes'] / 1e6:.1f} MB raw -> "
+                      f"{stats['stored_bytes'] / 1e6:.1f} MB {stats['codec']} ({savings['compression_ratio']:.1f}x)")
+                print(f"per 1M points: {savings['payload_saved_mb']:.0f} MB less Qdrant payload, "
+                      f"{savings['text_store_mb']:.0f} MB in the text store")
+        elif args.command == "slim":
+            import storage_profiles
+            import vector_store
+
+            collection = args.collection or storage_profiles.COLLECTION_NAME
+            qdrant = vector_store.open_client(host=args.host, port=args.port, timeout=120)
+            print(f"Moving message texts of {collection} into {args.store}...")
+            slimmed = slim(qdrant, collection, store)
+            print(f"\n✓ Slimmed {slimmed} points; set LEAN_PAYLOADS=1 so new messages are stored the same way")
+        else:
+            text = store.get_many([args.point_id]).get(args.point_id)
+            if text is None:
+                print(f"⊘ No text stored for {args.point_id}")
+                return 1
+            print(text)
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
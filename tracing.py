@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Cross-stage traces: from a captured flow to a searchable vector.
+
+Capture, merge and store are separate processes that only share files, so a
+trace id is assigned when the capture addon sees the response and travels with
+the exchange: parsed file -> merged exchange -> Qdrant payload ("trace_id").
+Every stage appends its spans to STATE_DIR/traces.jsonl, one JSON object per
+line:
+
+    capture     request sent -> response finished (flow timestamps)
+    parse       SSE parsing in the addon
+    write       writing the parsed file
+    merge       merge run that first wrote the exchange to its merged file
+    embed       embeddings request that covered the exchange's messages
+    upsert      Qdrant upsert call that carried them
+    searchable  zero-length marker once a waited-for upsert has returned
+
+Trace ids are 32 hex characters and span ids 16, as in OpenTelemetry, so
+`export` can forward the file to any OTLP/HTTP collector. Set
+DEX_BRIDGE_TRACING=0 to record nothing.
+
+Usage:
+    python tracing.py report [--since-hours 24] [--provider claude.ai]
+    python tracing.py export --endpoint http://localhost:4318
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+from storage_profiles import STATE_DIR
+
+TRACE_FILE = os.path.join(STATE_DIR, "traces.jsonl")
+TRACING = os.getenv("DEX_BRIDGE_TRACING", "1") != "0"
+
+# The file is rotated to traces.jsonl.1 once it grows past this size
+TRACE_FILE_MAX_BYTES = int(os.getenv("TRACE_FILE_MAX_MB", "50")) * 1024 * 1024
+
+# Inode and byte offset of TRACE_FILE up to which spans have been exported
+EXPORT_OFFSET_FILE = os.path.join(STATE_DIR, "traces.exported")
+
+STAGES = ["capture", "parse", "write", "merge", "embed", "upsert", "searchable"]
+
+_lock = threading.Lock()
+
+
+def new_trace_id():
+    return uuid.uuid4().hex
+
+
+def _span_id():
+    return uuid.uuid4().hex[:16]
+
+
+def record_span(trace_ids, name, start, end, path=TRACE_FILE, **attributes):
+    """
+    Append one span per trace id (a batch operation belongs to every trace it carried).
+
+    `start` and `end` are Unix timestamps in seconds. Tracing must never break
+    the pipeline, so write errors are swallowed.
+    """
+    if not TRACING:
+        return
+    if isinstance(trace_ids, str):
+        trace_ids = [trace_ids]
+    trace_ids = [t for t in dict.fromkeys(trace_ids) if t]
+    if not trace_ids:
+        return
+
+    lines = "".join(
+        json.dumps({
+            "trace_id": trace_id,
+            "span_id": _span_id(),
+            "name": name,
+            "start": round(start, 6),
+            "end": round(end, 6),
+            "pid": os.getpid(),
+            "attributes": attributes,
+        }) + "\n"
+        for trace_id in trace_ids
+    )
+    try:
+        with _lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            try:
+                if os.path.getsize(path) > TRACE_FILE_MAX_BYTES:
+                    os.replace(path, path + ".1")
+            except OSError:
+                pass
+            # One append per call keeps lines from different processes intact
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(lines)
+    except OSError:
+        pass
+
+
+@contextmanager
+def span(trace_ids, name, **attributes):
+    """Time the block and record it as `name` for every trace id, even if it raised."""
+    start = time.time()
+    try:
+        yield attributes
+    finally:
+        record_span(trace_ids, name, start, time.time(), **attributes)
+
+
+def read_spans(path=TRACE_FILE, since=None):
+    """Spans from the trace file and its rotated predecessor, oldest first."""
+    spans = []
+    for candidate in (path + ".1", path):
+        try:
+            with open(candidate, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        s = json.loads(line)
+                    except ValueError:
+                        continue
+                    if since is None or s["end"] >= since:
+                        spans.append(s)
+        except FileNotFoundError:
+            continue
+    return spans
+
+
+def percentiles(values):
+    values = sorted(values)
+    if not values:
+        return None
+    pick = lambda p: values[min(len(values) - 1, int(len(values) * p))]
+    return {"n": len(values), "p50": pick(0.50), "p90": pick(0.90), "p99": pick(0.99), "max": values[-1]}
+
+
+def summarize(spans, provider=None):
+    """
+    Capture-to-searchable latencies and per-stage durations, grouped by trace.
+
+    A trace counts as searchable at its first "searchable" marker; its start is
+    the start of its "capture" span (when the request was sent), or its
+    earliest span if the capture span is missing.
+    """
+    traces = defaultdict(list)
+    for s in spans:
+        traces[s["trace_id"]].append(s)
+
+    end_to_end = []
+    after_response = []
+    stage_durations = defaultdict(list)
+    pending = 0
+    for trace_spans in traces.values():
+        by_name = defaultdict(list)
+        for s in trace_spans:
+            by_name[s["name"]].append(s)
+        capture = by_name.get("capture")
+        if provider and not any(s["attributes"].get("provider") == provider for s in capture or []):
+            continue
+        for name, named in by_name.items():
+            if name != "searchable":
+                stage_durations[name].extend(s["end"] - s["start"] for s in named)
+
+        searchable = by_name.get("searchable")
+        if not searchable:
+            pending += 1
+            continue
+        searchable_at = min(s["end"] for s in searchable)
+        started = capture[0]["start"] if capture else min(s["start"] for s in trace_spans)
+        end_to_end.append(searchable_at - started)
+        if capture:
+            after_response.append(searchable_at - capture[0]["end"])
+
+    return {
+        "traces": len(end_to_end) + pending,
+        "searchable": len(end_to_end),
+        "pending": pending,
+        "capture_to_searchable_s": percentiles(end_to_end),
+        "response_end_to_searchable_s": percentiles(after_response),
+        "stages_s": {name: percentiles(stage_durations[name]) for name in STAGES if stage_durations.get(name)},
+    }
+
+
+def print_report(summary):
+    def row(label, stats):
+        print(f"  {label:<26} n={stats['n']:<6} p50 {stats['p50']:9.3f}s  p90 {stats['p90']:9.3f}s  "
+              f"p99 {stats['p99']:9.3f}s  max {stats['max']:9.3f}s")
+
+    print(f"Traces: {summary['traces']} ({summary['searchable']} searchable, {summary['pending']} not yet)")
+    if summary["capture_to_searchable_s"]:
+        print("\nLatency")
+        row("capture -> searchable", summary["capture_to_searchable_s"])
+        if summary["response_end_to_searchable_s"]:
+            row("response end -> searchable", summary["response_end_to_searchable_s"])
+    if summary["stages_s"]:
+        print("\nStage durations")
+        for name, stats in summary["stages_s"].items():
+            row(name, stats)
+
+
+def otlp_payload(spans, service_name="dex-bridge"):
+    """OTLP/HTTP JSON body (ExportTraceServiceRequest) for a list of spans."""
+    def attribute(key, value):
+        if isinstance(value, bool):
+            return {"key": key, "value": {"boolValue": value}}
+        if isinstance(value, int):
+            return {"key": key, "value": {"intValue": str(value)}}
+        if isinstance(value, float):
+            return {"key": key, "value": {"doubleValue": value}}
+        return {"key": key, "value": {"stringValue": str(value)}}
+
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [attribute("service.name", service_name)]},
+            "scopeSpans": [{
+                "scope": {"name": "dex_bridge.tracing"},
+                "spans": [
+                    {
+                        "traceId": s["trace_id"],
+                        "spanId": s["span_id"],
+                        "name": s["name"],
+                        "kind": 1,
+                        "startTimeUnixNano": str(int(s["start"] * 1e9)),
+                        "endTimeUnixNano": str(int(s["end"] * 1e9)),
+                        "attributes": [attribute("process.pid", s["pid"])]
+                                      + [attribute(k, v) for k, v in s["attributes"].items() if v is not None],
+                    }
+                    for s in spans
+                ],
+            }],
+        }],
+    }
+
+
+def read_export_offset():
+    """(inode, offset) reached by the last export; the inode is None for an old plain-offset file."""
+    try:
+        with open(EXPORT_OFFSET_FILE, "r", encoding="utf-8") as f:
+            data = f.read().strip()
+    except FileNotFoundError:
+        return None, 0
+    try:
+        state = json.loads(data or "0")
+    except ValueError:
+        return None, 0
+    if isinstance(state, int):
+        return None, state
+    return state.get("inode"), state.get("offset", 0)
+
+
+def write_export_offset(inode, offset):
+    with open(EXPORT_OFFSET_FILE, "w", encoding="utf-8") as f:
+        json.dump({"inode": inode, "offset": offset}, f)
+
+
+def export_file(client, url, path, offset, batch_size):
+    """Send the complete lines of `path` from `offset` on, saving the offset after every batch."""
+    sent = 0
+    with open(path, "rb") as f:
+        inode = os.fstat(f.fileno()).st_ino
+        f.seek(offset)
+        while True:
+            batch = []
+            while len(batch) < batch_size:
+                line = f.readline()
+                if not line or not line.endswith(b"\n"):
+                    # Stop before a line another process is still writing
+                    break
+                try:
+                    batch.append(json.loads(line))
+                except ValueError:
+                    pass
+                offset += len(line)
+            if batch:
+                client.post(url, json=otlp_payload(batch)).raise_for_status()
+                sent += len(batch)
+            write_export_offset(inode, offset)
+            if len(batch) < batch_size:
+                return sent
+
+
+def export(endpoint, path=TRACE_FILE, batch_size=512):
+    """
+    Send spans recorded since the last export to an OTLP/HTTP collector.
+
+    The file's inode and the byte offset reached are kept in
+    EXPORT_OFFSET_FILE, so repeated runs (e.g. from cron) only send new spans.
+    When the inode changes the file was rotated: the rest of the old file
+    (now path.1) is sent first, then the new one from the start. A file that
+    shrank below the offset was truncated and is read from the start too.
+    Returns the number of spans sent.
+    """
+    import httpx
+
+    inode, offset = read_export_offset()
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return 0
+
+    url = endpoint.rstrip("/") + "/v1/traces"
+    sent = 0
+    with httpx.Client(timeout=30.0) as client:
+        if (inode is not None and inode != stat.st_ino) or offset > stat.st_size:
+            rotated = path + ".1"
+            try:
+                if inode is not None and os.stat(rotated).st_ino == inode:
+                    sent += export_file(client, url, rotated, offset, batch_size)
+            except FileNotFoundError:
+                pass
+            offset = 0
+        sent += export_file(client, url, path, offset, batch_size)
+    return sent
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Capture-to-searchable traces of the ingestion pipeline.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    report_parser = sub.add_parser("report", help="latency distributions from the trace file")
+    report_parser.add_argument("--since-hours", type=float, default=None)
+    report_parser.add_argument("--provider", default=None, help="only traces captured from this host")
+    report_parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+
+    export_parser = sub.add_parser("export", help="send new spans to an OTLP/HTTP collector")
+    export_parser.add_argument("--endpoint", default=os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4318"))
+
+    parser.add_argument("--trace-file", default=TRACE_FILE)
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        sent = export(args.endpoint, args.trace_file)
+        print(f"✓ Exported {sent} spans to {args.endpoint}")
+        return 0
+
+    since = time.time() - args.since_hours * 3600 if args.since_hours else None
+    summary = summarize(read_spans(args.trace_file, since), args.provider)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print_report(summary)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+Export a collection's vectors and payloads to disk and load them back, without embedding calls.
+
+A snapshot is a directory:
+
+    manifest.json    collection, point count, dimensions, dtype, checksums
+    vectors.npy      N x dims float32 (or float16) matrix, written and read memory-mapped
+    payloads.jsonl   one {"id": ..., "payload": {...}} line per row, in matrix order
+
+Exporting scrolls the collection once. Importing creates the next versioned
+collection behind the alias (`chat_messages_v3` for `chat_messages`, see
+collection_aliases.py) with the current (or --profile) storage profile,
+points the alias at it once loaded, and upserts batches from
+several threads. Vectors are reduced when the profile has fewer dimensions,
+as migrate_collection.py does. On a Qdrant server, HNSW indexing is held
+off during the load and built once at the end. Moving to another host or
+restoring a backup costs no embeddings API calls.
+
+Payloads always carry their message text in the snapshot: points stored
+with LEAN_PAYLOADS=1 get it back from the local text store on export, and
+with LEAN_PAYLOADS=1 on the importing host it goes into that host's store.
+
+Usage:
+    python vector_snapshot.py export ./snapshots/chat_messages [--dtype float16]
+    python vector_snapshot.py import ./snapshots/chat_messages [--collection chat_messages] --workers 4
+    python vector_snapshot.py info ./snapshots/chat_messages
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import argparse
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import storage_profiles
+import collection_version
+import collection_aliases
+import text_store
+
+SNAPSHOT_FORMAT = 1
+MANIFEST = "manifest.json"
+VECTORS = "vectors.npy"
+PAYLOADS = "payloads.jsonl"
+
+# Qdrant's default indexing_threshold (KB), restored after a bulk load when
+# the collection doesn't report its own
+DEFAULT_INDEXING_THRESHOLD = 20000
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_manifest(directory):
+    with open(os.path.join(directory, MANIFEST), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != SNAPSHOT_FORMAT:
+        raise ValueError(f"Unsupported snapshot format {manifest.get('format')} in {directory}")
+    return manifest
+
+
+def export_snapshot(qdrant, collection_name, directory, dtype="float32", batch_size=1024, store=None):
+    """Write every point of `collection_name` to `directory`, texts filled in from `store`. Returns the manifest."""
+    import numpy as np
+
+    dimensions = storage_profiles.collection_dimensions(qdrant, collection_name)
+    expected = qdrant.count(collection_name=collection_name, exact=True).count
+    os.makedirs(directory, exist_ok=True)
+    vectors_path = os.path.join(directory, VECTORS)
+    payloads_path = os.path.join(directory, PAYLOADS)
+
+    matrix = np.lib.format.open_memmap(vectors_path, mode="w+", dtype=dtype, shape=(expected, dimensions))
+    written = 0
+    offset = None
+    started = time.time()
+    with open(payloads_path, "w", encoding="utf-8") as payloads:
+        while written < expected:
+            records, offset = qdrant.scroll(
+                collection_name=collection_name,
+                limit=min(batch_size, expected - written),
+                offset=offset,
+                with_payload=True,
+                with_vectors=True,
+            )
+            if not records:
+                break
+            matrix[written:written + len(records)] = np.asarray([r.vector for r in records], dtype=np.float32)
+            text_store.hydrate(records, store)
+            for record in records:
+                payloads.write(json.dumps({"id": record.id, "payload": record.payload}, ensure_ascii=False) + "\n")
+            written += len(records)
+            print(f"  Exported {written}/{expected} points ({written / max(time.time() - started, 1e-9):.0f}/s)",
+                  end="\r", file=sys.stderr)
+            if offset is None:
+                break
+    matrix.flush()
+    del matrix
+    print(file=sys.stderr)
+    if offset is not None:
+        print(f"⚠️  Points added while exporting are not in the snapshot (stopped at {expected})")
+
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "collection": collection_name,
+        "count": written,
+        "dimensions": dimensions,
+        "dtype": dtype,
+        "distance": "cosine",
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "files": {name: file_sha256(os.path.join(directory, name)) for name in (VECTORS, PAYLOADS)},
+    }
+    with open(os.path.join(directory, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def snapshot_batches(directory, manifest, dimensions, batch_size, store=None):
+    """
+    Yield lists of PointStruct read from the snapshot, vectors reduced to
+    `dimensions`. With a `store`, texts move there and the payloads are lean.
+    """
+    import numpy as np
+    from qdrant_client.models import PointStruct
+
+    matrix = np.load(os.path.join(directory, VECTORS), mmap_mode="r")
+    count = manifest["count"]
+    with open(os.path.join(directory, PAYLOADS), "r", encoding="utf-8") as payloads:
+        for start in range(0, count, batch_size):
+            rows = [json.loads(payloads.readline()) for _ in range(min(batch_size, count - start))]
+            vectors = np.asarray(matrix[start:start + len(rows), :dimensions], dtype=np.float32)
+            if dimensions < matrix.shape[1]:
+                # Same truncate-and-renormalise as storage_profiles.reduce_vector
+                norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+                vectors /= np.where(norms == 0, 1.0, norms)
+            if store is not None:
+                store.put_many((row["id"], row["payload"]["text"]) for row in rows if "text" in row["payload"])
+            yield [
+                PointStruct(id=row["id"], vector=vector.tolist(),
+                            payload=text_store.lean_payload(row["payload"]) if store is not None else row["payload"])
+                for row, vector in zip(rows, vectors)
+            ]
+
+
+def import_snapshot(qdrant, directory, collection_name, profile, workers=4, batch_size=512, verify=True,
+                    store=None):
+    """
+    Create `collection_name` and bulk-load the snapshot into it.
+
+    At most 2 x `workers` batches are in memory at once. With a `store`
+    (LEAN_PAYLOADS=1), texts go there instead of into the payloads. Returns
+    the number of points loaded.
+    """
+    manifest = read_manifest(directory)
+    if verify:
+        for name, checksum in manifest["files"].items():
+            if file_sha256(os.path.join(directory, name)) != checksum:
+                raise ValueError(f"{name} does not match the manifest checksum; the snapshot is damaged")
+    if profile["dimensions"] > manifest["dimensions"]:
+        raise ValueError(
+            f"Snapshot has {manifest['dimensions']}-dim vectors; profile '{profile['name']}' needs "
+            f"{profile['dimensions']}. Growing vectors requires re-embedding."
+        )
+    if qdrant.collection_exists(collection_name):
+        raise ValueError(f"Collection {collection_name} already exists; import into a fresh one")
+
+    storage_profiles.create_collection(qdrant, collection_name, profile)
+    defer_indexing = hasattr(qdrant, "update_collection")
+    if defer_indexing:
+        from qdrant_client.models import OptimizersConfigDiff
+
+        # The server's or collection's configured threshold, put back once loaded
+        indexing_threshold = qdrant.get_collection(collection_name).config.optimizer_config.indexing_threshold
+        if indexing_threshold is None:
+            indexing_threshold = DEFAULT_INDEXING_THRESHOLD
+        qdrant.update_collection(collection_name, optimizers_config=OptimizersConfigDiff(indexing_threshold=0))
+    try:
+        loaded = load_points(qdrant, directory, manifest, collection_name, profile, workers, batch_size, store)
+    finally:
+        if defer_indexing:
+            qdrant.update_collection(
+                collection_name, optimizers_config=OptimizersConfigDiff(indexing_threshold=indexing_threshold)
+            )
+    storage_profiles.ensure_payload_indexes(qdrant, collection_name)
+    collection_version.bump_version(collection_name)
+    return loaded
+
+
+def load_points(qdrant, directory, manifest, collection_name, profile, workers, batch_size, store):
+    """Upsert the snapshot's batches from `workers` threads. Returns the number of points loaded."""
+    loaded = 0
+    started = time.time()
+    in_flight = set()
+
+    def upsert(points):
+        qdrant.upsert(collection_name=collection_name, points=points, wait=True)
+        return len(points)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for points in snapshot_batches(directory, manifest, profile["dimensions"], batch_size, store):
+            in_flight.add(pool.submit(upsert, points))
+            if len(in_flight) >= 2 * workers:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                loaded += sum(future.result() for future in done)
+                print(f"  Loaded {loaded}/{manifest['count']} points "
+                      f"({loaded / max(time.time() - started, 1e-9):.0f}/s)", end="\r", file=sys.stderr)
+        loaded += sum(future.result() for future in wait(in_flight).done)
+    print(file=sys.stderr)
+    return loaded
+
+
+def restore_snapshot(qdrant, directory, alias, profile, workers=4, batch_size=512, verify=True, store=None):
+    """
+    Import the snapshot into the next `<alias>_vN` collection and point `alias`
+    at it. Returns (collection, points loaded). The previous version is kept.
+    """
+    if qdrant.collection_exists(alias) and not collection_aliases.is_alias(qdrant, alias):
+        raise ValueError(f"{alias} is a collection, not an alias; migrate_collection.py --reindex turns it into one")
+    target = collection_aliases.next_version_name(qdrant, alias)
+    loaded = import_snapshot(qdrant, directory, target, profile, workers, batch_size, verify, store)
+    collection_aliases.point_alias(qdrant, alias, target)
+    storage_profiles.record_profile(alias, profile["name"])
+    collection_version.bump_version(alias)
+    return target, loaded
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export/import collection snapshots without re-embedding.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = sub.add_parser("export", help="write a collection to a snapshot directory")
+    export_parser.add_argument("directory")
+    export_parser.add_argument("--collection", default=storage_profiles.COLLECTION_NAME)
+    export_parser.add_argument("--dtype", choices=["float32", "float16"], default="float32",
+                               help="float16 halves the file; cosine scores change by ~1e-4")
+    export_parser.add_argument("--batch-size", type=int, default=1024)
+
+    import_parser = sub.add_parser("import", help="load a snapshot into a new collection")
+    import_parser.add_argument("directory")
+    import_parser.add_argument("--collection", help="alias to restore under (default: the exported collection's name)")
+    import_parser.add_argument("--profile", choices=sorted(storage_profiles.STORAGE_PROFILES), default=None)
+    import_parser.add_argument("--workers", type=int, default=4)
+    import_parser.add_argument("--batch-size", type=int, default=512)
+    import_parser.add_argument("--no-verify", action="store_true", help="skip the checksum check")
+
+    info_parser = sub.add_parser("info", help="show a snapshot's manifest")
+    info_parser.add_argument("directory")
+
+    for p in (export_parser, import_parser):
+        p.add_argument("--host", default=os.getenv("QDRANT_HOST", "localhost"))
+        p.add_argument("--port", type=int, default=int(os.getenv("QDRANT_PORT", "6333")))
+    args = parser.parse_args(argv)
+
+    if args.command == "info":
+        print(json.dumps(read_manifest(args.directory), indent=2))
+        return 0
+
+    import vector_store
+
+    qdrant = vector_store.open_client(host=args.host, port=args.port, timeout=120)
+    started = time.time()
+    store = None
+    try:
+        if args.command == "export":
+            if not qdrant.collection_exists(args.collection):
+                raise ValueError(f"Collection {args.collection} does not exist")
+            print(f"Exporting {args.collection} -> {args.directory} ({args.dtype})...")
+            if os.path.exists(text_store.TEXT_STORE_FILE):
+                store = text_store.TextStore()
+            manifest = export_snapshot(qdrant, args.collection, args.directory, args.dtype, args.batch_size, store)
+            size = sum(os.path.getsize(os.path.join(args.directory, name)) for name in manifest["files"])
+            print(f"✓ Exported {manifest['count']} points x {manifest['dimensions']} dims "
+                  f"({size / 1e6:.1f} MB) in {time.time() - started:.1f}s")
+        else:
+            manifest = read_manifest(args.directory)
+            # A snapshot of chat_messages_v2 restores behind chat_messages
+            alias = args.collection or re.sub(r"_v\d+$", "", manifest["collection"])
+            previous = collection_aliases.resolve(qdrant, alias)
+            profile = storage_profiles.get_profile(args.profile)
+            print(f"Importing {args.directory} ({manifest['count']} points) -> {alias} "
+                  f"(profile: {profile['name']}, {args.workers} workers)...")
+            if text_store.LEAN_PAYLOADS:
+                store = text_store.TextStore()
+            target, loaded = restore_snapshot(qdrant, args.directory, alias, profile, args.workers, args.batch_size,
+                                              verify=not args.no_verify, store=store)
+            count = qdrant.count(collection_name=target, exact=True).count
+            print(f"✓ Loaded {loaded} points in {time.time() - started:.1f}s (collection now holds {count})")
+            print(f"✓ {alias} now points to {target}")
+            if previous != alias:
+                print(f"  {previous} is kept for rollback; delete it once {target} has proven itself")
+            if count != manifest["count"]:
+                print(f"⚠️  Expected {manifest['count']} points")
+            print("  Local indexes are rebuilt from the collection without API calls: "
+                  "python lexical_index.py rebuild --collection " + alias)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    finally:
+        if store is not None:
+            store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
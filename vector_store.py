@@ -0,0 +1,675 @@
+#!/usr/bin/env python3
+"""
+Vector storage backends for chat_messages.
+
+VECTOR_BACKEND selects where vectors live:
+
+  server  Qdrant server at QDRANT_HOST:QDRANT_PORT (default)
+  local   Qdrant local mode, files under VECTOR_STORE_PATH. No daemon, but
+          only one process can open the path at a time.
+  numpy   Memory-mapped float32 matrix per collection under VECTOR_STORE_PATH,
+          searched with a vectorised brute-force top-k. One writer (ingestion)
+          and any number of readers (the MCP server) can share it; readers pick
+          up appended rows on their next call.
+
+open_client() returns an object with the QdrantClient methods this project
+uses, so ingestion, the MCP server and the tools don't care which one is
+configured.
+
+Layout of a numpy collection directory:
+
+  meta.json       dimensions, distance, declared payload indexes
+  vectors.f32     row-major float32 matrix, one L2-normalised row per point
+  payloads.jsonl  full payload of each row
+  rows.jsonl      per row: point id, payload offset and the filterable fields;
+                  a row counts as written once its line is here
+
+Upserting an existing id appends a new row and hides the old one. Deleting
+appends a {"id": ..., "deleted": true} line, which hides the row without
+adding one. Aliases
+(see collection_aliases.py) are kept in aliases.json next to the collection
+directories and replaced atomically.
+
+Usage:
+    python vector_store.py info [--collection chat_messages]
+"""
+
+import os
+import sys
+import json
+import asyncio
+import argparse
+import threading
+from types import SimpleNamespace
+
+import storage_profiles
+
+VECTOR_BACKENDS = ("server", "local", "numpy")
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "server")
+# Rows per matrix product when the numpy backend scans a collection
+SCAN_BLOCK_ROWS = 16384
+
+VECTOR_STORE_PATH = os.getenv("VECTOR_STORE_PATH", os.path.join(storage_profiles.STATE_DIR, "vectors"))
+
+
+def open_client(backend=None, path=None, host=None, port=None, asynchronous=False, **server_kwargs):
+    """
+    Client for the configured backend.
+
+    `server_kwargs` (e.g. limits=httpx.Limits(...)) are only passed to the
+    server backend. With asynchronous=True the methods are coroutines.
+    """
+    backend = backend or VECTOR_BACKEND
+    path = path or VECTOR_STORE_PATH
+
+    if backend == "server":
+        host = host or os.getenv("QDRANT_HOST", "localhost")
+        port = port or int(os.getenv("QDRANT_PORT", "6333"))
+        if asynchronous:
+            from qdrant_client import AsyncQdrantClient
+
+            return AsyncQdrantClient(host=host, port=port, **server_kwargs)
+        from qdrant_client import QdrantClient
+
+        return QdrantClient(host=host, port=port, **server_kwargs)
+
+    if backend == "local":
+        if asynchronous:
+            from qdrant_client import AsyncQdrantClient
+
+            return AsyncQdrantClient(path=path)
+        from qdrant_client import QdrantClient
+
+        return QdrantClient(path=path)
+
+    if backend == "numpy":
+        store = NumpyVectorStore(path)
+        return AsyncNumpyVectorStore(store) if asynchronous else store
+
+    raise ValueError(f"Unknown VECTOR_BACKEND {backend!r}, expected one of {', '.join(VECTOR_BACKENDS)}")
+
+
+class NumpyCollection:
+    """One collection: an appendable float32 matrix plus id/payload sidecars."""
+
+    def __init__(self, directory):
+        import numpy as np
+
+        self.np = np
+        self.directory = directory
+        with open(os.path.join(directory, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.dimensions = self.meta["dimensions"]
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.payloads_path = os.path.join(directory, "payloads.jsonl")
+        self.rows_path = os.path.join(directory, "rows.jsonl")
+        for path in (self.vectors_path, self.payloads_path, self.rows_path):
+            open(path, "ab").close()
+
+        # Only ever appended to; a snapshot reads the first `count` entries
+        self.ids = []           # row -> point id
+        self.offsets = []       # row -> byte offset in payloads.jsonl
+        self.columns = {}       # field -> list of values per row
+        self.row_of = {}        # point id -> live row
+        self.rows_read = 0      # bytes of rows.jsonl consumed
+        self.lock = threading.RLock()
+        self.current = NumpySnapshot(self, 0, np.zeros(0, dtype=bool), np.zeros((0, self.dimensions), dtype=np.float32))
+        self.refresh()
+
+    def __len__(self):
+        return self.current.count
+
+    def snapshot(self):
+        """The rows as of the last refresh; searches use one snapshot throughout."""
+        return self.current
+
+    def refresh(self):
+        """Load rows appended (by this or another process) since the last call."""
+        with self.lock:
+            size = os.path.getsize(self.rows_path)
+            if size == self.rows_read:
+                return
+            with open(self.rows_path, "rb") as f:
+                f.seek(self.rows_read)
+                data = f.read(size - self.rows_read)
+            # Ignore a trailing partial line; it's picked up once complete
+            complete = data[:data.rfind(b"\n") + 1]
+            self.rows_read += len(complete)
+
+            first_new = len(self.ids)
+            replaced = []
+            for line in complete.splitlines():
+                row = json.loads(line)
+                if row.get("deleted"):
+                    previous = self.row_of.pop(row["id"], None)
+                    if previous is not None:
+                        replaced.append(previous)
+                    continue
+                index = len(self.ids)
+                previous = self.row_of.get(row["id"])
+                if previous is not None:
+                    replaced.append(previous)
+                self.row_of[row["id"]] = index
+                self.ids.append(row["id"])
+                self.offsets.append(row["offset"])
+                fields = row.get("fields", {})
+                for field in fields:
+                    if field not in self.columns:
+                        self.columns[field] = [None] * index
+                for field, values in self.columns.items():
+                    values.append(fields.get(field))
+
+            count = len(self.ids)
+            alive = self.np.concatenate([self.current.alive, self.np.ones(count - first_new, dtype=bool)])
+            alive[replaced] = False
+            matrix = (
+                self.np.memmap(self.vectors_path, dtype=self.np.float32, mode="r", shape=(count, self.dimensions))
+                if count else self.np.zeros((0, self.dimensions), dtype=self.np.float32)
+            )
+            # Published in one assignment, so readers never mix two refreshes
+            self.current = NumpySnapshot(self, count, alive, matrix)
+
+    def append(self, points, column_fields):
+        """Append points (PointStruct-like) to the files, vectors first, rows.jsonl last."""
+        np = self.np
+        vectors = np.asarray([point.vector for point in points], dtype=np.float32)
+        if vectors.shape[1] != self.dimensions:
+            raise ValueError(f"Expected {self.dimensions}-dim vectors, got {vectors.shape[1]}")
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors /= np.where(norms == 0, 1, norms)
+
+        with self.lock:
+            # Drop anything past the last committed row (left by an interrupted append)
+            with open(self.vectors_path, "r+b") as f:
+                f.truncate(len(self.ids) * self.dimensions * 4)
+                f.seek(0, os.SEEK_END)
+                f.write(vectors.tobytes())
+
+            rows = []
+            with open(self.payloads_path, "ab") as f:
+                offset = f.tell()
+                for point in points:
+                    line = (json.dumps(point.payload or {}, ensure_ascii=False) + "\n").encode("utf-8")
+                    f.write(line)
+                    payload = point.payload or {}
+                    rows.append({
+                        "id": str(point.id) if not isinstance(point.id, int) else point.id,
+                        "offset": offset,
+                        "fields": {k: payload[k] for k in column_fields if payload.get(k) is not None},
+                    })
+                    offset += len(line)
+
+            with open(self.rows_path, "ab") as f:
+                f.write("".join(json.dumps(row) + "\n" for row in rows).encode("utf-8"))
+            self.refresh()
+
+    def delete(self, ids):
+        """Hide the live rows of `ids` with tombstone lines in rows.jsonl."""
+        with self.lock:
+            lines = [{"id": str(i) if not isinstance(i, int) else i, "deleted": True} for i in ids]
+            with open(self.rows_path, "ab") as f:
+                f.write("".join(json.dumps(line) + "\n" for line in lines).encode("utf-8"))
+            self.refresh()
+
+
+class NumpySnapshot:
+    """Immutable view of a NumpyCollection's first `count` rows: matrix, alive mask, ids, payloads."""
+
+    def __init__(self, collection, count, alive, matrix):
+        self.np = collection.np
+        self.collection = collection
+        self.count = count
+        self.alive = alive
+        self.matrix = matrix
+        self._column_arrays = {}
+
+    def __len__(self):
+        return self.count
+
+    def id_of(self, row):
+        return self.collection.ids[row]
+
+    def row_of(self, point_id):
+        """Live row of a point id in this snapshot, or None."""
+        row = self.collection.row_of.get(point_id)
+        if row is None or row >= self.count:
+            return None
+        return row
+
+    def has_column(self, field):
+        return field in self.collection.columns
+
+    def payloads(self, rows, fields=True):
+        """Payloads of `rows` (all of them, only `fields`, or None for fields=False)."""
+        if fields is False or fields is None:
+            return [None] * len(rows)
+        payloads = []
+        offsets = self.collection.offsets
+        with open(self.collection.payloads_path, "rb") as f:
+            for row in rows:
+                f.seek(offsets[row])
+                payload = json.loads(f.readline())
+                payloads.append(payload if fields is True else {k: payload[k] for k in fields if k in payload})
+        return payloads
+
+    # -- filters ---------------------------------------------------------------
+
+    def column(self, field, kind="object"):
+        """A field's values as an array: "object" (as stored), "numeric" (NaN if missing) or "text"."""
+        key = (field, kind)
+        if key not in self._column_arrays:
+            np = self.np
+            stored = self.collection.columns.get(field)
+            values = stored[:self.count] if stored is not None else [None] * self.count
+            if kind == "numeric":
+                array = np.array([np.nan if v is None else float(v) for v in values], dtype=float)
+            elif kind == "text":
+                array = np.array(["" if v is None else str(v) for v in values], dtype=str)
+            else:
+                array = np.empty(len(values), dtype=object)
+                array[:] = values
+            self._column_arrays[key] = array
+        return self._column_arrays[key]
+
+    def mask(self, flt):
+        """Boolean row mask for a qdrant Filter (must/should/must_not of the conditions condition() knows)."""
+        np = self.np
+        mask = self.alive.copy()
+        if flt is None:
+            return mask
+        for condition in flt.must or []:
+            mask &= self.condition(condition)
+        if flt.should:
+            any_match = np.zeros(self.count, dtype=bool)
+            for condition in flt.should:
+                any_match |= self.condition(condition)
+            mask &= any_match
+        for condition in flt.must_not or []:
+            mask &= ~self.condition(condition)
+        return mask
+
+    def condition(self, condition):
+        """
+        Row mask of one condition: a nested Filter, has_id, is_empty/is_null on a
+        filterable field, or a field's match (value, any, except, text) or range.
+        """
+        np = self.np
+        if hasattr(condition, "must") and hasattr(condition, "should"):
+            return self.mask(condition)
+
+        if getattr(condition, "has_id", None) is not None:
+            mask = np.zeros(self.count, dtype=bool)
+            rows = [self.row_of(point_id) for point_id in condition.has_id]
+            mask[[row for row in rows if row is not None]] = True
+            return mask
+
+        for name in ("is_empty", "is_null"):
+            target = getattr(condition, name, None)
+            if target is not None:
+                if not self.has_column(target.key):
+                    raise ValueError(f"numpy backend can only test {name} on filterable payload fields, "
+                                     f"not {target.key!r}")
+                return np.fromiter((value is None for value in self.column(target.key)), dtype=bool,
+                                   count=self.count)
+
+        key = getattr(condition, "key", None)
+        match = getattr(condition, "match", None)
+        if key is not None and match is not None:
+            column = self.column(key)
+            if getattr(match, "any", None) is not None:
+                wanted = set(match.any)
+                return np.fromiter((value in wanted for value in column), dtype=bool, count=len(column))
+            if getattr(match, "except_", None) is not None:
+                unwanted = set(match.except_)
+                return np.fromiter((value not in unwanted for value in column), dtype=bool, count=len(column))
+            if getattr(match, "text", None) is not None:
+                return np.char.find(self.column(key, "text"), match.text) >= 0
+            return column == match.value
+
+        bounds = getattr(condition, "range", None)
+        if key is not None and bounds is not None:
+            if any(hasattr(getattr(bounds, name), "isoformat") for name in ("gte", "gt", "lte", "lt")):
+                # Timestamps are stored as naive ISO strings, which sort chronologically
+                values = self.column(key, "text")
+                present = values != ""
+                to_text = lambda value: value.replace(tzinfo=None).isoformat()
+            else:
+                values = self.column(key, "numeric")
+                present = ~np.isnan(values)
+                to_text = float
+            mask = present
+            if bounds.gte is not None:
+                mask &= values >= to_text(bounds.gte)
+            if bounds.gt is not None:
+                mask &= values > to_text(bounds.gt)
+            if bounds.lte is not None:
+                mask &= values <= to_text(bounds.lte)
+            if bounds.lt is not None:
+                mask &= values < to_text(bounds.lt)
+            return mask
+
+        raise ValueError(f"numpy backend does not support the filter condition {condition!r}")
+
+    # -- search ----------------------------------------------------------------
+
+    def top_k(self, queries, flt, limit):
+        """Row indexes and cosine scores of the best `limit` rows for each query vector."""
+        np = self.np
+        queries = np.asarray(queries, dtype=np.float32)
+        queries /= np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+        mask = self.mask(flt)
+        candidates = np.flatnonzero(mask)
+        if not len(candidates):
+            return [([], []) for _ in queries]
+
+        count = self.count
+        if len(candidates) <= max(count // 16, 1):
+            # Selective filter: gather and score just those rows
+            scores = queries @ self.matrix[candidates].T
+        else:
+            # Scan the matrix in blocks, skipping blocks without candidates; avoids
+            # copying large parts of the memory map for broad filters
+            scores = np.full((len(queries), count), -np.inf, dtype=np.float32)
+            for start in range(0, count, SCAN_BLOCK_ROWS):
+                end = min(start + SCAN_BLOCK_ROWS, count)
+                if mask[start:end].any():
+                    scores[:, start:end] = queries @ self.matrix[start:end].T
+            scores[:, ~mask] = -np.inf
+            scores = scores[:, candidates]
+
+        results = []
+        k = min(limit, len(candidates))
+        for row_scores in scores:
+            top = np.argpartition(-row_scores, k - 1)[:k]
+            top = top[np.argsort(-row_scores[top])]
+            results.append((candidates[top].tolist(), row_scores[top].tolist()))
+        return results
+
+
+class NumpyVectorStore:
+    """The subset of QdrantClient used by this project, backed by NumpyCollection files."""
+
+    def __init__(self, path=VECTOR_STORE_PATH):
+        self.path = path
+        self.lock = threading.RLock()
+        self.collections = {}
+        self.aliases_path = os.path.join(path, "aliases.json")
+        self._aliases = ({}, None)
+        os.makedirs(path, exist_ok=True)
+
+    def _alias_map(self):
+        """alias -> collection, re-read when another process has swapped an alias."""
+        try:
+            stat = os.stat(self.aliases_path)
+        except FileNotFoundError:
+            return {}
+        # The file is only ever replaced, so a new inode means new contents
+        key = (stat.st_ino, stat.st_mtime_ns)
+        if self._aliases[1] != key:
+            with open(self.aliases_path, "r", encoding="utf-8") as f:
+                self._aliases = (json.load(f), key)
+        return self._aliases[0]
+
+    def _save_aliases(self, aliases):
+        with open(f"{self.aliases_path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(aliases, f, indent=2)
+        os.replace(f"{self.aliases_path}.tmp", self.aliases_path)
+
+    def _resolve(self, collection_name):
+        return self._alias_map().get(collection_name, collection_name)
+
+    def _directory(self, collection_name):
+        return os.path.join(self.path, self._resolve(collection_name))
+
+    def _collection(self, collection_name):
+        collection_name = self._resolve(collection_name)
+        with self.lock:
+            collection = self.collections.get(collection_name)
+            if collection is None:
+                if not self.collection_exists(collection_name):
+                    raise ValueError(f"Collection {collection_name} not found in {self.path}")
+                collection = self.collections[collection_name] = NumpyCollection(self._directory(collection_name))
+            collection.refresh()
+            return collection
+
+    def _column_fields(self, collection):
+        return sorted(set(storage_profiles.payload_indexes()) | set(collection.meta.get("payload_schema", {})))
+
+    def _save_meta(self, collection_name, meta):
+        path = os.path.join(self._directory(collection_name), "meta.json")
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+        os.replace(f"{path}.tmp", path)
+
+    # -- collections -----------------------------------------------------------
+
+    def collection_exists(self, collection_name):
+        return os.path.exists(os.path.join(self._directory(collection_name), "meta.json"))
+
+    def get_collections(self):
+        names = sorted(
+            name for name in os.listdir(self.path)
+            if os.path.exists(os.path.join(self.path, name, "meta.json"))
+        )
+        return SimpleNamespace(collections=[SimpleNamespace(name=name) for name in names])
+
+    def create_collection(self, collection_name, vectors_config, **_):
+        """Create an empty collection. HNSW and quantisation settings don't apply to brute force."""
+        if self.collection_exists(collection_name):
+            raise ValueError(f"Collection {collection_name} already exists")
+        os.makedirs(self._directory(collection_name), exist_ok=True)
+        self._save_meta(collection_name, {
+            "dimensions": vectors_config.size,
+            "distance": "Cosine",
+            "payload_schema": {},
+        })
+        return True
+
+    def delete_collection(self, collection_name, **_):
+        """Delete a collection (not an alias's target, as in Qdrant) and the aliases pointing to it."""
+        import shutil
+
+        with self.lock:
+            self.collections.pop(collection_name, None)
+            shutil.rmtree(os.path.join(self.path, collection_name), ignore_errors=True)
+            aliases = self._alias_map()
+            if collection_name in aliases.values():
+                self._save_aliases({a: c for a, c in aliases.items() if c != collection_name})
+        return True
+
+    # -- aliases ---------------------------------------------------------------
+
+    def get_aliases(self):
+        from qdrant_client.http.models import AliasDescription, CollectionsAliasesResponse
+
+        return CollectionsAliasesResponse(aliases=[
+            AliasDescription(alias_name=alias, collection_name=target) for alias, target in self._alias_map().items()
+        ])
+
+    def get_collection_aliases(self, collection_name):
+        from qdrant_client.http.models import CollectionsAliasesResponse
+
+        response = self.get_aliases()
+        return CollectionsAliasesResponse(
+            aliases=[a for a in response.aliases if a.collection_name == collection_name]
+        )
+
+    def update_collection_aliases(self, change_aliases_operations, **_):
+        """Apply create/delete/rename alias operations together with one file replace."""
+        with self.lock:
+            aliases = dict(self._alias_map())
+            for operation in change_aliases_operations:
+                if getattr(operation, "delete_alias", None) is not None:
+                    aliases.pop(operation.delete_alias.alias_name, None)
+                elif getattr(operation, "rename_alias", None) is not None:
+                    rename = operation.rename_alias
+                    aliases[rename.new_alias_name] = aliases.pop(rename.old_alias_name)
+                else:
+                    create = operation.create_alias
+                    if os.path.exists(os.path.join(self.path, create.alias_name, "meta.json")):
+                        raise ValueError(f"Alias {create.alias_name} would shadow an existing collection")
+                    if not os.path.exists(os.path.join(self.path, create.collection_name, "meta.json")):
+                        raise ValueError(f"Collection {create.collection_name} not found in {self.path}")
+                    aliases[create.alias_name] = create.collection_name
+            self._save_aliases(aliases)
+        return True
+
+    def get_collection(self, collection_name):
+        collection = self._collection(collection_name)
+        return SimpleNamespace(
+            points_count=int(collection.snapshot().alive.sum()),
+            payload_schema=collection.meta.get("payload_schema", {}),
+            config=SimpleNamespace(params=SimpleNamespace(vectors=SimpleNamespace(size=collection.dimensions))),
+        )
+
+    def create_payload_index(self, collection_name, field_name, field_schema=None, **_):
+        """Every filterable field is a column already; just remember that it was declared."""
+        collection = self._collection(collection_name)
+        schema = getattr(field_schema, "value", field_schema)
+        collection.meta.setdefault("payload_schema", {})[field_name] = schema
+        self._save_meta(collection_name, collection.meta)
+
+    # -- points ------------------------------------------------------------------
+
+    def upsert(self, collection_name, points, wait=True, **_):
+        if not points:
+            return
+        with self.lock:
+            collection = self._collection(collection_name)
+            collection.append(points, self._column_fields(collection))
+
+    def delete(self, collection_name, points_selector, wait=True, **_):
+        """Delete points by id (a PointIdsList or a plain list); filter selectors aren't supported."""
+        ids = getattr(points_selector, "points", points_selector)
+        if not isinstance(ids, list):
+            raise ValueError(f"numpy backend only deletes by point id, not {points_selector!r}")
+        if not ids:
+            return
+        with self.lock:
+            self._collection(collection_name).delete(ids)
+
+    def count(self, collection_name, count_filter=None, exact=True, **_):
+        from qdrant_client.http.models import CountResult
+
+        snapshot = self._collection(collection_name).snapshot()
+        return CountResult(count=int(snapshot.mask(count_filter).sum()))
+
+    def _records(self, snapshot, rows, with_payload, with_vectors, scores=None):
+        from qdrant_client.models import Record, ScoredPoint
+
+        records = []
+        for i, (row, payload) in enumerate(zip(rows, snapshot.payloads(rows, with_payload))):
+            vector = snapshot.matrix[row].tolist() if with_vectors else None
+            if scores is None:
+                records.append(Record(id=snapshot.id_of(row), payload=payload, vector=vector))
+            else:
+                records.append(ScoredPoint(
+                    id=snapshot.id_of(row), version=0, score=scores[i], payload=payload, vector=vector
+                ))
+        return records
+
+    def retrieve(self, collection_name, ids, with_payload=True, with_vectors=False, **_):
+        snapshot = self._collection(collection_name).snapshot()
+        rows = [row for row in map(snapshot.row_of, ids) if row is not None]
+        return self._records(snapshot, rows, with_payload, with_vectors)
+
+    def scroll(self, collection_name, scroll_filter=None, limit=10, offset=None,
+               with_payload=True, with_vectors=False, order_by=None, **_):
+        """
+        Pages of live rows in insertion order; the offset is a row number.
+
+        With order_by (a field name or OrderBy on a filterable numeric field)
+        rows are sorted by that field instead and, as in Qdrant, only the first
+        page is returned (next offset None); page with a range filter.
+        """
+        snapshot = self._collection(collection_name).snapshot()
+        np = snapshot.np
+        rows = np.flatnonzero(snapshot.mask(scroll_filter))
+        if order_by is not None:
+            key = order_by if isinstance(order_by, str) else order_by.key
+            if not snapshot.has_column(key):
+                raise ValueError(f"order_by needs a payload index on {key!r}")
+            values = snapshot.column(key, "numeric")[rows]
+            # Rows without the field are skipped, as in Qdrant
+            rows, values = rows[~np.isnan(values)], values[~np.isnan(values)]
+            rows = rows[np.argsort(values, kind="stable")]
+            if str(getattr(order_by, "direction", None) or "").endswith("desc"):
+                rows = rows[::-1]
+            return self._records(snapshot, [int(row) for row in rows[:limit]], with_payload, with_vectors), None
+        start = 0 if offset is None else int(np.searchsorted(rows, offset))
+        page = [int(row) for row in rows[start:start + limit]]
+        next_offset = int(rows[start + limit]) if start + limit < len(rows) else None
+        return self._records(snapshot, page, with_payload, with_vectors), next_offset
+
+    def query_points(self, collection_name, query, query_filter=None, limit=10,
+                     with_payload=True, with_vectors=False, **_):
+        """Exact cosine top-k; search_params (HNSW ef, quantisation rescoring) don't apply."""
+        from qdrant_client.http.models import QueryResponse
+
+        snapshot = self._collection(collection_name).snapshot()
+        (rows, scores), = snapshot.top_k([query], query_filter, limit)
+        return QueryResponse(points=self._records(snapshot, rows, with_payload, with_vectors, scores))
+
+    def query_batch_points(self, collection_name, requests, **_):
+        """One matrix product for all requests that share a filter."""
+        from qdrant_client.http.models import QueryResponse
+
+        snapshot = self._collection(collection_name).snapshot()
+        responses = [None] * len(requests)
+        groups = {}
+        for i, request in enumerate(requests):
+            key = (repr(request.filter), request.limit)
+            groups.setdefault(key, []).append(i)
+        for indexes in groups.values():
+            first = requests[indexes[0]]
+            results = snapshot.top_k([requests[i].query for i in indexes], first.filter, first.limit)
+            for i, (rows, scores) in zip(indexes, results):
+                request = requests[i]
+                with_payload = True if request.with_payload is None else request.with_payload
+                responses[i] = QueryResponse(
+                    points=self._records(snapshot, rows, with_payload, bool(request.with_vector), scores)
+                )
+        return responses
+
+    def close(self, **_):
+        self.collections.clear()
+
+
+class AsyncNumpyVectorStore:
+    """AsyncQdrantClient-style wrapper: every method runs in a worker thread (NumPy releases the GIL)."""
+
+    def __init__(self, store):
+        self.store = store
+
+    def __getattr__(self, name):
+        method = getattr(self.store, name)
+
+        async def call(*args, **kwargs):
+            return await asyncio.to_thread(method, *args, **kwargs)
+
+        return call
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect the configured vector backend.")
+    parser.add_argument("command", choices=["info"])
+    parser.add_argument("--collection", default=storage_profiles.COLLECTION_NAME)
+    args = parser.parse_args(argv)
+
+    import collection_aliases
+
+    client = open_client()
+    print(f"Backend: {VECTOR_BACKEND}" + (f" ({VECTOR_STORE_PATH})" if VECTOR_BACKEND != "server" else ""))
+    if not client.collection_exists(args.collection):
+        print(f"⊘ Collection {args.collection} does not exist")
+        return 1
+    info = client.get_collection(args.collection)
+    target = collection_aliases.resolve(client, args.collection)
+    alias_note = f" (alias for {target})" if target != args.collection else ""
+    print(f"✓ {args.collection}{alias_note}: {info.points_count} points, "
+          f"{info.config.params.vectors.size} dims, indexes: {', '.join(info.payload_schema) or 'none'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())